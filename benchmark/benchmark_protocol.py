@@ -0,0 +1,59 @@
+""" Compare the step-result protocols of TextWorldExpressEnv (JSON, binary, and integer IDs), for each game.
+
+All protocols play the same episodes (same seeds, same random actions), so the difference in steps per second is
+only due to encoding the step results (in the JVM), transferring them, and decoding them (in Python).
+"""
+import time
+import random
+import argparse
+
+from textworld_express import TextWorldExpressEnv
+
+PROTOCOLS = ("json", "binary", "ids")
+
+
+def run(env, gameName, gameParams, numEpisodes, maxSteps, seed):
+    rng = random.Random(seed)
+    numSteps = 0
+    startTime = time.perf_counter()
+    for episodeIdx in range(numEpisodes):
+        obs, infos = env.reset(gameName=gameName, gameParams=gameParams, seed=episodeIdx)
+        for _ in range(maxSteps):
+            obs, reward, done, infos = env.step(rng.choice(infos["validActions"]))
+            numSteps += 1
+            if done:
+                break
+
+    return numSteps, time.perf_counter() - startTime
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--jar_path", type=str, help="Path to the TextWorldExpress jar file. Default: use builtin.")
+    parser.add_argument("--game-names", nargs="+", default=None, help="Games to benchmark. Default: all games.")
+    parser.add_argument("--game-params", type=str, default="", help="Generation parameters, e.g. numLocations=5,includeDoors=1.")
+    parser.add_argument("--num-episodes", type=int, default=20)
+    parser.add_argument("--max-steps", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=20221012, help="Seed of the random agent.")
+    args = parser.parse_args()
+
+    envs = {protocol: TextWorldExpressEnv(args.jar_path, envStepLimit=args.max_steps, protocol=protocol)
+            for protocol in PROTOCOLS}
+    gameNames = args.game_names or envs["json"].getGameNames()
+
+    print("{:<25} {:>8}".format("game", "steps") + "".join("{:>18}".format(protocol + " (steps/s)") for protocol in PROTOCOLS))
+    for gameName in gameNames:
+        rates = {}
+        for protocol, env in envs.items():
+            run(env, gameName, args.game_params, 1, args.max_steps, args.seed)  # Warm up the JVM
+            numSteps, elapsed = run(env, gameName, args.game_params, args.num_episodes, args.max_steps, args.seed)
+            rates[protocol] = numSteps / elapsed
+
+        print("{:<25} {:>8}".format(gameName, numSteps) + "".join("{:>18.1f}".format(rates[protocol]) for protocol in PROTOCOLS))
+
+    for env in envs.values():
+        env.close()
+
+
+if __name__ == "__main__":
+    main()
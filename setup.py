@@ -38,12 +38,13 @@ setup(name='textworld_express',
     packages=['textworld_express'],
     include_package_data=True,
     package_dir={'textworld_express': 'textworld_express'},
-    package_data={'textworld_express': [JAR_FILE, OBJECTS_TWC_FILE, COOKING_WORLD_FILE]},
+    package_data={'textworld_express': [JAR_FILE, OBJECTS_TWC_FILE, COOKING_WORLD_FILE, '*.json.bin']},
     url="https://github.com/cognitiveailab/TextWorldExpress",
     long_description=open("README.md").read(),
     long_description_content_type="text/markdown",
     install_requires=open('requirements.txt').readlines(),
     extras_require={
         'webserver': open('requirements.txt').readlines() + ['pywebio'],
+        'precrawled': open('requirements.txt').readlines() + ['numpy'],
     },
 )
@@ -8,4 +8,9 @@ sbt proguard
 version=$(grep version build.sbt | cut -d '"' -f2)
 mv -f "target/scala-2.13/proguard/textworldexpress_2.13-${version}.jar" ../textworld_express/textworld-express.jar
 
+# Compile the data files (for faster loading)
+pushd ../textworld_express
+java -cp textworld-express.jar textworldexpress.data.DataRegistry
+popd
+
 popd
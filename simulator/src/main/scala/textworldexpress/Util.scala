@@ -10,4 +10,9 @@ object JSON {
 
     return out
   }
+
+  // Serialize a list of strings as a JSON array
+  def mkList(strs:Iterable[String]):String = {
+    return strs.map(str => "\"" + sanitize(str) + "\"").mkString("[", ",", "]")
+  }
 }
\ No newline at end of file
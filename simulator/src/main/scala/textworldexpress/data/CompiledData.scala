@@ -0,0 +1,166 @@
+package textworldexpress.data
+
+import java.io.{ByteArrayOutputStream, DataOutputStream, File, RandomAccessFile}
+import java.nio.ByteBuffer
+import java.nio.channels.FileChannel
+import java.nio.charset.StandardCharsets
+import java.nio.file.{Files, Paths, StandardCopyOption}
+import java.util.zip.CRC32
+
+
+/*
+ * A compact binary ("compiled") form of a data file, that is much faster to load than parsing JSON.  The compiled form
+ * of a data file (e.g. 'cooking_world.json') is stored next to it, with a '.bin' extension ('cooking_world.json.bin'),
+ * and is memory-mapped when loaded.  It can also be packaged as a resource in the jar.
+ * Compiled files are a magic number, a format version, the name of the data (e.g. "twc"), and the checksum (CRC32) of
+ * the data file they were compiled from, followed by data-specific records made of ints and length-prefixed UTF-8
+ * strings (see CompiledDataWriter and CompiledDataReader).  The checksum (rather than the modification time, which
+ * e.g. a git checkout does not preserve) is used to tell whether a compiled file is up to date with its data file.
+ * Compiled files are made with DataRegistry.main().
+ */
+class CompiledDataWriter(val dataName:String, val sourceChecksum:Long) {
+  private val bytes = new ByteArrayOutputStream()
+  private val out = new DataOutputStream(bytes)
+
+  this.writeInt(CompiledData.MAGIC)
+  this.writeInt(CompiledData.VERSION)
+  this.writeStr(dataName)
+  this.out.writeLong(sourceChecksum)
+
+  def writeInt(value:Int): Unit = this.out.writeInt(value)
+
+  def writeStr(str:String): Unit = {
+    val strBytes = str.getBytes(StandardCharsets.UTF_8)
+    this.out.writeInt(strBytes.length)
+    this.out.write(strBytes)
+  }
+
+  def writeStrs(strs:Iterable[String]): Unit = {
+    this.writeInt(strs.size)
+    for (str <- strs) this.writeStr(str)
+  }
+
+  // Write to a temporary file first, so that other processes never read a partially written file
+  def save(filename:String): Unit = {
+    this.out.flush()
+    val file = Paths.get(filename)
+    val tempFile = Paths.get(filename + ".tmp")
+    try {
+      Files.write(tempFile, this.bytes.toByteArray)
+      Files.move(tempFile, file, StandardCopyOption.REPLACE_EXISTING, StandardCopyOption.ATOMIC_MOVE)
+    } finally {
+      Files.deleteIfExists(tempFile)
+    }
+  }
+
+}
+
+
+class CompiledDataReader(buffer:ByteBuffer, val dataName:String) {
+  // Check the header
+  if (this.readInt() != CompiledData.MAGIC) throw new RuntimeException("ERROR: Not a compiled data file.")
+  private val version = this.readInt()
+  if (version != CompiledData.VERSION) throw new RuntimeException("ERROR: Unsupported compiled data file version (" + version + ", expected " + CompiledData.VERSION + ").")
+  private val name = this.readStr()
+  if (name != dataName) throw new RuntimeException("ERROR: Compiled data file contains '" + name + "' data (expected '" + dataName + "').")
+  // Checksum of the data file that this file was compiled from
+  val sourceChecksum:Long = this.buffer.getLong()
+
+  def readInt():Int = this.buffer.getInt()
+
+  def readStr():String = {
+    val strBytes = new Array[Byte](this.buffer.getInt())
+    this.buffer.get(strBytes)
+    return new String(strBytes, StandardCharsets.UTF_8)
+  }
+
+  def readStrs():Array[String] = {
+    val out = new Array[String](this.readInt())
+    for (i <- 0 until out.length) out(i) = this.readStr()
+    return out
+  }
+
+}
+
+
+object CompiledData {
+  val MAGIC:Int = 0x54575844     // "TWXD"
+  val VERSION:Int = 2
+  val EXTENSION:String = ".bin"
+
+  def mkCompiledFilename(filename:String):String = filename + EXTENSION
+
+  // Checksum (CRC32) of a data file's contents
+  def checksum(filename:String):Long = {
+    val crc = new CRC32()
+    crc.update(Files.readAllBytes(Paths.get(filename)))
+    return crc.getValue
+  }
+
+  // Find the candidate compiled forms of a data file, in order of preference: on disk next to the data file
+  // (memory-mapped), then as a resource in the jar.  Candidates are (description, contents), and are only read when
+  // iterated to.
+  def find(filename:String):Iterator[(String, ByteBuffer)] = {
+    val compiledFilename = mkCompiledFilename(filename)
+    val resourceName = "/" + mkCompiledFilename(new File(filename).getName)
+    return Iterator(
+      () => this.mapFile(compiledFilename).map((compiledFilename, _)),
+      () => this.readResource(resourceName).map(("resource " + resourceName, _))
+    ).flatMap(_())
+  }
+
+  private def mapFile(filename:String):Option[ByteBuffer] = {
+    val file = new File(filename)
+    if (!file.isFile) return None
+
+    val raf = new RandomAccessFile(file, "r")
+    try {
+      return Some( raf.getChannel.map(FileChannel.MapMode.READ_ONLY, 0, raf.length()) )
+    } finally {
+      raf.close()
+    }
+  }
+
+  private def readResource(resourceName:String):Option[ByteBuffer] = {
+    val resource = getClass.getResourceAsStream(resourceName)
+    if (resource != null) {
+      try {
+        val bytes = new ByteArrayOutputStream()
+        val chunk = new Array[Byte](65536)
+        var numRead = resource.read(chunk)
+        while (numRead >= 0) {
+          bytes.write(chunk, 0, numRead)
+          numRead = resource.read(chunk)
+        }
+        return Some( ByteBuffer.wrap(bytes.toByteArray) )
+      } finally {
+        resource.close()
+      }
+    }
+
+    return None
+  }
+
+  // Load the compiled form of a data file with 'decode', if there is one that is up to date with the data file (i.e.
+  // compiled from a file with the same checksum; any compiled form is used if the data file does not exist).  Compiled
+  // files that can not be read are reported, and skipped (so that the data file is parsed, if no other one can be used).
+  def load[T](filename:String, dataName:String, decode:CompiledDataReader => T):Option[T] = {
+    val sourceChecksum = if (new File(filename).isFile) Some(this.checksum(filename)) else None
+
+    val candidates = this.find(filename)
+    while (candidates.hasNext) {
+      val (description, buffer) = candidates.next()
+      try {
+        val reader = new CompiledDataReader(buffer, dataName)
+        if (sourceChecksum.isEmpty || (reader.sourceChecksum == sourceChecksum.get)) return Some( decode(reader) )
+      } catch {
+        case e:Exception => {
+          println("WARNING: Unable to read compiled data file for " + filename + " (" + description + ": " + e.toString + ").  Skipping it.")
+        }
+      }
+    }
+
+    return None
+  }
+
+}
@@ -61,9 +61,10 @@ case class RecipeIngredient(name:String, preparation:Set[String]) {
 }
 
 // Loads the data from TWC Kitchen
+// Note: Use DataRegistry.getCookingWorldData() to share one (immutable) copy of the data across the JVM.
 class LoadCookingWorldDataJSON(filename:String = LoadCookingWorldDataJSON.DEFAULT_FILENAME) {
 
-  val (allObjs, lutObj, lutLocation, foodSplitsTrain, foodSplitsDev, foodSplitsTest, foodPrepTrain, foodPrepDev, foodPrepTest) = this.load(filename)
+  val (allObjs, lutObj, lutLocation, foodSplitsTrain, foodSplitsDev, foodSplitsTest, foodPrepTrain, foodPrepDev, foodPrepTest) = this.index( LoadCookingWorldDataJSON.loadRecords(filename) )
 
   /*
    * Getters
@@ -131,8 +132,69 @@ class LoadCookingWorldDataJSON(filename:String = LoadCookingWorldDataJSON.DEFAUL
    * Loading/initialization
    */
 
-  // Load the JSON file, and convert to storage classes referenced by look-up-tables.
-  def load(filenameIn:String):(Array[CookingWorldObject], Map[String, CookingWorldObject], Map[String, ArrayBuffer[CookingWorldObject]], Set[String], Set[String], Set[String], Map[String, Array[Set[String]]], Map[String, Array[Set[String]]], Map[String, Array[Set[String]]]) = {
+  // Index the data with look-up-tables.
+  private def index(records:CookingWorldDataRecords):(Array[CookingWorldObject], Map[String, CookingWorldObject], Map[String, ArrayBuffer[CookingWorldObject]], Set[String], Set[String], Set[String], Map[String, Array[Set[String]]], Map[String, Array[Set[String]]], Map[String, Array[Set[String]]]) = {
+    val out = records.objs
+
+    // Step 1A: Make object look-up-table
+    val lutObj = mutable.Map[String, CookingWorldObject]()
+    for (obj <- out) {
+      lutObj(obj.name) = obj
+    }
+
+    // Step 1B: Make location look-up-table
+    val lutLocation = mutable.Map[String, ArrayBuffer[CookingWorldObject]]()
+    for (obj <- out) {
+      for (location <- obj.locations) {
+        if (!lutLocation.contains(location)) lutLocation(location) = new ArrayBuffer[CookingWorldObject]()
+        lutLocation(location).append(obj)
+      }
+    }
+
+    // Step 2: Food splits (train/dev/test): Food names
+    val foodSplitsTrain = records.foodSplits("train").toSet
+    val foodSplitsDev = records.foodSplits("valid").toSet
+    val foodSplitsTest = records.foodSplits("test").toSet
+
+    // Step 3: Food preparation splits (train/dev/test): Foods and how they need to be prepared
+    val foodPrepsTrain = this.indexFoodPreps(records.foodPreps("train"))
+    val foodPrepsDev = this.indexFoodPreps(records.foodPreps("valid"))
+    val foodPrepsTest = this.indexFoodPreps(records.foodPreps("test"))
+
+    // Return
+    return (out, lutObj.toMap, lutLocation.toMap, foodSplitsTrain, foodSplitsDev, foodSplitsTest, foodPrepsTrain, foodPrepsDev, foodPrepsTest)
+  }
+
+  private def indexFoodPreps(foodPreps:Array[(String, Array[Array[String]])]):Map[String, Array[Set[String]]] = {
+    val out = mutable.Map[String, Array[Set[String]]]()
+    for ((foodName, preps) <- foodPreps) {
+      out(foodName) = preps.map(_.toSet)
+    }
+    return out.toMap
+  }
+
+}
+
+
+// The contents of the data file, in file order (before indexing).  The food splits and preparations are by fold (train, valid, test).
+class CookingWorldDataRecords(val objs:Array[CookingWorldObject], val foodSplits:Map[String, Array[String]], val foodPreps:Map[String, Array[(String, Array[Array[String]])]]) {
+
+}
+
+
+object LoadCookingWorldDataJSON {
+  val DEFAULT_FILENAME = "cooking_world.json"
+  val FOLD_NAMES = Array("train", "valid", "test")
+  // Name of the data in compiled data files
+  val COMPILED_DATA_NAME = "cookingworld"
+
+  // Load the data, from the compiled data file if there is one, or else from the JSON file
+  def loadRecords(filename:String):CookingWorldDataRecords = {
+    return CompiledData.load(filename, COMPILED_DATA_NAME, this.readCompiled).getOrElse( this.parseJSON(filename) )
+  }
+
+  // Load the JSON file, and convert to storage classes.
+  def parseJSON(filenameIn:String):CookingWorldDataRecords = {
     // Step 1: Load the TextWorld Common Sense object file
     val jsonString = Source.fromFile(filenameIn).getLines.mkString
     val dataRaw = ujson.read(jsonString).value.asInstanceOf[mutable.LinkedHashMap[String, Any]]
@@ -148,13 +210,11 @@ class LoadCookingWorldDataJSON(filename:String = LoadCookingWorldDataJSON.DEFAUL
     // FOODS_COMPACT
 
     val foodsCompact = dataRaw("FOODS_COMPACT").asInstanceOf[ujson.Obj].value.asInstanceOf[mutable.LinkedHashMap[String, Any]]
-    //println ("foodsCompact: " + foodsCompact)
 
-    // Step 2A: Objects (foods_compact): Convert from the JSON format to an internal storage class (TWCObject)
+    // Step 2: Objects (foods_compact): Convert from the JSON format to an internal storage class (CookingWorldObject)
     val out = new ArrayBuffer[CookingWorldObject]()
     for (key <- foodsCompact.keySet) {
       val record = foodsCompact(key).asInstanceOf[ujson.Obj].value
-      //println("key: " + key + "   " + record.toString())
 
       val name = key
       var indefinite = ""
@@ -177,97 +237,89 @@ class LoadCookingWorldDataJSON(filename:String = LoadCookingWorldDataJSON.DEFAUL
           out.append(new CookingWorldObject(altName, indefinite, properties, locations))
         }
       }
-      //println("obj: " + obj.toString())
     }
 
-    /*
-    for (i <- 0 until out.length) {
-      println(i + ": " + out(i).toString())
-    }
-     */
-
-    // Step 2A: Make object look-up-table
-    val lutObj = mutable.Map[String, CookingWorldObject]()
-    for (obj <- out) {
-      lutObj(obj.name) = obj
+    // Step 3: Food splits (train/dev/test): Food names
+    val foodSplitsRaw = dataRaw("FOODS_SPLITS").asInstanceOf[ujson.Obj].value.asInstanceOf[mutable.LinkedHashMap[String, Any]]
+    val foodSplits = mutable.Map[String, Array[String]]()
+    for (foldName <- FOLD_NAMES) {
+      foodSplits(foldName) = foodSplitsRaw(foldName).asInstanceOf[ujson.Arr].value.map(_.toString().replaceAll("\"", "")).toArray
     }
 
-    // Step 2B: Make location look-up-table
-    val lutLocation = mutable.Map[String, ArrayBuffer[CookingWorldObject]]()
-    for (obj <- out) {
-      for (location <- obj.locations) {
-        if (!lutLocation.contains(location)) lutLocation(location) = new ArrayBuffer[CookingWorldObject]()
-        lutLocation(location).append(obj)
+    // Step 4: Food preparation splits (train/dev/test): Foods and how they need to be prepared
+    val foodPreparationsSplits = dataRaw("FOOD_PREPARATIONS_SPLITS").asInstanceOf[ujson.Obj].value.asInstanceOf[mutable.LinkedHashMap[String, Any]]
+    val foodPreps = mutable.Map[String, Array[(String, Array[Array[String]])]]()
+    for (foldName <- FOLD_NAMES) {
+      val foodPrepsRaw = foodPreparationsSplits(foldName).asInstanceOf[ujson.Obj].value
+      val foldPreps = new ArrayBuffer[(String, Array[Array[String]])]()
+      for (elem <- foodPrepsRaw) {
+        val foodName = elem._1
+        val prepList = elem._2.asInstanceOf[ujson.Arr].value
+        val preps = prepList.map(_.asInstanceOf[ujson.Arr].value.map(_.toString().replaceAll("\"", "")).toArray).toArray
+        foldPreps.append( (foodName, preps) )
       }
+      foodPreps(foldName) = foldPreps.toArray
     }
 
-    //println("lutLocation keys: " + lutLocation.keySet.mkString(", "))
-
-    // Step 3: Food splits (train/dev/test): Food names
-    val foodSplits = dataRaw("FOODS_SPLITS").asInstanceOf[ujson.Obj].value.asInstanceOf[mutable.LinkedHashMap[String, Any]]
-    val foodSplitsTrain = foodSplits("train").asInstanceOf[ujson.Arr].value.map(_.toString().replaceAll("\"", "")).toSet
-    val foodSplitsDev = foodSplits("valid").asInstanceOf[ujson.Arr].value.map(_.toString().replaceAll("\"", "")).toSet
-    val foodSplitsTest = foodSplits("test").asInstanceOf[ujson.Arr].value.map(_.toString().replaceAll("\"", "")).toSet
+    // Return
+    return new CookingWorldDataRecords(out.toArray, foodSplits.toMap, foodPreps.toMap)
+  }
 
-    /*
-    println ("foodsSplits: " + foodSplits)
-    println ("foodSplitsTrain: " + foodSplitsTrain)
-    println ("foodSplitsDev: " + foodSplitsDev)
-    println ("foodSplitsTest: " + foodSplitsTest)
-     */
+  /*
+   * Compiled data file (see CompiledData): the objects (name, indefinite article, properties, locations), then for
+   * each fold, its food split (food names) and food preparations (food name, and its possible preparations)
+   */
+  def writeCompiled(records:CookingWorldDataRecords, sourceChecksum:Long, filenameOut:String): Unit = {
+    val writer = new CompiledDataWriter(COMPILED_DATA_NAME, sourceChecksum)
+    writer.writeInt(records.objs.length)
+    for (obj <- records.objs) {
+      writer.writeStr(obj.name)
+      writer.writeStr(obj.indefinite)
+      writer.writeStrs(obj.properties)
+      writer.writeStrs(obj.locations)
+    }
 
-    // Step 4: Food preparation splits (train/dev/test): Foods and how they need to be prepared
-    val foodPreparationsSplits = dataRaw("FOOD_PREPARATIONS_SPLITS").asInstanceOf[ujson.Obj].value.asInstanceOf[mutable.LinkedHashMap[String, Any]]
+    for (foldName <- FOLD_NAMES) {
+      writer.writeStrs(records.foodSplits(foldName))
 
-    // Step 4A: train
-    val foodPrepsTrainRaw = foodPreparationsSplits("train").asInstanceOf[ujson.Obj].value //.map(_.toString().replaceAll("\"", ""))
-    val foodPrepsTrain = mutable.Map[String, Array[Set[String]]]()
-    for (elem <- foodPrepsTrainRaw) {
-      val preps = new ArrayBuffer[ Set[String] ]
-      val foodName = elem._1
-      val prepList = elem._2.asInstanceOf[ujson.Arr].value
-      for (onePrep <- prepList) {
-        preps.append( onePrep.asInstanceOf[ujson.Arr].value.map(_.toString().replaceAll("\"", "")).toSet )
+      val foodPreps = records.foodPreps(foldName)
+      writer.writeInt(foodPreps.length)
+      for ((foodName, preps) <- foodPreps) {
+        writer.writeStr(foodName)
+        writer.writeInt(preps.length)
+        for (prep <- preps) writer.writeStrs(prep)
       }
-      foodPrepsTrain(foodName) = preps.toArray
     }
+    writer.save(filenameOut)
+  }
 
-    // Step 4B: dev
-    val foodPrepsDevRaw = foodPreparationsSplits("valid").asInstanceOf[ujson.Obj].value //.map(_.toString().replaceAll("\"", ""))
-    val foodPrepsDev = mutable.Map[String, Array[Set[String]]]()
-    for (elem <- foodPrepsDevRaw) {
-      val preps = new ArrayBuffer[ Set[String] ]
-      val foodName = elem._1
-      val prepList = elem._2.asInstanceOf[ujson.Arr].value
-      for (onePrep <- prepList) {
-        preps.append( onePrep.asInstanceOf[ujson.Arr].value.map(_.toString().replaceAll("\"", "")).toSet )
-      }
-      foodPrepsDev(foodName) = preps.toArray
+  def readCompiled(reader:CompiledDataReader):CookingWorldDataRecords = {
+    val objs = new Array[CookingWorldObject](reader.readInt())
+    for (i <- 0 until objs.length) {
+      val name = reader.readStr()
+      val indefinite = reader.readStr()
+      val properties = reader.readStrs().toSet
+      objs(i) = new CookingWorldObject(name, indefinite, properties, reader.readStrs())
     }
 
-    // Step 4C: test
-    val foodPrepsTestRaw = foodPreparationsSplits("test").asInstanceOf[ujson.Obj].value //.map(_.toString().replaceAll("\"", ""))
-    val foodPrepsTest = mutable.Map[String, Array[Set[String]]]()
-    for (elem <- foodPrepsTestRaw) {
-      val preps = new ArrayBuffer[ Set[String] ]
-      val foodName = elem._1
-      val prepList = elem._2.asInstanceOf[ujson.Arr].value
-      for (onePrep <- prepList) {
-        preps.append( onePrep.asInstanceOf[ujson.Arr].value.map(_.toString().replaceAll("\"", "")).toSet )
+    val foodSplits = mutable.Map[String, Array[String]]()
+    val foodPreps = mutable.Map[String, Array[(String, Array[Array[String]])]]()
+    for (foldName <- FOLD_NAMES) {
+      foodSplits(foldName) = reader.readStrs()
+
+      val foldPreps = new Array[(String, Array[Array[String]])](reader.readInt())
+      for (i <- 0 until foldPreps.length) {
+        val foodName = reader.readStr()
+        val preps = new Array[Array[String]](reader.readInt())
+        for (j <- 0 until preps.length) preps(j) = reader.readStrs()
+        foldPreps(i) = (foodName, preps)
       }
-      foodPrepsTest(foodName) = preps.toArray
+      foodPreps(foldName) = foldPreps
     }
 
-    // Return
-    return (out.toArray, lutObj.toMap, lutLocation.toMap, foodSplitsTrain, foodSplitsDev, foodSplitsTest, foodPrepsTrain.toMap, foodPrepsDev.toMap, foodPrepsTest.toMap)
+    return new CookingWorldDataRecords(objs, foodSplits.toMap, foodPreps.toMap)
   }
 
-}
-
-
-object LoadCookingWorldDataJSON {
-  val DEFAULT_FILENAME = "cooking_world.json"
-
   def main(args:Array[String]): Unit = {
     val d = new LoadCookingWorldDataJSON()
     println ("Loaded " + d.allObjs.length + " objects")
@@ -0,0 +1,39 @@
+package textworldexpress.data
+
+import java.util.concurrent.ConcurrentHashMap
+
+
+/*
+ * Process-wide registry of the object/recipe databases.  Each data file is loaded at most once per JVM (from its compiled
+ * form if there is one, see CompiledData), and the loaded database is shared by all game generators (and so by all
+ * sessions), so making a new game generator (e.g. in PythonInterface.load() ) does not load any data.  The databases
+ * are not changed after they are loaded.
+ */
+object DataRegistry {
+  private val twcData = new ConcurrentHashMap[String, LoadTWCDataJSON]()
+  private val cookingWorldData = new ConcurrentHashMap[String, LoadCookingWorldDataJSON]()
+
+  def getTWCData(filename:String = LoadTWCDataJSON.DEFAULT_FILENAME):LoadTWCDataJSON = {
+    return this.twcData.computeIfAbsent(filename, new LoadTWCDataJSON(_))
+  }
+
+  def getCookingWorldData(filename:String = LoadCookingWorldDataJSON.DEFAULT_FILENAME):LoadCookingWorldDataJSON = {
+    return this.cookingWorldData.computeIfAbsent(filename, new LoadCookingWorldDataJSON(_))
+  }
+
+  /*
+   * Compile the data files (always from JSON), writing their compiled forms next to them.
+   * Usage: DataRegistry [twcFilename] [cookingWorldFilename]
+   */
+  def main(args:Array[String]): Unit = {
+    val twcFilename = if (args.length > 0) args(0) else LoadTWCDataJSON.DEFAULT_FILENAME
+    val cookingWorldFilename = if (args.length > 1) args(1) else LoadCookingWorldDataJSON.DEFAULT_FILENAME
+
+    LoadTWCDataJSON.writeCompiled(LoadTWCDataJSON.parseJSON(twcFilename), CompiledData.checksum(twcFilename), CompiledData.mkCompiledFilename(twcFilename))
+    println ("Compiled " + twcFilename + " to " + CompiledData.mkCompiledFilename(twcFilename))
+
+    LoadCookingWorldDataJSON.writeCompiled(LoadCookingWorldDataJSON.parseJSON(cookingWorldFilename), CompiledData.checksum(cookingWorldFilename), CompiledData.mkCompiledFilename(cookingWorldFilename))
+    println ("Compiled " + cookingWorldFilename + " to " + CompiledData.mkCompiledFilename(cookingWorldFilename))
+  }
+
+}
@@ -25,11 +25,14 @@ case class TWCObject(name:String, locations:Array[String]) {
 }
 
 // Loader
+// Note: Use DataRegistry.getTWCData() to share one (immutable) copy of the data across the JVM.
 class LoadTWCDataJSON(filename:String = LoadTWCDataJSON.DEFAULT_FILENAME) {
+  // The objects in each fold, in file order (from the compiled data file, if there is one)
+  private val objsByFold = LoadTWCDataJSON.loadObjects(filename)
 
-  val (allObjsTrain, lutObjTrain, lutLocationTrain) = this.load(filename, "train")
-  val (allObjsDev, lutObjDev, lutLocationDev) = this.load(filename, "valid")
-  val (allObjsTest, lutObjTest, lutLocationTest) = this.load(filename, "test")
+  val (allObjsTrain, lutObjTrain, lutLocationTrain) = this.index(objsByFold("train"))
+  val (allObjsDev, lutObjDev, lutLocationDev) = this.index(objsByFold("valid"))
+  val (allObjsTest, lutObjTest, lutLocationTest) = this.index(objsByFold("test"))
 
 
   /*
@@ -87,38 +90,15 @@ class LoadTWCDataJSON(filename:String = LoadTWCDataJSON.DEFAULT_FILENAME) {
    * Loading/initialization
    */
 
-  // Load the JSON file, and convert to storage classes referenced by look-up-tables.
-  def load(filenameIn:String, foldName:String):(Array[TWCObject], Map[String, TWCObject], Map[String, ArrayBuffer[TWCObject]]) = {
-    // Step 1: Load the TextWorld Common Sense object file
-    val jsonString = Source.fromFile(filenameIn).getLines.mkString
-    val dataRawAllFolds = ujson.read(jsonString).value.asInstanceOf[mutable.LinkedHashMap[String, Any]]
-
-    // Get specific fold (train, valid, test)
-    val dataRaw = dataRawAllFolds(foldName).asInstanceOf[ujson.Obj].value
-
-    // Step 2: Convert from the JSON format to an internal storage class (TWCObject)
-    val out = new ArrayBuffer[TWCObject]()
-    for (key <- dataRaw.keySet) {
-      val record = dataRaw(key).asInstanceOf[ujson.Obj].value
-      val name = record("name").toString().replaceAll("\"", "")
-      val locations = record("locations").asInstanceOf[ujson.Arr].value.map(_.toString().replaceAll("\"", "")).toArray
-      //println(record.toString())
-      out.append(new TWCObject(name, locations))
-    }
-
-    /*
-    for (i <- 0 until out.length) {
-      println(i + ": " + out(i).toString())
-    }
-     */
-
-    // Step 3: Make object look-up-table
+  // Index the objects of one fold with look-up-tables.
+  private def index(out:Array[TWCObject]):(Array[TWCObject], Map[String, TWCObject], Map[String, ArrayBuffer[TWCObject]]) = {
+    // Step 1: Make object look-up-table
     val lutObj = mutable.Map[String, TWCObject]()
     for (obj <- out) {
       lutObj(obj.name) = obj
     }
 
-    // Step 4: Make location look-up-table
+    // Step 2: Make location look-up-table
     val lutLocation = mutable.Map[String, ArrayBuffer[TWCObject]]()
     for (obj <- out) {
       for (location <- obj.locations) {
@@ -130,7 +110,7 @@ class LoadTWCDataJSON(filename:String = LoadTWCDataJSON.DEFAULT_FILENAME) {
     //println("lutLocation keys: " + lutLocation.keySet.mkString(", "))
 
     // Return
-    return (out.toArray, lutObj.toMap, lutLocation.toMap)
+    return (out, lutObj.toMap, lutLocation.toMap)
   }
 
 }
@@ -138,6 +118,72 @@ class LoadTWCDataJSON(filename:String = LoadTWCDataJSON.DEFAULT_FILENAME) {
 
 object LoadTWCDataJSON {
   val DEFAULT_FILENAME = "twc_objects.folds.json"
+  val FOLD_NAMES = Array("train", "valid", "test")
+  // Name of the data in compiled data files
+  val COMPILED_DATA_NAME = "twc"
+
+  // Load the objects in each fold (train, valid, test), from the compiled data file if there is one, or else from the JSON file
+  def loadObjects(filename:String):Map[String, Array[TWCObject]] = {
+    return CompiledData.load(filename, COMPILED_DATA_NAME, this.readCompiled).getOrElse( this.parseJSON(filename) )
+  }
+
+  // Load the JSON file, and convert to storage classes (TWCObject)
+  def parseJSON(filenameIn:String):Map[String, Array[TWCObject]] = {
+    // Step 1: Load the TextWorld Common Sense object file
+    val jsonString = Source.fromFile(filenameIn).getLines.mkString
+    val dataRawAllFolds = ujson.read(jsonString).value.asInstanceOf[mutable.LinkedHashMap[String, Any]]
+
+    val out = mutable.Map[String, Array[TWCObject]]()
+    for (foldName <- FOLD_NAMES) {
+      // Get specific fold (train, valid, test)
+      val dataRaw = dataRawAllFolds(foldName).asInstanceOf[ujson.Obj].value
+
+      // Step 2: Convert from the JSON format to an internal storage class (TWCObject)
+      val objs = new ArrayBuffer[TWCObject]()
+      for (key <- dataRaw.keySet) {
+        val record = dataRaw(key).asInstanceOf[ujson.Obj].value
+        val name = record("name").toString().replaceAll("\"", "")
+        val locations = record("locations").asInstanceOf[ujson.Arr].value.map(_.toString().replaceAll("\"", "")).toArray
+        objs.append(new TWCObject(name, locations))
+      }
+      out(foldName) = objs.toArray
+    }
+
+    return out.toMap
+  }
+
+  /*
+   * Compiled data file (see CompiledData): for each fold, its name and number of objects, then each object's name and locations
+   */
+  def writeCompiled(objsByFold:Map[String, Array[TWCObject]], sourceChecksum:Long, filenameOut:String): Unit = {
+    val writer = new CompiledDataWriter(COMPILED_DATA_NAME, sourceChecksum)
+    writer.writeInt(FOLD_NAMES.length)
+    for (foldName <- FOLD_NAMES) {
+      val objs = objsByFold(foldName)
+      writer.writeStr(foldName)
+      writer.writeInt(objs.length)
+      for (obj <- objs) {
+        writer.writeStr(obj.name)
+        writer.writeStrs(obj.locations)
+      }
+    }
+    writer.save(filenameOut)
+  }
+
+  def readCompiled(reader:CompiledDataReader):Map[String, Array[TWCObject]] = {
+    val out = mutable.Map[String, Array[TWCObject]]()
+    val numFolds = reader.readInt()
+    for (i <- 0 until numFolds) {
+      val foldName = reader.readStr()
+      val objs = new Array[TWCObject](reader.readInt())
+      for (j <- 0 until objs.length) {
+        val name = reader.readStr()
+        objs(j) = new TWCObject(name, reader.readStrs())
+      }
+      out(foldName) = objs
+    }
+    return out.toMap
+  }
 
   def main(args:Array[String]): Unit = {
     val d = new LoadTWCDataJSON()
@@ -1,9 +1,11 @@
 package textworldexpress.games
 
-import textworldexpress.data.{LoadTWCDataJSON, LoadCookingWorldDataJSON, RecipeIngredient}
+import java.util
+
+import textworldexpress.data.{DataRegistry, LoadTWCDataJSON, LoadCookingWorldDataJSON, RecipeIngredient}
 import textworldexpress.goldagent.{CoinGoldAgent, CookingWorldGoldAgent}
 import textworldexpress.objects.{Backyard, Bathroom, Bedroom, Coin, Cookbook, Corridor, DoorMaker, Driveway, FastObject, Kitchen, LaundryRoom, LivingRoom, Meal, Pantry, Room, Street, Supermarket}
-import textworldexpress.struct.{ActionHistory, GameScore, Scorer, StepResult, TextGame}
+import textworldexpress.struct.{ActionHistory, CopyableRandom, GameScore, Scorer, StateHasher, StepResult, TextGame}
 
 import scala.collection.mutable
 import scala.collection.mutable.{ArrayBuffer, ListBuffer}
@@ -65,7 +67,6 @@ class CoinGame(val locations:Array[Room], val taskObjects:ArrayBuffer[FastObject
   val scorer:Scorer = new CoinGameScoring(taskObjects)
 
   // A list of the most recently generated valid actions (for step() )
-  var lastValidActions = ListBuffer.empty[(String, Int, Array[FastObject])]
 
   // The action/observation history
   var history = new ArrayBuffer[ActionHistory]
@@ -74,93 +75,37 @@ class CoinGame(val locations:Array[Room], val taskObjects:ArrayBuffer[FastObject
   val inventoryMaxCapacity = this.taskObjects.length + 1
 
   // Internal game random number generator -- primarily for randomizing valid action list.
-  val random = new Random(seed)
+  val random = CopyableRandom.mkRandom(seed)
 
   /*
    * Cloning
    */
 
-  // TODO: Still not working (needs location map cloning)
+  // Deep copy of the current state of the game (map, objects, inventory, score, history, and random number generator),
+  // so that the copy can be played forward independently of this game.
   def deepCopy():CoinGame = {
-    val clonedTaskObjects = new ArrayBuffer[FastObject]
-
-    // Step 1: Clone locations
-    val locationsClone = new Array[Room](locations.length)
-    for (i <- 0 until locations.length) {
-      locationsClone(i) = locations(i).deepCopy(existingTaskObjects = taskObjects, copyTaskObjects = clonedTaskObjects)
-    }
-
-    // Step 2: Connect rooms
-    this.connectClonedMap(locationsClone)
-
-    // Step 3: Create new game
-    val game = new CoinGame(locationsClone, clonedTaskObjects, this.limitInventorySize, seed = this.seed, this.generationProperties)
-
-    // Also clone the agent inventory
-    game.agentInventory = this.agentInventory.deepCopy(existingTaskObjects = taskObjects, copyTaskObjects = clonedTaskObjects)
-
+    val copies = new util.IdentityHashMap[FastObject, FastObject]()
+    val game = new CoinGame(FastObject.copyOf(locations, copies), FastObject.copyOf(taskObjects, copies), this.limitInventorySize, seed = this.seed, this.generationProperties)
+
+    game.agentInventory = FastObject.copyOf(this.agentInventory, copies)
+    game.agentLocation = FastObject.copyOf(this.agentLocation, copies)
+    game.deletedObjects.appendAll( FastObject.copyOf(this.deletedObjects, copies) )
+    game.scorer.curScore = this.scorer.curScore
+    game.lastValidActions = this.copyValidActions(this.lastValidActions, copies)
+    game.history.appendAll(this.history)
+    CopyableRandom.copyState(this.random, game.random)
+    game.stepFields = this.stepFields
 
     // Return
     game
   }
 
-  // Connect a cloned array of locations in the same way as this map
-  private def connectClonedMap(locationsClone:Array[Room]): Unit = {
-    for (i <- 0 until locations.length) {
-      // Connect locations
-      // North
-      if (this.locations(i).locationNorth != null) {
-        val connectingLocationRef = this.getClonedLocationReference(locationsClone, this.locations(i).locationNorth.name)
-        locationsClone(i).locationNorth = connectingLocationRef
-        if (this.locations(i).doorNorth != null) {
-          val doorClone = this.locations(i).doorNorth.deepCopy()
-          locationsClone(i).doorNorth = doorClone
-          connectingLocationRef.doorSouth = doorClone
-        }
-      }
-
-      // South
-      if (this.locations(i).locationSouth != null) {
-        val connectingLocationRef = this.getClonedLocationReference(locationsClone, this.locations(i).locationSouth.name)
-        locationsClone(i).locationSouth = connectingLocationRef
-        if (this.locations(i).doorSouth != null) {
-          val doorClone = this.locations(i).doorSouth.deepCopy()
-          locationsClone(i).doorSouth = doorClone
-          connectingLocationRef.doorNorth = doorClone
-        }
-      }
-
-      // East
-      if (this.locations(i).locationEast != null) {
-        val connectingLocationRef = this.getClonedLocationReference(locationsClone, this.locations(i).locationEast.name)
-        locationsClone(i).locationEast = connectingLocationRef
-        if (this.locations(i).doorEast != null) {
-          val doorClone = this.locations(i).doorEast.deepCopy()
-          locationsClone(i).doorEast = doorClone
-          connectingLocationRef.doorWest = doorClone
-        }
-      }
-
-      // West
-      if (this.locations(i).locationWest != null) {
-        val connectingLocationRef = this.getClonedLocationReference(locationsClone, this.locations(i).locationWest.name)
-        locationsClone(i).locationWest = connectingLocationRef
-        if (this.locations(i).doorWest != null) {
-          val doorClone = this.locations(i).doorWest.deepCopy()
-          locationsClone(i).doorWest = doorClone
-          connectingLocationRef.doorEast = doorClone
-        }
-      }
-
-    }
-  }
+  /*
+   * State fingerprint
+   */
 
-  // Helper for above
-  private def getClonedLocationReference(locationsClone:Array[Room], name:String):Room = {
-    for (locationClone <- locationsClone) {
-      if (locationClone.name == name) return locationClone
-    }
-    throw new RuntimeException("getClonedLocationReference(): Location not found (this should never happen).  Location name (" + name + ").")
+  protected def hashState(hasher:StateHasher): Unit = {
+    this.hashWorld(hasher, this.locations, this.agentLocation, this.agentInventory, this.deletedObjects)
   }
 
   /*
@@ -488,17 +433,15 @@ class CoinGame(val locations:Array[Room], val taskObjects:ArrayBuffer[FastObject
   }
 
   def step(actionStr:String):StepResult = {
-    for (action <- lastValidActions) {
-      if (action._1 == actionStr) {
-        return this.step(actionStr, action._2, action._3)
-      }
-    }
-    // If we reach here, the action was invalid
-    return this.step(actionStr, ACTION_INVALID, Array.empty[FastObject])
+    val action = this.getValidAction(actionStr)
+    // If the action is not found, the action was invalid
+    if (action == null) return this.step(actionStr, ACTION_INVALID, Array.empty[FastObject])
+
+    return this.step(actionStr, action._2, action._3)
   }
 
   def step(validActionIdx:Int):StepResult = {
-    val action = this.lastValidActions(validActionIdx)
+    val action = this.getValidAction(validActionIdx)
     return this.step(action._1, action._2, action._3)
   }
 
@@ -516,20 +459,17 @@ class CoinGame(val locations:Array[Room], val taskObjects:ArrayBuffer[FastObject
     // Generate next valid actions
     val visibleObjects = this.getVisibleObjects()
     val validActions = this.mkActions(visibleObjects)
-    lastValidActions = validActions
-    var validActionStrs = new ArrayBuffer[String](validActions.length)
-    for (i <- 0 until validActions.length) validActionStrs.append(validActions(i)._1)
-    validActionStrs = random.shuffle(validActionStrs)
+    val validActionStrs = this.setValidActions(validActions, random)
 
     // Generate free-look and inventory strings
-    val freeLookStr = this.agentLocation.getDescription()
-    val inventoryStr = this.actionInventory()
+    val freeLookStr = if (this.includesField(StepResult.FIELD_LOOK)) this.agentLocation.getDescription() else null
+    val inventoryStr = if (this.includesField(StepResult.FIELD_INVENTORY)) this.actionInventory() else null
 
     // Add to action history
     this.history.append( new ActionHistory(actionStr, observationStr, curScores) )
 
     // Return
-    val result = new StepResult(observationStr=observationStr, freeLookStr=freeLookStr, inventoryStr=inventoryStr, validActions = validActionStrs.toArray, scoreRaw=curScores.scoreRaw, scoreNormalized=curScores.scoreNormalized, taskSuccess=curScores.taskSuccess, taskFailure=curScores.taskFailure, wasValidAction = wasValidAction)
+    val result = new StepResult(observationStr=observationStr, freeLookStr=freeLookStr, inventoryStr=inventoryStr, validActions = validActionStrs, scoreRaw=curScores.scoreRaw, scoreNormalized=curScores.scoreNormalized, taskSuccess=curScores.taskSuccess, taskFailure=curScores.taskFailure, wasValidAction = wasValidAction)
     return result
   }
 
@@ -538,8 +478,8 @@ class CoinGame(val locations:Array[Room], val taskObjects:ArrayBuffer[FastObject
 
 
 class CoinGameGenerator {
-  val TWCObjectDatabase = new LoadTWCDataJSON()
-  val CookingWorldObjectDatabase = new LoadCookingWorldDataJSON()
+  val TWCObjectDatabase = DataRegistry.getTWCData()
+  val CookingWorldObjectDatabase = DataRegistry.getCookingWorldData()
   val doorMaker = new DoorMaker()
 
 
@@ -872,15 +812,21 @@ class CoinGameGenerator {
 
 
   def mkGameWithGoldPath(seed:Long, numLocations:Int = 12, numDistractorItems:Int = 10, includeDoors:Boolean = true, limitInventorySize:Boolean = true, fold:String = "train"):(CoinGame, Array[String]) = {
+    val game = this.mkGame(seed, numLocations, numDistractorItems, includeDoors, limitInventorySize, fold)
+    return (game, this.mkGoldPath(game))
+  }
+
+  // Generate a gold path for a freshly generated (pristine) game.  The gold agent plays copies of the game, so the game itself is not changed.
+  def mkGoldPath(game:CoinGame):Array[String] = {
     val MAX_ATTEMPTS:Int = 50
-    val rg = new Random()
+    // Seeded from the game seed, so that the same game always gets the same gold path (gold paths are memoized by seed)
+    val rg = new Random(game.generationProperties("seed"))
 
     var attempts: Int = 0
     var goldPath = Array.empty[String]
     breakable {
       while (attempts < MAX_ATTEMPTS) {
-        val game = this.mkGame(seed, numLocations, numDistractorItems, includeDoors, limitInventorySize, fold)
-        val goldAgent = new CoinGoldAgent(game)
+        val goldAgent = new CoinGoldAgent(game.deepCopy())
         val (success, _goldPath) = goldAgent.mkGoldPath(rg)
         if (success) goldPath = _goldPath
 
@@ -892,9 +838,7 @@ class CoinGameGenerator {
       println ("ERROR: Unknown error: Gold path could not be generated after maximum number of attempts (" + MAX_ATTEMPTS + ").")
     }
 
-    // Create fresh copy of game
-    val game = this.mkGame(seed, numLocations, numDistractorItems, includeDoors, limitInventorySize, fold)
-    return (game, goldPath)
+    return goldPath
   }
 
 
@@ -1,9 +1,11 @@
 package textworldexpress.games
 
-import textworldexpress.data.{LoadTWCDataJSON, LoadCookingWorldDataJSON}
+import java.util
+
+import textworldexpress.data.{DataRegistry, LoadTWCDataJSON, LoadCookingWorldDataJSON}
 import textworldexpress.goldagent.{CoinGoldAgent, MapReaderConstraintsGoldAgent}
 import textworldexpress.objects.{Alley, Backyard, Bathroom, Bedroom, Box, Coin, Corridor, DoorMaker, Driveway, FastObject, Foyer, Garage, Kitchen, LaundryRoom, LivingRoom, Mapbook, Pantry, Room, Sideyard, Street, Supermarket}
-import textworldexpress.struct.{ActionHistory, GameScore, Scorer, StepResult, TextGame}
+import textworldexpress.struct.{ActionHistory, CopyableRandom, GameScore, Scorer, StateHasher, StepResult, TextGame}
 
 import scala.collection.mutable
 import scala.collection.mutable.{ArrayBuffer, ListBuffer}
@@ -61,9 +63,7 @@ class MapReaderConstraintsGameScoring(val taskObjects:ArrayBuffer[FastObject], b
 class MapReaderConstraintsGame(val locations:Array[Room], val taskObjects:ArrayBuffer[FastObject], val mapbook:Mapbook, val box:Box, val startLocation:Room, val endLocation:Room, val actualDistanceApart:Int, val limitInventorySize:Boolean, val seed:Long = 0, val generationProperties:Map[String, Int]) extends TextGame {
 
   // Inventory
-  var agentInventory = new FastObject("inventory")
-  // Add the map to the agent's inventory
-  agentInventory.addObject(mapbook)
+  var agentInventory = new FastObject("inventory")     // Note: The map is added to the inventory by the generator (so deepCopy() doesn't move it)
 
   // Initial location
   var agentLocation:Room = startLocation
@@ -75,7 +75,6 @@ class MapReaderConstraintsGame(val locations:Array[Room], val taskObjects:ArrayB
   val scorer:Scorer = new MapReaderConstraintsGameScoring(taskObjects, box)
 
   // A list of the most recently generated valid actions (for step() )
-  var lastValidActions = ListBuffer.empty[(String, Int, Array[FastObject])]
 
   // The action/observation history
   var history = new ArrayBuffer[ActionHistory]
@@ -84,7 +83,7 @@ class MapReaderConstraintsGame(val locations:Array[Room], val taskObjects:ArrayB
   val inventoryMaxCapacity = this.taskObjects.length + 1
 
   // Internal game random number generator -- primarily for randomizing valid action list.
-  val random = new Random(seed)
+  val random = CopyableRandom.mkRandom(seed)
 
   val taskDesc = "Your task is to take the coin that is located in the " + endLocation.name + ", and put it into the box found in the starting location."
 
@@ -93,10 +92,31 @@ class MapReaderConstraintsGame(val locations:Array[Room], val taskObjects:ArrayB
    * Cloning
    */
 
-  // TODO: Still not working (needs location map cloning)
+  // Deep copy of the current state of the game (map, objects, inventory, score, history, and random number generator),
+  // so that the copy can be played forward independently of this game.
   def deepCopy():MapReaderConstraintsGame = {
+    val copies = new util.IdentityHashMap[FastObject, FastObject]()
+    val game = new MapReaderConstraintsGame(FastObject.copyOf(locations, copies), FastObject.copyOf(taskObjects, copies), FastObject.copyOf(mapbook, copies), FastObject.copyOf(box, copies), FastObject.copyOf(startLocation, copies), FastObject.copyOf(endLocation, copies), actualDistanceApart, limitInventorySize, seed, generationProperties)
+
+    game.agentInventory = FastObject.copyOf(this.agentInventory, copies)
+    game.agentLocation = FastObject.copyOf(this.agentLocation, copies)
+    game.deletedObjects.appendAll( FastObject.copyOf(this.deletedObjects, copies) )
+    game.scorer.curScore = this.scorer.curScore
+    game.lastValidActions = this.copyValidActions(this.lastValidActions, copies)
+    game.history.appendAll(this.history)
+    CopyableRandom.copyState(this.random, game.random)
+    game.stepFields = this.stepFields
+
     // Return
-    new MapReaderConstraintsGame(locations, taskObjects, mapbook, box, startLocation, endLocation, actualDistanceApart, limitInventorySize, seed, generationProperties)
+    game
+  }
+
+  /*
+   * State fingerprint
+   */
+
+  protected def hashState(hasher:StateHasher): Unit = {
+    this.hashWorld(hasher, this.locations, this.agentLocation, this.agentInventory, this.deletedObjects)
   }
 
   /*
@@ -449,17 +469,15 @@ class MapReaderConstraintsGame(val locations:Array[Room], val taskObjects:ArrayB
   }
 
   def step(actionStr:String):StepResult = {
-    for (action <- lastValidActions) {
-      if (action._1 == actionStr) {
-        return this.step(actionStr, action._2, action._3)
-      }
-    }
-    // If we reach here, the action was invalid
-    return this.step(actionStr, ACTION_INVALID, Array.empty[FastObject])
+    val action = this.getValidAction(actionStr)
+    // If the action is not found, the action was invalid
+    if (action == null) return this.step(actionStr, ACTION_INVALID, Array.empty[FastObject])
+
+    return this.step(actionStr, action._2, action._3)
   }
 
   def step(validActionIdx:Int):StepResult = {
-    val action = this.lastValidActions(validActionIdx)
+    val action = this.getValidAction(validActionIdx)
     return this.step(action._1, action._2, action._3)
   }
 
@@ -477,20 +495,17 @@ class MapReaderConstraintsGame(val locations:Array[Room], val taskObjects:ArrayB
     // Generate next valid actions
     val visibleObjects = this.getVisibleObjects()
     val validActions = this.mkActions(visibleObjects)
-    lastValidActions = validActions
-    var validActionStrs = new ArrayBuffer[String](validActions.length)
-    for (i <- 0 until validActions.length) validActionStrs.append(validActions(i)._1)
-    validActionStrs = random.shuffle(validActionStrs)
+    val validActionStrs = this.setValidActions(validActions, random)
 
     // Generate free-look and inventory strings
-    val freeLookStr = this.agentLocation.getDescription()
-    val inventoryStr = this.actionInventory()
+    val freeLookStr = if (this.includesField(StepResult.FIELD_LOOK)) this.agentLocation.getDescription() else null
+    val inventoryStr = if (this.includesField(StepResult.FIELD_INVENTORY)) this.actionInventory() else null
 
     // Add to action history
     this.history.append( new ActionHistory(actionStr, observationStr, curScores) )
 
     // Return
-    val result = new StepResult(observationStr=observationStr, freeLookStr=freeLookStr, inventoryStr=inventoryStr, validActions = validActionStrs.toArray, scoreRaw=curScores.scoreRaw, scoreNormalized=curScores.scoreNormalized, taskSuccess=curScores.taskSuccess, taskFailure=curScores.taskFailure, wasValidAction = wasValidAction)
+    val result = new StepResult(observationStr=observationStr, freeLookStr=freeLookStr, inventoryStr=inventoryStr, validActions = validActionStrs, scoreRaw=curScores.scoreRaw, scoreNormalized=curScores.scoreNormalized, taskSuccess=curScores.taskSuccess, taskFailure=curScores.taskFailure, wasValidAction = wasValidAction)
     return result
   }
 
@@ -499,8 +514,8 @@ class MapReaderConstraintsGame(val locations:Array[Room], val taskObjects:ArrayB
 
 
 class MapReaderConstraintsGameGenerator {
-  val TWCObjectDatabase = new LoadTWCDataJSON()
-  val CookingWorldObjectDatabase = new LoadCookingWorldDataJSON()
+  val TWCObjectDatabase = DataRegistry.getTWCData()
+  val CookingWorldObjectDatabase = DataRegistry.getCookingWorldData()
   val doorMaker = new DoorMaker()
 
 
@@ -1017,12 +1032,20 @@ class MapReaderConstraintsGameGenerator {
     val (locations, taskObjects, mapbook, box, startLocation, endLocation, actualDistanceApart) = mkEnvironment(r, numLocations, maxDistanceApart, numDistractorItems, includeDoors, fold)
     props("actualDistanceApart") = actualDistanceApart
     val game = new MapReaderConstraintsGame( locations.toArray, taskObjects, mapbook, box, startLocation, endLocation, actualDistanceApart, limitInventorySize, generationProperties = props.toMap )
+    // Add the map to the agent's inventory
+    game.agentInventory.addObject(mapbook)
 
     return game
   }
 
 
   def mkGameWithGoldPath(seed:Long, numLocations:Int = 15, maxDistanceApart:Int = 1, numDistractorItems:Int = 0, includeDoors:Boolean = false, limitInventorySize:Boolean = false, fold:String = "train"):(MapReaderConstraintsGame, Array[String]) = {
+    val game = this.mkGame(seed, numLocations, maxDistanceApart, numDistractorItems, includeDoors, limitInventorySize, fold)
+    return (game, this.mkGoldPath(game))
+  }
+
+  // Generate a gold path for a freshly generated (pristine) game.  The gold agent plays copies of the game, so the game itself is not changed.
+  def mkGoldPath(game:MapReaderConstraintsGame):Array[String] = {
     val MAX_ATTEMPTS:Int = 1
     val rg = new Random()
 
@@ -1030,8 +1053,7 @@ class MapReaderConstraintsGameGenerator {
     var goldPath = Array.empty[String]
     breakable {
       while (attempts < MAX_ATTEMPTS) {
-        val game = this.mkGame(seed, numLocations, maxDistanceApart, numDistractorItems, includeDoors, limitInventorySize, fold)
-        val goldAgent = new MapReaderConstraintsGoldAgent(game)   //## TODO
+        val goldAgent = new MapReaderConstraintsGoldAgent(game.deepCopy())   //## TODO
         val (success, _goldPath) = goldAgent.mkGoldPath(rg)
         if (success) goldPath = _goldPath
 
@@ -1043,9 +1065,7 @@ class MapReaderConstraintsGameGenerator {
       println ("ERROR: Unknown error: Gold path could not be generated after maximum number of attempts (" + MAX_ATTEMPTS + ").")
     }
 
-    // Create fresh copy of game
-    val game = this.mkGame(seed, numLocations, maxDistanceApart, numDistractorItems, includeDoors, limitInventorySize, fold)
-    return (game, goldPath)
+    return goldPath
   }
 
 
@@ -1,9 +1,11 @@
 package textworldexpress.games
 
+import java.util
+
 import textworldexpress.goldagent.PeckingOrderGoldAgent
 import textworldexpress.objects.{Backyard, Bathroom, Bedroom, Box, BundleOfObjects, Coin, Corridor, DoorMaker, Driveway, FastObject, Instructions, Kitchen, LaundryRoom, LivingRoom, MathProblem, Pantry, Room, Street, Supermarket}
 import textworldexpress.preprocessing.ArithmeticProblem
-import textworldexpress.struct.{ActionHistory, GameScore, Scorer, StepResult, TextGame}
+import textworldexpress.struct.{ActionHistory, CopyableRandom, GameScore, Scorer, StateHasher, StepResult, TextGame}
 
 import scala.collection.mutable
 import scala.collection.mutable.{ArrayBuffer, ListBuffer}
@@ -12,7 +14,7 @@ import scala.util.control.Breaks.{break, breakable}
 
 
 
-class PeckingOrderScoring(val objectOrder:Array[FastObject], val inventory:FastObject) extends Scorer {
+class PeckingOrderScoring(val objectOrder:Array[FastObject], var inventory:FastObject) extends Scorer {
 
   def doScoring(): Unit = {
     // Check status of each object
@@ -83,10 +85,9 @@ class PeckingOrderGame(val locations:Array[Room], val objectOrder:Array[FastObje
   val deletedObjects = new ArrayBuffer[FastObject]()
 
   // Scorer
-  val scorer:Scorer = new PeckingOrderScoring(objectOrder, this.agentInventory)
+  val scorer = new PeckingOrderScoring(objectOrder, this.agentInventory)
 
   // A list of the most recently generated valid actions (for step() )
-  var lastValidActions = ListBuffer.empty[(String, Int, Array[FastObject])]
 
   // The action/observation history
   var history = new ArrayBuffer[ActionHistory]
@@ -95,20 +96,39 @@ class PeckingOrderGame(val locations:Array[Room], val objectOrder:Array[FastObje
   val inventoryMaxCapacity = 100    // Essentially unlimited
 
   // Internal game random number generator -- primarily for randomizing valid action list.
-  val random = new Random(seed)
+  val random = CopyableRandom.mkRandom(seed)
 
   /*
    * Cloning
    */
 
-  // TODO: Not implemented
+  // Deep copy of the current state of the game (map, objects, inventory, score, history, and random number generator),
+  // so that the copy can be played forward independently of this game.
   def deepCopy():PeckingOrderGame = {
-    println ("NOTE: deepCopy() not implemented -- returning a shallow copy")
+    val copies = new util.IdentityHashMap[FastObject, FastObject]()
+    val game = new PeckingOrderGame(FastObject.copyOf(locations, copies), FastObject.copyOf(objectOrder, copies), FastObject.copyOf(instructionBook, copies), seed, generationProperties)
+
+    game.agentInventory = FastObject.copyOf(this.agentInventory, copies)
+    game.agentLocation = FastObject.copyOf(this.agentLocation, copies)
+    game.deletedObjects.appendAll( FastObject.copyOf(this.deletedObjects, copies) )
+    game.scorer.inventory = game.agentInventory          // The scorer checks the order of items in the inventory
+    game.scorer.curScore = this.scorer.curScore
+    game.lastValidActions = this.copyValidActions(this.lastValidActions, copies)
+    game.history.appendAll(this.history)
+    CopyableRandom.copyState(this.random, game.random)
+    game.stepFields = this.stepFields
+
     // Return
-    return new PeckingOrderGame(locations, objectOrder, instructionBook, seed, generationProperties)
+    game
   }
 
+  /*
+   * State fingerprint
+   */
 
+  protected def hashState(hasher:StateHasher): Unit = {
+    this.hashWorld(hasher, this.locations, this.agentLocation, this.agentInventory, this.deletedObjects)
+  }
 
   /*
    * Generation Properties
@@ -465,17 +485,15 @@ class PeckingOrderGame(val locations:Array[Room], val objectOrder:Array[FastObje
   }
 
   def step(actionStr:String):StepResult = {
-    for (action <- lastValidActions) {
-      if (action._1 == actionStr) {
-        return this.step(actionStr, action._2, action._3)
-      }
-    }
-    // If we reach here, the action was invalid
-    return this.step(actionStr, ACTION_INVALID, Array.empty[FastObject])
+    val action = this.getValidAction(actionStr)
+    // If the action is not found, the action was invalid
+    if (action == null) return this.step(actionStr, ACTION_INVALID, Array.empty[FastObject])
+
+    return this.step(actionStr, action._2, action._3)
   }
 
   def step(validActionIdx:Int):StepResult = {
-    val action = this.lastValidActions(validActionIdx)
+    val action = this.getValidAction(validActionIdx)
     return this.step(action._1, action._2, action._3)
   }
 
@@ -496,20 +514,17 @@ class PeckingOrderGame(val locations:Array[Room], val objectOrder:Array[FastObje
     // Generate next valid actions
     val visibleObjects = this.getVisibleObjects()
     val validActions = this.mkActions(visibleObjects)
-    lastValidActions = validActions
-    var validActionStrs = new ArrayBuffer[String](validActions.length)
-    for (i <- 0 until validActions.length) validActionStrs.append(validActions(i)._1)
-    validActionStrs = random.shuffle(validActionStrs)
+    val validActionStrs = this.setValidActions(validActions, random)
 
     // Generate free-look and inventory strings
-    val freeLookStr = this.agentLocation.getDescription()
-    val inventoryStr = this.actionInventory()
+    val freeLookStr = if (this.includesField(StepResult.FIELD_LOOK)) this.agentLocation.getDescription() else null
+    val inventoryStr = if (this.includesField(StepResult.FIELD_INVENTORY)) this.actionInventory() else null
 
     // Add to action history
     this.history.append( new ActionHistory(actionStr, observationStr, curScores) )
 
     // Return
-    val result = new StepResult(observationStr=observationStr, freeLookStr=freeLookStr, inventoryStr=inventoryStr, validActions = validActionStrs.toArray, scoreRaw=curScores.scoreRaw, scoreNormalized=curScores.scoreNormalized, taskSuccess=curScores.taskSuccess, taskFailure=curScores.taskFailure, wasValidAction = wasValidAction)
+    val result = new StepResult(observationStr=observationStr, freeLookStr=freeLookStr, inventoryStr=inventoryStr, validActions = validActionStrs, scoreRaw=curScores.scoreRaw, scoreNormalized=curScores.scoreNormalized, taskSuccess=curScores.taskSuccess, taskFailure=curScores.taskFailure, wasValidAction = wasValidAction)
     return result
   }
 
@@ -617,6 +632,12 @@ class PeckingOrderGameGenerator {
 
 
   def mkGameWithGoldPath(seed:Long, fold:String = "train"):(PeckingOrderGame, Array[String]) = {
+    val game = this.mkGame(seed, fold)
+    return (game, this.mkGoldPath(game))
+  }
+
+  // Generate a gold path for a freshly generated (pristine) game.  The gold agent plays copies of the game, so the game itself is not changed.
+  def mkGoldPath(game:PeckingOrderGame):Array[String] = {
     val MAX_ATTEMPTS:Int = 50
     val rg = new Random()
 
@@ -624,8 +645,7 @@ class PeckingOrderGameGenerator {
     var goldPath = Array.empty[String]
     breakable {
       while (attempts < MAX_ATTEMPTS) {
-        val game = this.mkGame(seed, fold)
-        val goldAgent = new PeckingOrderGoldAgent(game)
+        val goldAgent = new PeckingOrderGoldAgent(game.deepCopy())
         val (success, _goldPath) = goldAgent.mkGoldPath(rg)
         if (success) goldPath = _goldPath
 
@@ -637,9 +657,7 @@ class PeckingOrderGameGenerator {
       println ("ERROR: Unknown error: Gold path could not be generated after maximum number of attempts (" + MAX_ATTEMPTS + ").")
     }
 
-    // Create fresh copy of game
-    val game = this.mkGame(seed, fold)
-    return (game, goldPath)
+    return goldPath
   }
 
 
@@ -1,8 +1,10 @@
 package textworldexpress.games
 
+import java.util
+
 import textworldexpress.goldagent.SimonSaysMemoryGoldAgent
 import textworldexpress.objects.FastObject
-import textworldexpress.struct.{ActionHistory, GameScore, Scorer, StepResult, TextGame}
+import textworldexpress.struct.{ActionHistory, CopyableRandom, GameScore, Scorer, StateHasher, StepResult, TextGame}
 
 import scala.collection.mutable
 import scala.collection.mutable.{ArrayBuffer, ListBuffer}
@@ -73,7 +75,6 @@ class SimonSaysMemoryGameScoring(val goldActionSequence:Array[String], history:A
 class SimonSaysMemoryGame(val goldActionSequence:Array[String], val possibleActions:Array[String], val seed:Long = 0, val generationProperties:Map[String, Int]) extends TextGame {
 
   // A list of the most recently generated valid actions (for step() )
-  var lastValidActions = ListBuffer.empty[(String, Int, Array[FastObject])]
 
   // The action/observation history
   var history = new ArrayBuffer[ActionHistory]
@@ -82,7 +83,7 @@ class SimonSaysMemoryGame(val goldActionSequence:Array[String], val possibleActi
   val scorer:Scorer = new SimonSaysGameScoring(goldActionSequence, history)
 
   // Internal game random number generator -- primarily for randomizing valid action list.
-  val random = new Random(seed)
+  val random = CopyableRandom.mkRandom(seed)
 
   // Current step
   var currentStep:Int = 0
@@ -91,14 +92,31 @@ class SimonSaysMemoryGame(val goldActionSequence:Array[String], val possibleActi
    * Cloning
    */
 
-  // TODO: Not implemented
+  // Deep copy of the current state of the game (current step, score, history, and random number generator),
+  // so that the copy can be played forward independently of this game.
   def deepCopy():SimonSaysMemoryGame = {
-    println ("NOTE: deepCopy() not implemented -- returning a shallow copy")
+    val copies = new util.IdentityHashMap[FastObject, FastObject]()
+    val game = new SimonSaysMemoryGame(goldActionSequence, possibleActions, seed, generationProperties)
+
+    game.currentStep = this.currentStep
+    game.scorer.curScore = this.scorer.curScore
+    game.lastValidActions = this.copyValidActions(this.lastValidActions, copies)
+    game.history.appendAll(this.history)          // Note: The scorer keeps a reference to the history, so it's copied into the existing buffer
+    CopyableRandom.copyState(this.random, game.random)
+    game.stepFields = this.stepFields
+
     // Return
-    return new SimonSaysMemoryGame(goldActionSequence, possibleActions, seed, generationProperties)
+    game
   }
 
+  /*
+   * State fingerprint
+   */
 
+  // The state is the current step of the sequence (whether the actions so far were correct is part of the score)
+  protected def hashState(hasher:StateHasher): Unit = {
+    hasher.addInt(this.currentStep)
+  }
 
   /*
    * Generation Properties
@@ -205,17 +223,15 @@ class SimonSaysMemoryGame(val goldActionSequence:Array[String], val possibleActi
   }
 
   def step(actionStr:String):StepResult = {
-    for (action <- lastValidActions) {
-      if (action._1 == actionStr) {
-        return this.step(actionStr, action._2, action._3)
-      }
-    }
-    // If we reach here, the action was invalid
-    return this.step(actionStr, ACTION_INVALID, Array.empty[FastObject])
+    val action = this.getValidAction(actionStr)
+    // If the action is not found, the action was invalid
+    if (action == null) return this.step(actionStr, ACTION_INVALID, Array.empty[FastObject])
+
+    return this.step(actionStr, action._2, action._3)
   }
 
   def step(validActionIdx:Int):StepResult = {
-    val action = this.lastValidActions(validActionIdx)
+    val action = this.getValidAction(validActionIdx)
     return this.step(action._1, action._2, action._3)
   }
 
@@ -231,15 +247,12 @@ class SimonSaysMemoryGame(val goldActionSequence:Array[String], val possibleActi
 
     // Generate next valid actions
     val validActions = this.mkActions(ListBuffer.empty[FastObject])
-    lastValidActions = validActions
-    var validActionStrs = new ArrayBuffer[String](validActions.length)
-    for (i <- 0 until validActions.length) validActionStrs.append(validActions(i)._1)
-    validActionStrs = random.shuffle(validActionStrs)
+    val validActionStrs = this.setValidActions(validActions, random)
 
 
     // Generate observation, free-look, and inventory strings
-    val freeLookStr = ""
-    val inventoryStr = ""
+    val freeLookStr = if (this.includesField(StepResult.FIELD_LOOK)) "" else null
+    val inventoryStr = if (this.includesField(StepResult.FIELD_INVENTORY)) "" else null
 
     val observationStr = this.mkObservation(curAction = actionStr, curStage = this.currentStep)                       //## Special to this task: Observation is generated, rather than coming from environment
 
@@ -261,7 +274,7 @@ class SimonSaysMemoryGame(val goldActionSequence:Array[String], val possibleActi
     this.currentStep += 1
 
     // Return
-    val result = new StepResult(observationStr=observationStr, freeLookStr=freeLookStr, inventoryStr=inventoryStr, validActions = validActionStrs.toArray, scoreRaw=curScores.scoreRaw, scoreNormalized=curScores.scoreNormalized, taskSuccess=curScores.taskSuccess, taskFailure=curScores.taskFailure, wasValidAction = wasValidAction)
+    val result = new StepResult(observationStr=observationStr, freeLookStr=freeLookStr, inventoryStr=inventoryStr, validActions = validActionStrs, scoreRaw=curScores.scoreRaw, scoreNormalized=curScores.scoreNormalized, taskSuccess=curScores.taskSuccess, taskFailure=curScores.taskFailure, wasValidAction = wasValidAction)
     return result
   }
 
@@ -347,6 +360,12 @@ class SimonSaysMemoryGameGenerator {
 
 
   def mkGameWithGoldPath(seed:Long, gameLength:Int = 5, numDistractors:Int = 3, verbose:Int = 0, fold:String = "train"):(SimonSaysMemoryGame, Array[String]) = {
+    val game = this.mkGame(seed, gameLength, numDistractors, verbose, fold)
+    return (game, this.mkGoldPath(game))
+  }
+
+  // Generate a gold path for a freshly generated (pristine) game.  The gold agent plays copies of the game, so the game itself is not changed.
+  def mkGoldPath(game:SimonSaysMemoryGame):Array[String] = {
     val MAX_ATTEMPTS:Int = 50
     val rg = new Random()
 
@@ -354,8 +373,7 @@ class SimonSaysMemoryGameGenerator {
     var goldPath = Array.empty[String]
     breakable {
       while (attempts < MAX_ATTEMPTS) {
-        val game = this.mkGame(seed, gameLength, numDistractors, verbose, fold)
-        val goldAgent = new SimonSaysMemoryGoldAgent(game)
+        val goldAgent = new SimonSaysMemoryGoldAgent(game.deepCopy())
         val (success, _goldPath) = goldAgent.mkGoldPath(rg)
         if (success) goldPath = _goldPath
 
@@ -367,9 +385,7 @@ class SimonSaysMemoryGameGenerator {
       println ("ERROR: Unknown error: Gold path could not be generated after maximum number of attempts (" + MAX_ATTEMPTS + ").")
     }
 
-    // Create fresh copy of game
-    val game = this.mkGame(seed, gameLength, numDistractors, verbose, fold)
-    return (game, goldPath)
+    return goldPath
   }
 
 
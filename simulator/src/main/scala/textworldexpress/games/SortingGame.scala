@@ -1,10 +1,12 @@
 package textworldexpress.games
 
+import java.util
+
 import textworldexpress.data.{LoadTWCDataJSON, LoadCookingWorldDataJSON, MathProblemGenerator, SortingProblemGenerator}
 import textworldexpress.goldagent.{ArithmeticGoldAgent, CoinGoldAgent, SortingGoldAgent}
 import textworldexpress.objects.{Backyard, Bathroom, Bedroom, Box, BundleOfObjects, Coin, Corridor, DoorMaker, Driveway, FastObject, Kitchen, LaundryRoom, LivingRoom, MathProblem, Pantry, Room, Street, Supermarket}
 import textworldexpress.preprocessing.ArithmeticProblem
-import textworldexpress.struct.{ActionHistory, GameScore, Scorer, StepResult, TextGame}
+import textworldexpress.struct.{ActionHistory, CopyableRandom, GameScore, Scorer, StateHasher, StepResult, TextGame}
 
 import scala.collection.mutable
 import scala.collection.mutable.{ArrayBuffer, ListBuffer}
@@ -97,7 +99,6 @@ class SortingGame(val locations:Array[Room], val itemsToSort:Array[FastObject],
   val scorer:Scorer = new SortingGameScoring(itemsToSort, answerBox)
 
   // A list of the most recently generated valid actions (for step() )
-  var lastValidActions = ListBuffer.empty[(String, Int, Array[FastObject])]
 
   // The action/observation history
   var history = new ArrayBuffer[ActionHistory]
@@ -106,76 +107,37 @@ class SortingGame(val locations:Array[Room], val itemsToSort:Array[FastObject],
   val inventoryMaxCapacity = 100    // Essentially unlimited
 
   // Internal game random number generator -- primarily for randomizing valid action list.
-  val random = new Random(seed)
+  val random = CopyableRandom.mkRandom(seed)
 
   /*
    * Cloning
    */
 
-  // TODO: Not implemented
+  // Deep copy of the current state of the game (map, objects, inventory, score, history, and random number generator),
+  // so that the copy can be played forward independently of this game.
   def deepCopy():SortingGame = {
-    println ("NOTE: deepCopy() not implemented -- returning a shallow copy")
-    // Return
-    return new SortingGame(locations, itemsToSort, answerBox, seed, generationProperties)
-  }
-
-  // Connect a cloned array of locations in the same way as this map
-  private def connectClonedMap(locationsClone:Array[Room]): Unit = {
-    for (i <- 0 until locations.length) {
-      // Connect locations
-      // North
-      if (this.locations(i).locationNorth != null) {
-        val connectingLocationRef = this.getClonedLocationReference(locationsClone, this.locations(i).locationNorth.name)
-        locationsClone(i).locationNorth = connectingLocationRef
-        if (this.locations(i).doorNorth != null) {
-          val doorClone = this.locations(i).doorNorth.deepCopy()
-          locationsClone(i).doorNorth = doorClone
-          connectingLocationRef.doorSouth = doorClone
-        }
-      }
-
-      // South
-      if (this.locations(i).locationSouth != null) {
-        val connectingLocationRef = this.getClonedLocationReference(locationsClone, this.locations(i).locationSouth.name)
-        locationsClone(i).locationSouth = connectingLocationRef
-        if (this.locations(i).doorSouth != null) {
-          val doorClone = this.locations(i).doorSouth.deepCopy()
-          locationsClone(i).doorSouth = doorClone
-          connectingLocationRef.doorNorth = doorClone
-        }
-      }
-
-      // East
-      if (this.locations(i).locationEast != null) {
-        val connectingLocationRef = this.getClonedLocationReference(locationsClone, this.locations(i).locationEast.name)
-        locationsClone(i).locationEast = connectingLocationRef
-        if (this.locations(i).doorEast != null) {
-          val doorClone = this.locations(i).doorEast.deepCopy()
-          locationsClone(i).doorEast = doorClone
-          connectingLocationRef.doorWest = doorClone
-        }
-      }
-
-      // West
-      if (this.locations(i).locationWest != null) {
-        val connectingLocationRef = this.getClonedLocationReference(locationsClone, this.locations(i).locationWest.name)
-        locationsClone(i).locationWest = connectingLocationRef
-        if (this.locations(i).doorWest != null) {
-          val doorClone = this.locations(i).doorWest.deepCopy()
-          locationsClone(i).doorWest = doorClone
-          connectingLocationRef.doorEast = doorClone
-        }
-      }
+    val copies = new util.IdentityHashMap[FastObject, FastObject]()
+    val game = new SortingGame(FastObject.copyOf(locations, copies), FastObject.copyOf(itemsToSort, copies), FastObject.copyOf(answerBox, copies), seed, generationProperties)
+
+    game.agentInventory = FastObject.copyOf(this.agentInventory, copies)
+    game.agentLocation = FastObject.copyOf(this.agentLocation, copies)
+    game.deletedObjects.appendAll( FastObject.copyOf(this.deletedObjects, copies) )
+    game.scorer.curScore = this.scorer.curScore
+    game.lastValidActions = this.copyValidActions(this.lastValidActions, copies)
+    game.history.appendAll(this.history)
+    CopyableRandom.copyState(this.random, game.random)
+    game.stepFields = this.stepFields
 
-    }
+    // Return
+    game
   }
 
-  // Helper for above
-  private def getClonedLocationReference(locationsClone:Array[Room], name:String):Room = {
-    for (locationClone <- locationsClone) {
-      if (locationClone.name == name) return locationClone
-    }
-    throw new RuntimeException("getClonedLocationReference(): Location not found (this should never happen).  Location name (" + name + ").")
+  /*
+   * State fingerprint
+   */
+
+  protected def hashState(hasher:StateHasher): Unit = {
+    this.hashWorld(hasher, this.locations, this.agentLocation, this.agentInventory, this.deletedObjects)
   }
 
   /*
@@ -515,17 +477,15 @@ class SortingGame(val locations:Array[Room], val itemsToSort:Array[FastObject],
   }
 
   def step(actionStr:String):StepResult = {
-    for (action <- lastValidActions) {
-      if (action._1 == actionStr) {
-        return this.step(actionStr, action._2, action._3)
-      }
-    }
-    // If we reach here, the action was invalid
-    return this.step(actionStr, ACTION_INVALID, Array.empty[FastObject])
+    val action = this.getValidAction(actionStr)
+    // If the action is not found, the action was invalid
+    if (action == null) return this.step(actionStr, ACTION_INVALID, Array.empty[FastObject])
+
+    return this.step(actionStr, action._2, action._3)
   }
 
   def step(validActionIdx:Int):StepResult = {
-    val action = this.lastValidActions(validActionIdx)
+    val action = this.getValidAction(validActionIdx)
     return this.step(action._1, action._2, action._3)
   }
 
@@ -543,20 +503,17 @@ class SortingGame(val locations:Array[Room], val itemsToSort:Array[FastObject],
     // Generate next valid actions
     val visibleObjects = this.getVisibleObjects()
     val validActions = this.mkActions(visibleObjects)
-    lastValidActions = validActions
-    var validActionStrs = new ArrayBuffer[String](validActions.length)
-    for (i <- 0 until validActions.length) validActionStrs.append(validActions(i)._1)
-    validActionStrs = random.shuffle(validActionStrs)
+    val validActionStrs = this.setValidActions(validActions, random)
 
     // Generate free-look and inventory strings
-    val freeLookStr = this.agentLocation.getDescription()
-    val inventoryStr = this.actionInventory()
+    val freeLookStr = if (this.includesField(StepResult.FIELD_LOOK)) this.agentLocation.getDescription() else null
+    val inventoryStr = if (this.includesField(StepResult.FIELD_INVENTORY)) this.actionInventory() else null
 
     // Add to action history
     this.history.append( new ActionHistory(actionStr, observationStr, curScores) )
 
     // Return
-    val result = new StepResult(observationStr=observationStr, freeLookStr=freeLookStr, inventoryStr=inventoryStr, validActions = validActionStrs.toArray, scoreRaw=curScores.scoreRaw, scoreNormalized=curScores.scoreNormalized, taskSuccess=curScores.taskSuccess, taskFailure=curScores.taskFailure, wasValidAction = wasValidAction)
+    val result = new StepResult(observationStr=observationStr, freeLookStr=freeLookStr, inventoryStr=inventoryStr, validActions = validActionStrs, scoreRaw=curScores.scoreRaw, scoreNormalized=curScores.scoreNormalized, taskSuccess=curScores.taskSuccess, taskFailure=curScores.taskFailure, wasValidAction = wasValidAction)
     return result
   }
 
@@ -644,6 +601,12 @@ class SortingGameGenerator {
 
 
   def mkGameWithGoldPath(seed:Long, fold:String = "train"):(SortingGame, Array[String]) = {
+    val game = this.mkGame(seed, fold)
+    return (game, this.mkGoldPath(game))
+  }
+
+  // Generate a gold path for a freshly generated (pristine) game.  The gold agent plays copies of the game, so the game itself is not changed.
+  def mkGoldPath(game:SortingGame):Array[String] = {
     val MAX_ATTEMPTS:Int = 50
     val rg = new Random()
 
@@ -651,8 +614,7 @@ class SortingGameGenerator {
     var goldPath = Array.empty[String]
     breakable {
       while (attempts < MAX_ATTEMPTS) {
-        val game = this.mkGame(seed, fold)
-        val goldAgent = new SortingGoldAgent(game)
+        val goldAgent = new SortingGoldAgent(game.deepCopy())
         val (success, _goldPath) = goldAgent.mkGoldPath(rg)
         if (success) goldPath = _goldPath
 
@@ -664,9 +626,7 @@ class SortingGameGenerator {
       println ("ERROR: Unknown error: Gold path could not be generated after maximum number of attempts (" + MAX_ATTEMPTS + ").")
     }
 
-    // Create fresh copy of game
-    val game = this.mkGame(seed, fold)
-    return (game, goldPath)
+    return goldPath
   }
 
 
@@ -1,6 +1,6 @@
 package textworldexpress.generator
 
-import textworldexpress.games.{SortingGameGenerator, ArithmeticGameGenerator, CoinGameGenerator, CookingWorldGameGenerator, MapReaderGameGenerator, TWCGameGenerator, SimonSaysGameGenerator, SimonSaysMemoryGameGenerator, PeckingOrderGameGenerator}
+import textworldexpress.games.{ArithmeticGame, ArithmeticGameGenerator, CoinGame, CoinGameGenerator, CookingWorldGame, CookingWorldGameGenerator, MapReaderGame, MapReaderGameGenerator, PeckingOrderGame, PeckingOrderGameGenerator, SimonSaysGame, SimonSaysGameGenerator, SimonSaysMemoryGame, SimonSaysMemoryGameGenerator, SortingGame, SortingGameGenerator, TWCGame, TWCGameGenerator}
 import textworldexpress.struct.TextGame
 
 /*
@@ -22,6 +22,9 @@ abstract class GameGenerator {
   // Makes a game (including generating a gold path)
   def mkGameWithGoldPath(seed:Long, fold:String):(TextGame, Array[String])
 
+  // Generates a gold path for a game made by this generator (with mkGame(), and not yet stepped).  The game is not changed.
+  def mkGoldPath(game:TextGame):Array[String]
+
 }
 
 
@@ -77,6 +80,10 @@ class GameGeneratorCookingWorld(val numLocations:Int=11, val numDistractorItems:
     return generator.mkGameWithGoldPath(seed=seed, numLocations=numLocations, numDistractorItems=numDistractorItems, numIngredients=numIngredients, includeDoors=includeDoors, limitInventorySize=limitInventorySize, fold=fold)
   }
 
+  def mkGoldPath(game:TextGame):Array[String] = {
+    return generator.mkGoldPath(game.asInstanceOf[CookingWorldGame])
+  }
+
 }
 
 
@@ -128,6 +135,10 @@ class GameGeneratorTWC(numLocations:Int = 3, numItemsToPutAway:Int = 4, includeD
     return generator.mkGameWithGoldPath(seed=seed, numLocations=numLocations, numItemsToPutAway=numItemsToPutAway, includeDoors=includeDoors, limitInventorySize=limitInventorySize, fold=fold)
   }
 
+  def mkGoldPath(game:TextGame):Array[String] = {
+    return generator.mkGoldPath(game.asInstanceOf[TWCGame])
+  }
+
 }
 
 
@@ -179,6 +190,10 @@ class GameGeneratorCoin(numLocations:Int = 11, numDistractorItems:Int = 0, inclu
     return generator.mkGameWithGoldPath(seed=seed, numLocations=numLocations, numDistractorItems=numDistractorItems, includeDoors=includeDoors, limitInventorySize=limitInventorySize, fold=fold)
   }
 
+  def mkGoldPath(game:TextGame):Array[String] = {
+    return generator.mkGoldPath(game.asInstanceOf[CoinGame])
+  }
+
 }
 
 
@@ -216,6 +231,7 @@ class GameGeneratorMapReader(numLocations:Int = 11, maxDistanceApart:Int = 3, ma
     val os = new StringBuilder()
     os.append("Game: Map Reader\n")
     os.append("numLocations: " + numLocations + "\n")
+    os.append("maxDistanceApart: " + maxDistanceApart + "\n")
     os.append("maxDistractorItemsPerLocation: " + maxDistractorItemsPerLocation + "\n")
     os.append("includeDoors: " + includeDoors + "\n")
     os.append("limitInventorySize: " + limitInventorySize + "\n")
@@ -233,6 +249,10 @@ class GameGeneratorMapReader(numLocations:Int = 11, maxDistanceApart:Int = 3, ma
     return generator.mkGameWithGoldPath(seed=seed, numLocations=numLocations, maxDistanceApart=maxDistanceApart, maxDistractorItemsPerLocation=maxDistractorItemsPerLocation, includeDoors=includeDoors, limitInventorySize=limitInventorySize, fold=fold)
   }
 
+  def mkGoldPath(game:TextGame):Array[String] = {
+    return generator.mkGoldPath(game.asInstanceOf[MapReaderGame])
+  }
+
 }
 
 
@@ -275,6 +295,10 @@ class GameGeneratorArithmetic() extends GameGenerator {
     return generator.mkGameWithGoldPath(seed=seed, fold=fold)
   }
 
+  def mkGoldPath(game:TextGame):Array[String] = {
+    return generator.mkGoldPath(game.asInstanceOf[ArithmeticGame])
+  }
+
 }
 
 /*
@@ -316,6 +340,10 @@ class GameGeneratorSorting() extends GameGenerator {
     return generator.mkGameWithGoldPath(seed=seed, fold=fold)
   }
 
+  def mkGoldPath(game:TextGame):Array[String] = {
+    return generator.mkGoldPath(game.asInstanceOf[SortingGame])
+  }
+
 }
 
 
@@ -365,6 +393,10 @@ class GameGeneratorSimonSays(gameLength:Int = 5, numDistractors:Int = 3) extends
     return generator.mkGameWithGoldPath(seed=seed, gameLength=gameLength, numDistractors=numDistractors, fold=fold)
   }
 
+  def mkGoldPath(game:TextGame):Array[String] = {
+    return generator.mkGoldPath(game.asInstanceOf[SimonSaysGame])
+  }
+
 }
 
 
@@ -415,6 +447,10 @@ class GameGeneratorSimonSaysMemory(gameLength:Int = 5, numDistractors:Int = 3, v
     return generator.mkGameWithGoldPath(seed=seed, gameLength=gameLength, numDistractors=numDistractors, verbose=verbose, fold=fold)
   }
 
+  def mkGoldPath(game:TextGame):Array[String] = {
+    return generator.mkGoldPath(game.asInstanceOf[SimonSaysMemoryGame])
+  }
+
 }
 
 
@@ -457,6 +493,10 @@ class GameGeneratorPeckingOrder() extends GameGenerator {
     return generator.mkGameWithGoldPath(seed=seed, fold=fold)
   }
 
+  def mkGoldPath(game:TextGame):Array[String] = {
+    return generator.mkGoldPath(game.asInstanceOf[PeckingOrderGame])
+  }
+
 }
 
 
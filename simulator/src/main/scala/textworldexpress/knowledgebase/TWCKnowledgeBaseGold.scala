@@ -1,6 +1,6 @@
 package textworldexpress.knowledgebase
 
-import textworldexpress.data.LoadTWCDataJSON
+import textworldexpress.data.{DataRegistry, LoadTWCDataJSON}
 import textworldexpress.tokenizer.Tokenizer
 
 import scala.collection.mutable
@@ -12,7 +12,7 @@ import scala.util.control.Breaks._
 /*
  * A gold object -> location knowledge graph for the TWC data
  */
-class TWCKnowledgeBaseGold(database:LoadTWCDataJSON = new LoadTWCDataJSON()) extends KnowledgeBase {
+class TWCKnowledgeBaseGold(database:LoadTWCDataJSON = DataRegistry.getTWCData()) extends KnowledgeBase {
   val rows = this.mkObjectLocationTable()
   val numColumns = rows(0).length
 
@@ -9,15 +9,6 @@ import scala.util.Random
 case class Door(val doorDescription:String, var _isOpen:Boolean) extends FastObject("door") {
   this.isOpen = _isOpen
 
-  // Attempt at a deep copy
-  def deepCopy():Door = {
-    // Door never contains anything or has any other properties, so cloning is cheap.
-    val out = new Door(this.doorDescription, this.isOpen)
-
-    // Return
-    out
-  }
-
   override def getDescription(): String = {
     return this.doorDescription
   }
@@ -1,15 +1,19 @@
 package textworldexpress.objects
 
+import java.util
+
 import textworldexpress.JSON
+import textworldexpress.struct.StateHasher
 
 import scala.collection.mutable
 import scala.collection.mutable.{ArrayBuffer, ListBuffer}
+import scala.reflect.ClassTag
 import scala.util.Random
 
 /*
  * Base object
  */
-class FastObject(val name:String) {
+class FastObject(val name:String) extends Cloneable {
   var isContainer:Boolean = false
   var isOpen:Boolean = false
   var isOpenable:Boolean = false
@@ -51,65 +55,83 @@ class FastObject(val name:String) {
   var prepositionReferent:String = "in "
 
   var currentContainer:FastObject = null
-  val contents = mutable.ArrayBuffer[FastObject]()
-
-
-  // Attempt at a deep copy
-  def deepCopy(existingTaskObjects:ArrayBuffer[FastObject], copyTaskObjects:ArrayBuffer[FastObject]):FastObject = {
-    val out = new FastObject(name)
-    out.isContainer = this.isContainer
-    out.isOpen = this.isOpen
-    out.isOpenable = this.isOpenable
-    out.isLocation = this.isLocation
-    out.isCookingDevice = this.isCookingDevice
-
-    out.isMovable = this.isMovable
-    out.isEdible = this.isEdible
-    out.isDrinkable = this.isDrinkable
-    out.isCuttable = this.isCuttable
-    out.isCut = this.isCut
-    out.isChopped = this.isChopped
-    out.isSliced = this.isSliced
-    out.isDiced = this.isDiced
-
-    out.isCookable = this.isCookable
-    out.needsCooking = this.needsCooking
-    out.isRaw = this.isRaw
-    out.isFried = this.isFried
-    out.isRoasted = this.isRoasted
-    out.isGrilled = this.isGrilled
-
-    out.isReadable = this.isReadable
-    out.readText = this.readText
-
-    out.isDeleted = this.isDeleted
-    out.isEaten = this.isEaten
-
-    out.indefinite = this.indefinite                    // OK to be a shallow copy?
-    out.canonicalLocations = this.canonicalLocations    // OK to be a shallow copy?
-    out.prepositionReferent = this.prepositionReferent
-
-    // Current Container
-    // Do not set -- set it automatically from cloning
+  var contents = mutable.ArrayBuffer[FastObject]()
 
-    // Contents
-    // Deep copy all contents
-    for (cObj <- this.contents) {
-      val clonedObject = cObj.deepCopy(existingTaskObjects, copyTaskObjects)
-      out.addObject( clonedObject )
-
-      // Check to see if this object should be on the task objects list
-      for (tObj <- existingTaskObjects) {
-        if (cObj.name == tObj.name) {
-          copyTaskObjects.append(clonedObject)
-        }
-      }
-    }
 
-    // Return
+  /*
+   * Cloning
+   */
+
+  // Deep copy of this object, and everything it's connected to (its container and contents, and for rooms, the
+  // neighbouring rooms and doors).  'copies' maps each original object to its copy, so that objects that are referenced
+  // more than once (e.g. task objects, or doors shared by two rooms) are only copied once.
+  def deepCopy(copies:util.IdentityHashMap[FastObject, FastObject]):FastObject = {
+    val existingCopy = copies.get(this)
+    if (existingCopy != null) return existingCopy
+
+    // Shallow copy of all properties (this keeps the subclass, e.g. Fridge or Box, and its overridden descriptions)
+    val out = super.clone().asInstanceOf[FastObject]
+    copies.put(this, out)
+
+    // Then deep copy any references to other objects
+    this.copyReferences(out, copies)
     out
   }
 
+  protected def copyReferences(out:FastObject, copies:util.IdentityHashMap[FastObject, FastObject]): Unit = {
+    out.currentContainer = FastObject.copyOf(this.currentContainer, copies)
+    out.contents = new ArrayBuffer[FastObject](this.contents.length)
+    for (obj <- this.contents) {
+      out.contents.append( obj.deepCopy(copies) )
+    }
+  }
+
+
+  /*
+   * State fingerprint
+   */
+
+  // Add the state of this object (its name, properties, and contents, in order) to a state hash
+  def hashState(hasher:StateHasher): Unit = {
+    hasher.addStr(this.name)
+
+    // Properties, as bits
+    var flags:Long = 0
+    flags = (flags << 1) | (if (isContainer) 1 else 0)
+    flags = (flags << 1) | (if (isOpen) 1 else 0)
+    flags = (flags << 1) | (if (isOpenable) 1 else 0)
+    flags = (flags << 1) | (if (isLocation) 1 else 0)
+    flags = (flags << 1) | (if (isCookingDevice) 1 else 0)
+    flags = (flags << 1) | (if (isMovable) 1 else 0)
+    flags = (flags << 1) | (if (isEdible) 1 else 0)
+    flags = (flags << 1) | (if (isDrinkable) 1 else 0)
+    flags = (flags << 1) | (if (isCuttable) 1 else 0)
+    flags = (flags << 1) | (if (isCut) 1 else 0)
+    flags = (flags << 1) | (if (isChopped) 1 else 0)
+    flags = (flags << 1) | (if (isSliced) 1 else 0)
+    flags = (flags << 1) | (if (isDiced) 1 else 0)
+    flags = (flags << 1) | (if (isCookable) 1 else 0)
+    flags = (flags << 1) | (if (needsCooking) 1 else 0)
+    flags = (flags << 1) | (if (isRaw) 1 else 0)
+    flags = (flags << 1) | (if (isFried) 1 else 0)
+    flags = (flags << 1) | (if (isRoasted) 1 else 0)
+    flags = (flags << 1) | (if (isGrilled) 1 else 0)
+    flags = (flags << 1) | (if (isReadable) 1 else 0)
+    flags = (flags << 1) | (if (hasBeenRead) 1 else 0)
+    flags = (flags << 1) | (if (isDeleted) 1 else 0)
+    flags = (flags << 1) | (if (isEaten) 1 else 0)
+    hasher.addLong(flags)
+    // Texts can be long, and do not change during a game, so they are added by their (cached) hash code
+    hasher.addInt(this.readText.hashCode)
+
+    hasher.addInt(this.contents.length)
+    var i:Int = 0
+    while (i < this.contents.length) {
+      this.contents(i).hashState(hasher)
+      i += 1
+    }
+  }
+
 
   /*
    * Accessors
@@ -311,6 +333,25 @@ class FastObject(val name:String) {
 }
 
 
+object FastObject {
+
+  // Deep copy helpers (see FastObject.deepCopy() ).  These keep the type of the object(s) being copied.
+  def copyOf[T <: FastObject](obj:T, copies:util.IdentityHashMap[FastObject, FastObject]):T = {
+    if (obj == null) return obj
+    return obj.deepCopy(copies).asInstanceOf[T]
+  }
+
+  def copyOf[T <: FastObject : ClassTag](objs:Array[T], copies:util.IdentityHashMap[FastObject, FastObject]):Array[T] = {
+    return objs.map(copyOf(_, copies))
+  }
+
+  def copyOf[T <: FastObject](objs:ArrayBuffer[T], copies:util.IdentityHashMap[FastObject, FastObject]):ArrayBuffer[T] = {
+    return objs.map(copyOf(_, copies))
+  }
+
+}
+
+
 /*
  * Rooms
  */
@@ -330,51 +371,31 @@ class Room(name:String) extends FastObject(name) {
   var doorWest:Door = null
 
 
-  // Attempt at a deep copy
-  override def deepCopy(existingTaskObjects:ArrayBuffer[FastObject], copyTaskObjects:ArrayBuffer[FastObject]):Room = {
-    // Door never contains anything or has any other properties, so cloning is cheap.
-    val out = new Room(this.name)
-    out.prefersConnectingTo = this.prefersConnectingTo    // Shallow copy OK?
-
-    // Contents
-    // Deep copy all contents
-    for (cObj <- this.contents) {
-      //##
-      //val containerName = if (this.currentContainer == null) "null" else this.currentContainer.name
-      //println ("\t Cloning (" + containerName + "): " + cObj.name )
-
-      val clonedObject = cObj.deepCopy(existingTaskObjects, copyTaskObjects)
-      out.addObject( clonedObject )
-
-      // Check to see if this object should be on the task objects list
-      for (tObj <- existingTaskObjects) {
-        if (cObj.name == tObj.name) {
-          copyTaskObjects.append(clonedObject)
-        }
-      }
-    }
-
-    /*
-    // Doors -- can deep copy these
-    if (this.doorNorth != null) out.doorNorth = this.doorNorth.deepCopy(existingTaskObjects, copyTaskObjects)
-    if (this.doorSouth != null) out.doorSouth = this.doorSouth.deepCopy(existingTaskObjects, copyTaskObjects)
-    if (this.doorEast != null) out.doorEast = this.doorEast.deepCopy(existingTaskObjects, copyTaskObjects)
-    if (this.doorWest != null) out.doorWest = this.doorWest.deepCopy(existingTaskObjects, copyTaskObjects)
-     */
+  // Deep copy the connections to neighbouring rooms (and the doors to them)
+  override protected def copyReferences(out:FastObject, copies:util.IdentityHashMap[FastObject, FastObject]): Unit = {
+    super.copyReferences(out, copies)
 
-    /*
-    // Locations: Deep copy these (recursively)
-    if (this.locationNorth != null) out.locationNorth = this.locationNorth.deepCopy(existingTaskObjects, copyTaskObjects)
-    if (this.locationSouth != null) out.locationSouth = this.locationSouth.deepCopy(existingTaskObjects, copyTaskObjects)
-    if (this.locationEast != null) out.locationEast = this.locationEast.deepCopy(existingTaskObjects, copyTaskObjects)
-    if (this.locationWest != null) out.locationWest = this.locationWest.deepCopy(existingTaskObjects, copyTaskObjects)
-     */
+    val room = out.asInstanceOf[Room]
+    room.locationNorth = FastObject.copyOf(this.locationNorth, copies)
+    room.locationSouth = FastObject.copyOf(this.locationSouth, copies)
+    room.locationEast = FastObject.copyOf(this.locationEast, copies)
+    room.locationWest = FastObject.copyOf(this.locationWest, copies)
 
-    // Return
-    out
+    room.doorNorth = FastObject.copyOf(this.doorNorth, copies)
+    room.doorSouth = FastObject.copyOf(this.doorSouth, copies)
+    room.doorEast = FastObject.copyOf(this.doorEast, copies)
+    room.doorWest = FastObject.copyOf(this.doorWest, copies)
   }
 
 
+  // The connections between rooms do not change, but their doors can be opened or closed
+  override def hashState(hasher:StateHasher): Unit = {
+    super.hashState(hasher)
+    for (door <- Array(this.doorNorth, this.doorSouth, this.doorEast, this.doorWest)) {
+      hasher.addBoolean(door != null)
+      if (door != null) hasher.addBoolean(door.isOpen)
+    }
+  }
 
   private def mkDirectionDescription(location:Room, door:Door, directionName:String):String = {
     if (location != null) {
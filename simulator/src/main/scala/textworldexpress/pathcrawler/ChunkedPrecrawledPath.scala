@@ -0,0 +1,336 @@
+package textworldexpress.pathcrawler
+
+import java.io.{BufferedOutputStream, ByteArrayOutputStream, DataOutputStream, FileOutputStream}
+import java.nio.ByteBuffer
+import java.nio.channels.FileChannel
+import java.nio.charset.StandardCharsets
+import java.nio.file.{Paths, StandardOpenOption}
+
+import textworldexpress.struct.ConcurrentStringVocabulary
+
+import scala.collection.mutable
+
+
+// Receives each node of a crawl once it is finished (i.e. after all of its children), and returns the node that its
+// parents should refer to (see PathCrawler.setOutput() ).  Called from many crawling threads at once.
+trait CrawlOutput {
+  def finishNode(node:PrecrawledPathNode):PrecrawledPathNode
+}
+
+
+/*
+ * Streams a crawl to disk as it runs, in a chunked binary format, so that the crawl never has to be held in memory
+ * (the crawler only keeps a small reference node, with the node's ID, for each finished node).
+ * Node IDs are assigned in the order nodes are finished, so children always come before their parents, and the root
+ * is the last node.  Nodes are buffered, and written in chunks of 'nodesPerChunk' nodes.  Each chunk of nodes is
+ * preceded by a chunk with the strings that were added to the crawler's string LUT ('vocabulary') since the last chunk,
+ * so a file can be read in order.  The file ends with a chunk with the root node ID, which is written by finish().
+ * The format is described in ChunkedPrecrawledPath.
+ */
+class ChunkedPathWriter(val filename:String, vocabulary:ConcurrentStringVocabulary, val nodesPerChunk:Int = ChunkedPrecrawledPath.NODES_PER_CHUNK) extends CrawlOutput {
+  private val out = new DataOutputStream(new BufferedOutputStream(new FileOutputStream(filename), 1 << 16))
+  out.writeInt(ChunkedPrecrawledPath.MAGIC)
+  out.writeInt(ChunkedPrecrawledPath.VERSION)
+
+  // Nodes that have not been written yet
+  private val chunkBytes = new ByteArrayOutputStream()
+  private val chunkOut = new DataOutputStream(chunkBytes)
+  private val chunkRecordLengths = new mutable.ArrayBuilder.ofInt()
+  private var chunkFirstId:Int = 0
+
+  private var numNodes:Int = 0
+  private var numStringsWritten:Int = 0
+
+  def getNumNodes():Int = synchronized { this.numNodes }
+
+  def getNumStrings():Int = synchronized { this.numStringsWritten }
+
+  def finishNode(node:PrecrawledPathNode):PrecrawledPathNode = synchronized {
+    val id = this.numNodes
+    this.numNodes += 1
+
+    val startSize = this.chunkBytes.size()
+    ChunkedPrecrawledPath.writeNode(this.chunkOut, node, this.vocabulary)
+    this.chunkRecordLengths += (this.chunkBytes.size() - startSize)
+
+    if (this.numNodes - this.chunkFirstId >= this.nodesPerChunk) this.writeChunk()
+    return PrecrawledPathNode.mkReference(id)
+  }
+
+  // Write the remaining nodes, and the end of the file, with the ID of the root node
+  def finish(root:PrecrawledPathNode): Unit = synchronized {
+    this.writeChunk()
+    this.out.writeInt(ChunkedPrecrawledPath.CHUNK_END)
+    this.out.writeInt(12)
+    this.out.writeInt(root.id)
+    this.out.writeInt(this.numNodes)
+    this.out.writeInt(this.numStringsWritten)
+    this.close()
+  }
+
+  // Close the file.  Files that are closed without finish() (e.g. because the crawl was cancelled) can not be loaded.
+  def close(): Unit = synchronized {
+    this.out.close()
+  }
+
+  private def writeChunk(): Unit = {
+    // The new strings go first, so that every string that the nodes refer to has already been read
+    val strs = this.vocabulary.getStrs(this.numStringsWritten)
+    if (strs.nonEmpty) {
+      val strBytes = strs.map(_.getBytes(StandardCharsets.UTF_8))
+      this.out.writeInt(ChunkedPrecrawledPath.CHUNK_STRINGS)
+      this.out.writeInt(8 + strBytes.map(4 + _.length).sum)
+      this.out.writeInt(this.numStringsWritten)
+      this.out.writeInt(strBytes.length)
+      for (bytes <- strBytes) {
+        this.out.writeInt(bytes.length)
+        this.out.write(bytes)
+      }
+      this.numStringsWritten += strs.length
+    }
+
+    val recordLengths = this.chunkRecordLengths.result()
+    if (recordLengths.nonEmpty) {
+      this.chunkOut.flush()
+      this.out.writeInt(ChunkedPrecrawledPath.CHUNK_NODES)
+      this.out.writeInt(8 + (4 * recordLengths.length) + this.chunkBytes.size())
+      this.out.writeInt(this.chunkFirstId)
+      this.out.writeInt(recordLengths.length)
+      for (length <- recordLengths) this.out.writeInt(length)
+      this.chunkBytes.writeTo(this.out)
+    }
+
+    this.chunkBytes.reset()
+    this.chunkRecordLengths.clear()
+    this.chunkFirstId = this.numNodes
+  }
+
+}
+
+
+/*
+ * Reads a crawl that was written by ChunkedPathWriter.  Loading only reads the strings, and indexes where each node is
+ * stored in the file: nodes are read (and decoded) from the file when they are requested, so very large crawls can be
+ * used without loading them into memory.  Reading nodes is thread-safe.
+ *
+ * File format (all values are big-endian ints, unless noted):
+ *   header:        MAGIC, VERSION
+ *   chunks:        chunk type, payload length in bytes, payload
+ *     strings:     ID of the first string, number of strings, then each string (length, then UTF-8 bytes)
+ *     nodes:       ID of the first node, number of nodes, the length of each node record, then the node records
+ *     end:         ID of the root node, number of nodes, number of strings
+ *   node record:   obs, look, inv, number of valid actions, valid actions, score (double), normalized score (double),
+ *                  flags (byte: 1 = success, 2 = failure, 4 = valid action), number of steps, then each step (action
+ *                  string ID, node ID)
+ */
+class ChunkedPrecrawledPath(val filename:String) {
+  private val channel = FileChannel.open(Paths.get(filename), StandardOpenOption.READ)
+
+  // Index of the nodes in the file
+  private var nodeOffsets:Array[Long] = Array.empty[Long]
+  private var nodeLengths:Array[Int] = Array.empty[Int]
+
+  var stringLUT:Array[String] = Array.empty[String]
+  var rootIdx:Int = -1
+
+  try {
+    this.index()
+  } catch {
+    case e:Throwable => {
+      this.channel.close()
+      throw e
+    }
+  }
+
+  lazy val stringToIDXLUT:Map[String, Int] = this.stringLUT.zipWithIndex.toMap
+
+  def sizeNodes():Int = this.nodeOffsets.length
+  def sizeStrings():Int = this.stringLUT.length
+
+  /*
+   * Accessors
+   */
+  def getNode(nodeIdx:Int):PrecrawledNode = {
+    return ChunkedPrecrawledPath.readNode( this.read(this.nodeOffsets(nodeIdx), this.nodeLengths(nodeIdx)) )
+  }
+
+  def getStartNode():PrecrawledNode = {
+    return this.getNode(this.rootIdx)
+  }
+
+  def takeAction(curNode:PrecrawledNode, requestedActionStr:String):Option[PrecrawledNode] = {
+    val idx = this.stringToIDXLUT.getOrElse(requestedActionStr, -1)
+    if (idx == -1) return None
+    if (!curNode.steps.contains(idx)) return None
+
+    return Some(this.getNode(curNode.steps(idx)))
+  }
+
+  // Load all the nodes, as a PrecrawledPath (which has the start node first, so node IDs are renumbered)
+  def toPrecrawledPath():PrecrawledPath = {
+    // The root is the last node, so reversing the node order puts it first
+    val lastIdx = this.sizeNodes() - 1
+    if (this.rootIdx != lastIdx) throw new RuntimeException("ERROR: Root node (" + this.rootIdx + ") is not the last node (" + lastIdx + ").")
+
+    val nodeLUT = new Array[PrecrawledNode](this.sizeNodes())
+    for (i <- 0 until this.sizeNodes()) {
+      val node = this.getNode(i)
+      nodeLUT(lastIdx - i) = new PrecrawledNode(node.result, node.steps.map(step => (step._1, lastIdx - step._2)))
+    }
+    return new PrecrawledPath(nodeLUT = nodeLUT, stringLUT = this.stringLUT)
+  }
+
+  def close(): Unit = {
+    this.channel.close()
+  }
+
+  /*
+   * Indexing
+   */
+  private def index(): Unit = {
+    val fileSize = this.channel.size()
+    val header = this.read(0, 8)
+    if (header.getInt() != ChunkedPrecrawledPath.MAGIC) throw new RuntimeException("ERROR: Not a chunked precrawled path file (" + filename + ").")
+    val version = header.getInt()
+    if (version != ChunkedPrecrawledPath.VERSION) throw new RuntimeException("ERROR: Unsupported chunked precrawled path version (" + version + ", expected " + ChunkedPrecrawledPath.VERSION + ").")
+
+    val offsets = new mutable.ArrayBuilder.ofLong()
+    val lengths = new mutable.ArrayBuilder.ofInt()
+    val strings = new mutable.ArrayBuffer[String]()
+    var numNodes:Int = 0
+
+    var pos:Long = 8
+    while (pos < fileSize) {
+      val chunkHeader = this.read(pos, 8)
+      val chunkType = chunkHeader.getInt()
+      val payloadLength = chunkHeader.getInt()
+      val payloadPos = pos + 8
+
+      chunkType match {
+        case ChunkedPrecrawledPath.CHUNK_STRINGS => {
+          val payload = this.read(payloadPos, payloadLength)
+          val firstIdx = payload.getInt()
+          if (firstIdx != strings.length) throw new RuntimeException("ERROR: Strings are out of order (expected " + strings.length + ", found " + firstIdx + ").")
+          val count = payload.getInt()
+          for (_ <- 0 until count) {
+            val bytes = new Array[Byte](payload.getInt())
+            payload.get(bytes)
+            strings.append(new String(bytes, StandardCharsets.UTF_8))
+          }
+        }
+        case ChunkedPrecrawledPath.CHUNK_NODES => {
+          // Only the record lengths are read (the records themselves are read when they are requested)
+          val nodesHeader = this.read(payloadPos, 8)
+          val firstId = nodesHeader.getInt()
+          if (firstId != numNodes) throw new RuntimeException("ERROR: Nodes are out of order (expected " + numNodes + ", found " + firstId + ").")
+          val count = nodesHeader.getInt()
+          val recordLengths = this.read(payloadPos + 8, 4 * count)
+          var recordPos:Long = payloadPos + 8 + (4 * count)
+          for (_ <- 0 until count) {
+            val length = recordLengths.getInt()
+            offsets += recordPos
+            lengths += length
+            recordPos += length
+          }
+          numNodes += count
+        }
+        case ChunkedPrecrawledPath.CHUNK_END => {
+          val payload = this.read(payloadPos, payloadLength)
+          this.rootIdx = payload.getInt()
+          val expectedNodes = payload.getInt()
+          val expectedStrings = payload.getInt()
+          if ((expectedNodes != numNodes) || (expectedStrings != strings.length)) throw new RuntimeException("ERROR: Chunked precrawled path is inconsistent (" + numNodes + " nodes and " + strings.length + " strings, expected " + expectedNodes + " and " + expectedStrings + ").")
+        }
+        case _ => throw new RuntimeException("ERROR: Unknown chunk type (" + chunkType + ") at offset " + pos + ".")
+      }
+
+      pos = payloadPos + payloadLength
+    }
+
+    if (this.rootIdx < 0) throw new RuntimeException("ERROR: Chunked precrawled path is incomplete (" + filename + "), e.g. because the crawl was cancelled.")
+
+    this.nodeOffsets = offsets.result()
+    this.nodeLengths = lengths.result()
+    this.stringLUT = strings.toArray
+  }
+
+  // Read 'length' bytes at 'pos' (positional reads, so that many threads can read at once)
+  private def read(pos:Long, length:Int):ByteBuffer = {
+    val buffer = ByteBuffer.allocate(length)
+    while (buffer.hasRemaining) {
+      if (this.channel.read(buffer, pos + buffer.position()) < 0) throw new RuntimeException("ERROR: Unexpected end of file (" + filename + ").")
+    }
+    buffer.flip()
+    return buffer
+  }
+
+}
+
+
+object ChunkedPrecrawledPath {
+  val MAGIC:Int = 0x54575850     // "TWXP"
+  val VERSION:Int = 1
+  val EXTENSION:String = ".twxp"
+
+  val CHUNK_STRINGS:Int = 1
+  val CHUNK_NODES:Int = 2
+  val CHUNK_END:Int = 3
+
+  val NODES_PER_CHUNK:Int = 4096
+
+  private val FLAG_SUCCESS:Int = 1
+  private val FLAG_FAILURE:Int = 2
+  private val FLAG_VALID:Int = 4
+
+  def load(filename:String):ChunkedPrecrawledPath = {
+    println (" * Loading chunked precrawled path (" + filename + ").")
+    val out = new ChunkedPrecrawledPath(filename)
+    println (" * Successfully indexed (" + out.sizeNodes() + " nodes, " + out.sizeStrings() + " strings).")
+    return out
+  }
+
+  // Write one node.  Its children must already have their IDs (see ChunkedPathWriter).
+  def writeNode(out:DataOutputStream, node:PrecrawledPathNode, vocabulary:ConcurrentStringVocabulary): Unit = {
+    val result = node.stepResult
+    out.writeInt(result.obs)
+    out.writeInt(result.look)
+    out.writeInt(result.inv)
+    out.writeInt(result.acts.length)
+    for (act <- result.acts) out.writeInt(act)
+    out.writeDouble(result.score)
+    out.writeDouble(result.scoreNorm)
+    var flags:Int = 0
+    if (result.succ) flags |= FLAG_SUCCESS
+    if (result.fail) flags |= FLAG_FAILURE
+    if (result.valid) flags |= FLAG_VALID
+    out.writeByte(flags)
+
+    out.writeInt(node.validSteps.size)
+    for ((actionStr, child) <- node.validSteps) {
+      out.writeInt(vocabulary.getId(actionStr))
+      out.writeInt(child.id)
+    }
+  }
+
+  def readNode(in:ByteBuffer):PrecrawledNode = {
+    val obs = in.getInt()
+    val look = in.getInt()
+    val inv = in.getInt()
+    val acts = new Array[Int](in.getInt())
+    for (i <- 0 until acts.length) acts(i) = in.getInt()
+    val score = in.getDouble()
+    val scoreNorm = in.getDouble()
+    val flags = in.get().toInt
+    val result = new StepResultHashed(obs = obs, look = look, inv = inv, acts = acts, score = score, scoreNorm = scoreNorm, succ = (flags & FLAG_SUCCESS) != 0, fail = (flags & FLAG_FAILURE) != 0, valid = (flags & FLAG_VALID) != 0)
+
+    val numSteps = in.getInt()
+    val steps = new mutable.HashMap[Int, Int]()
+    for (_ <- 0 until numSteps) {
+      val actionStrIdx = in.getInt()
+      steps(actionStrIdx) = in.getInt()
+    }
+
+    return new PrecrawledNode(result = result, steps = steps.toMap)
+  }
+
+}
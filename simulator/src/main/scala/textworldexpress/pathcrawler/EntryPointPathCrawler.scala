@@ -1,5 +1,7 @@
 package textworldexpress.pathcrawler
 
+import java.util
+
 import textworldexpress.generator.GameGenerator
 import textworldexpress.struct.{StepResult, TextGame}
 
@@ -311,7 +313,7 @@ class PrecrawledPathNode(val stepResult:StepResultHashed, val validSteps:Map[Str
   // A unique ID for this node
   var id:Int = -1
 
-  // Size of the tree starting from this node
+  // Size of the tree starting from this node (counting nodes that are reached through more than one path once per path)
   def treeSize():Int = {
     var sum:Int = validSteps.size
     for (validStep <- validSteps.keySet) {
@@ -331,15 +333,20 @@ class PrecrawledPathNode(val stepResult:StepResultHashed, val validSteps:Map[Str
     return false
   }
 
-  def winningPath():(Boolean, Array[String]) = {
+  // Shortest winning path from this node.  Paths may share nodes (see PathCrawler), so the shortest path from each node
+  // is only found once.
+  def winningPath(memo:util.IdentityHashMap[PrecrawledPathNode, (Boolean, Array[String])] = new util.IdentityHashMap[PrecrawledPathNode, (Boolean, Array[String])]()):(Boolean, Array[String]) = {
     if (this.stepResult.succ) {
       return (true, Array.empty[String])
     }
 
+    val memoized = memo.get(this)
+    if (memoized != null) return memoized
+
     var bestPath:Option[Array[String]] = None
     for (validStepStr <- validSteps.keySet) {
 
-      val (success, path) = validSteps(validStepStr).winningPath()
+      val (success, path) = validSteps(validStepStr).winningPath(memo)
       if (success) {
         // If we haven't found a winning path yet, OR the new winning path is shorter than the current-best winning path, then replace the current winning path
         if ((bestPath.isEmpty) || (bestPath.get.length > path.length+1)) {
@@ -348,14 +355,15 @@ class PrecrawledPathNode(val stepResult:StepResultHashed, val validSteps:Map[Str
       }
     }
 
-    if (bestPath.isDefined) {
+    val out = if (bestPath.isDefined) {
       // Winning path found
-      return (true, bestPath.get)
+      (true, bestPath.get)
     } else {
       // No winning path found
-      return (false, Array.empty[String])
+      (false, Array.empty[String])
     }
-
+    memo.put(this, out)
+    return out
   }
 
 
@@ -390,6 +398,16 @@ class PrecrawledPathNode(val stepResult:StepResultHashed, val validSteps:Map[Str
 object PrecrawledPathNode {
   var curId:Int = -1
 
+  private val referenceStepResult = StepResultHashed.mkBlankWithScore()
+
+  // A placeholder for a node that has been stored elsewhere (e.g. written to disk by ChunkedPathWriter), that only has
+  // the node's ID
+  def mkReference(id:Int):PrecrawledPathNode = {
+    val out = new PrecrawledPathNode(stepResult = referenceStepResult, validSteps = Map[String, PrecrawledPathNode]())
+    out.id = id
+    return out
+  }
+
   /*
    * Node ID assignment
    */
@@ -402,21 +420,36 @@ object PrecrawledPathNode {
     return this.curId
   }
 
-  // Assign unique IDs to all nodes
+  // Assign unique IDs to all nodes (nodes that are reached through more than one path get a single ID)
   def assignUniqueIDs(in:PrecrawledPathNode): Unit = {
     this.resetID()
-    this.assignUniqueIDsHelper(in)
+    this.assignUniqueIDsHelper(in, new util.IdentityHashMap[PrecrawledPathNode, PrecrawledPathNode]())
   }
 
-  private def assignUniqueIDsHelper(in:PrecrawledPathNode) {
+  private def assignUniqueIDsHelper(in:PrecrawledPathNode, visited:util.IdentityHashMap[PrecrawledPathNode, PrecrawledPathNode]) {
+    if (visited.put(in, in) != null) return
+
     // This node
     in.id = this.getNextId()
 
     // Child nodes
     for (child <- in.validSteps.values) {
-      this.assignUniqueIDsHelper(child)
+      this.assignUniqueIDsHelper(child, visited)
     }
   }
 
-}
+  // Number of distinct nodes (unlike treeSize(), nodes that are reached through more than one path are counted once)
+  def countNodes(in:PrecrawledPathNode):Int = {
+    val visited = new util.IdentityHashMap[PrecrawledPathNode, PrecrawledPathNode]()
+    val stack = new mutable.Stack[PrecrawledPathNode]()
+    stack.push(in)
+    while (stack.nonEmpty) {
+      val node = stack.pop()
+      if (visited.put(node, node) == null) {
+        for (child <- node.validSteps.values) stack.push(child)
+      }
+    }
+    return visited.size()
+  }
 
+}
@@ -0,0 +1,478 @@
+package textworldexpress.pathcrawler
+
+import java.nio.{ByteBuffer, ByteOrder, DoubleBuffer, IntBuffer, LongBuffer}
+import java.nio.channels.FileChannel
+import java.nio.charset.StandardCharsets
+import java.nio.file.{Files, Paths, StandardCopyOption, StandardOpenOption}
+
+import scala.collection.{immutable, mutable}
+import scala.collection.mutable.ArrayBuffer
+
+
+/*
+ * A precrawled path in a binary format that is memory-mapped (rather than parsed) when it is loaded, so that loading
+ * takes no time and very little memory, whatever the size of the path.  The same files can be read from Python with
+ * numpy.memmap (see textworld_express/precrawled_path.py).
+ * Nodes are stored as columns (one array per field), and their valid actions and steps (edges) as CSR arrays: the
+ * valid actions of node i are acts[actOffsets(l) until actOffsets(l+1)], where l = actLists(i) (nodes with the same
+ * valid actions share one list), and its steps (sorted by action string ID) are
+ * (edgeActions, edgeTargets)[edgeOffsets(i) until edgeOffsets(i+1)].  The start node is node 0.
+ * Strings are stored as sequences of shared segments (sentences or lines, see mkSegments() ), since observations
+ * repeat the same sentences in many combinations: string s is the concatenation of the segments
+ * stringSegments[stringOffsets(s) until stringOffsets(s+1)], and segment g is segmentBytes[segmentOffsets(g) until segmentOffsets(g+1)].
+ *
+ * File format (little-endian):
+ *   header:        MAGIC (int32), VERSION (int32), then (int64): number of nodes (N), number of valid action lists (L),
+ *                  number of valid actions (A), number of edges (E), number of strings (S), number of string segments
+ *                  (R), number of distinct segments (G), number of segment bytes (B), then the offset in the file of
+ *                  each section (int64, in the order below).  Every section starts at a multiple of 8 bytes.
+ *   sections:      obs (int32[N]), look (int32[N]), inv (int32[N]), score (float64[N]), scoreNorm (float64[N]),
+ *                  flags (uint8[N]; 1 = success, 2 = failure, 4 = valid action), actLists (int32[N]),
+ *                  actOffsets (int64[L+1]), acts (int32[A]), edgeOffsets (int64[N+1]), edgeActions (int32[E]),
+ *                  edgeTargets (int32[E]), stringOffsets (int64[S+1]), stringSegments (int32[R]),
+ *                  segmentOffsets (int64[G+1]), segmentBytes (uint8[B], UTF-8)
+ *
+ * Version 1 files (which have one valid action list per node, and one segment per string) can still be read: their
+ * header has 5 counts (N, A, E, S, B) and 13 sections (the sections above, without actLists, stringOffsets and
+ * stringSegments).
+ */
+class MappedPrecrawledPath(val filename:String) {
+  private val channel = FileChannel.open(Paths.get(filename), StandardOpenOption.READ)
+
+  private val magicAndVersion = this.map(0, 8)
+  if (magicAndVersion.getInt() != MappedPrecrawledPath.MAGIC) throw new RuntimeException("ERROR: Not a binary precrawled path file (" + filename + ").")
+  private val version = magicAndVersion.getInt()
+  if ((version != MappedPrecrawledPath.VERSION) && (version != 1)) throw new RuntimeException("ERROR: Unsupported binary precrawled path version (" + version + ", expected " + MappedPrecrawledPath.VERSION + ").")
+
+  private val header = this.map(8, MappedPrecrawledPath.getHeaderSize(this.version) - 8)
+
+  private val counts = Array.fill(MappedPrecrawledPath.getNumCounts(this.version))(header.getLong())
+  private val sectionOffsets = Array.fill(MappedPrecrawledPath.getNumSections(this.version))(header.getLong())
+  // (Version 1 files have one valid action list per node, and one segment per string)
+  private val (numNodes, numActLists, numActs, numEdges, numStrings, numStringSegments, numSegments, numSegmentBytes) = if (version == 1) {
+    (counts(0).toInt, counts(0).toInt, counts(1), counts(2), counts(3).toInt, counts(3), counts(3).toInt, counts(4))
+  } else {
+    (counts(0).toInt, counts(1).toInt, counts(2), counts(3), counts(4).toInt, counts(5), counts(6).toInt, counts(7))
+  }
+  // Sections in this file (the sections that version 1 files do not have are -1)
+  private val sectionIdxs = if (version == 1) Array(0, 1, 2, 3, 4, 5, -1, 6, 7, 8, 9, 10, -1, -1, 11, 12) else Array.range(0, MappedPrecrawledPath.NUM_SECTIONS)
+
+  // Columns
+  private val obs:IntBuffer = this.mapSection(0, 4L * numNodes).asIntBuffer()
+  private val look:IntBuffer = this.mapSection(1, 4L * numNodes).asIntBuffer()
+  private val inv:IntBuffer = this.mapSection(2, 4L * numNodes).asIntBuffer()
+  private val score:DoubleBuffer = this.mapSection(3, 8L * numNodes).asDoubleBuffer()
+  private val scoreNorm:DoubleBuffer = this.mapSection(4, 8L * numNodes).asDoubleBuffer()
+  private val flags:ByteBuffer = this.mapSection(5, numNodes)
+  private val actLists:IntBuffer = this.mapSectionOrRange(6, numNodes)
+  private val actOffsets:LongBuffer = this.mapSection(7, 8L * (numActLists + 1)).asLongBuffer()
+  private val acts:IntBuffer = this.mapSection(8, 4L * numActs).asIntBuffer()
+  private val edgeOffsets:LongBuffer = this.mapSection(9, 8L * (numNodes + 1)).asLongBuffer()
+  private val edgeActions:IntBuffer = this.mapSection(10, 4L * numEdges).asIntBuffer()
+  private val edgeTargets:IntBuffer = this.mapSection(11, 4L * numEdges).asIntBuffer()
+  private val stringOffsets:LongBuffer = if (version == 1) LongBuffer.wrap(Array.range(0, numStrings + 1).map(_.toLong)) else this.mapSection(12, 8L * (numStrings + 1)).asLongBuffer()
+  private val stringSegments:IntBuffer = this.mapSectionOrRange(13, numStringSegments.toInt)
+  private val segmentOffsets:LongBuffer = this.mapSection(14, 8L * (numSegments + 1)).asLongBuffer()
+  private val segmentBytes:ByteBuffer = this.mapSection(15, numSegmentBytes)
+
+  // The mappings stay valid after the file is closed
+  this.channel.close()
+
+  lazy val stringLUT:Array[String] = Array.tabulate(this.numStrings)(this.getStr)
+  lazy val stringToIDXLUT:Map[String, Int] = this.stringLUT.zipWithIndex.toMap
+
+  def sizeNodes():Int = this.numNodes
+  def sizeStrings():Int = this.numStrings
+
+  /*
+   * Accessors
+   */
+  def getStr(idx:Int):String = {
+    val firstSegment = this.stringOffsets.get(idx).toInt
+    val lastSegment = this.stringOffsets.get(idx + 1).toInt
+    var numBytes:Int = 0
+    for (i <- firstSegment until lastSegment) {
+      val segmentIdx = this.stringSegments.get(i)
+      numBytes += (this.segmentOffsets.get(segmentIdx + 1) - this.segmentOffsets.get(segmentIdx)).toInt
+    }
+
+    val bytes = new Array[Byte](numBytes)
+    val view = this.segmentBytes.duplicate()
+    var numBytesSoFar:Int = 0
+    for (i <- firstSegment until lastSegment) {
+      val segmentIdx = this.stringSegments.get(i)
+      val start = this.segmentOffsets.get(segmentIdx).toInt
+      val length = this.segmentOffsets.get(segmentIdx + 1).toInt - start
+      view.position(start)
+      view.get(bytes, numBytesSoFar, length)
+      numBytesSoFar += length
+    }
+    return new String(bytes, StandardCharsets.UTF_8)
+  }
+
+  def isSuccess(nodeIdx:Int):Boolean = (this.flags.get(nodeIdx) & MappedPrecrawledPath.FLAG_SUCCESS) != 0
+  def isFailure(nodeIdx:Int):Boolean = (this.flags.get(nodeIdx) & MappedPrecrawledPath.FLAG_FAILURE) != 0
+  def getScore(nodeIdx:Int):Double = this.score.get(nodeIdx)
+  def getScoreNormalized(nodeIdx:Int):Double = this.scoreNorm.get(nodeIdx)
+
+  def getNumSteps(nodeIdx:Int):Int = (this.edgeOffsets.get(nodeIdx + 1) - this.edgeOffsets.get(nodeIdx)).toInt
+
+  // The node reached by taking the action with string ID 'actionStrIdx' from node 'nodeIdx' (or -1, if it is not one
+  // of the node's steps), without decoding the node
+  def getStepTarget(nodeIdx:Int, actionStrIdx:Int):Int = {
+    // Binary search (steps are sorted by action string ID)
+    var low = this.edgeOffsets.get(nodeIdx).toInt
+    var high = this.edgeOffsets.get(nodeIdx + 1).toInt - 1
+    while (low <= high) {
+      val mid = (low + high) >>> 1
+      val midAction = this.edgeActions.get(mid)
+      if (midAction == actionStrIdx) return this.edgeTargets.get(mid)
+      if (midAction < actionStrIdx) low = mid + 1 else high = mid - 1
+    }
+    return -1
+  }
+
+  def getNode(nodeIdx:Int):PrecrawledNode = {
+    val actListIdx = this.actLists.get(nodeIdx)
+    val actStart = this.actOffsets.get(actListIdx).toInt
+    val nodeActs = new Array[Int](this.actOffsets.get(actListIdx + 1).toInt - actStart)
+    for (i <- 0 until nodeActs.length) nodeActs(i) = this.acts.get(actStart + i)
+
+    val nodeFlags = this.flags.get(nodeIdx).toInt
+    val result = new StepResultHashed(obs = this.obs.get(nodeIdx), look = this.look.get(nodeIdx), inv = this.inv.get(nodeIdx), acts = nodeActs,
+      score = this.score.get(nodeIdx), scoreNorm = this.scoreNorm.get(nodeIdx), succ = (nodeFlags & MappedPrecrawledPath.FLAG_SUCCESS) != 0,
+      fail = (nodeFlags & MappedPrecrawledPath.FLAG_FAILURE) != 0, valid = (nodeFlags & MappedPrecrawledPath.FLAG_VALID) != 0)
+
+    val steps = new mutable.HashMap[Int, Int]()
+    for (i <- this.edgeOffsets.get(nodeIdx).toInt until this.edgeOffsets.get(nodeIdx + 1).toInt) {
+      steps(this.edgeActions.get(i)) = this.edgeTargets.get(i)
+    }
+
+    return new PrecrawledNode(result = result, steps = steps.toMap)
+  }
+
+  def getStartNode():PrecrawledNode = {
+    return this.getNode(0)
+  }
+
+  def takeAction(curNode:PrecrawledNode, requestedActionStr:String):Option[PrecrawledNode] = {
+    val idx = this.stringToIDXLUT.getOrElse(requestedActionStr, -1)
+    if (idx == -1) return None
+    if (!curNode.steps.contains(idx)) return None
+
+    return Some(this.getNode(curNode.steps(idx)))
+  }
+
+  // Load all the nodes, as a PrecrawledPath
+  def toPrecrawledPath():PrecrawledPath = {
+    return new PrecrawledPath(nodeLUT = Array.tabulate(this.numNodes)(this.getNode), stringLUT = this.stringLUT)
+  }
+
+  /*
+   * Mapping
+   */
+  private def map(offset:Long, length:Long):ByteBuffer = {
+    return this.channel.map(FileChannel.MapMode.READ_ONLY, offset, length).order(ByteOrder.LITTLE_ENDIAN)
+  }
+
+  private def mapSection(sectionIdx:Int, length:Long):ByteBuffer = {
+    if (length > Int.MaxValue) throw new RuntimeException("ERROR: Section " + sectionIdx + " of binary precrawled path is too large to map (" + length + " bytes).")
+    return this.map(this.sectionOffsets(this.sectionIdxs(sectionIdx)), length)
+  }
+
+  // An int32 section, or (for version 1 files, which do not have the section) the range 0 until 'length'
+  private def mapSectionOrRange(sectionIdx:Int, length:Int):IntBuffer = {
+    if (this.sectionIdxs(sectionIdx) < 0) return IntBuffer.wrap(Array.range(0, length))
+    return this.mapSection(sectionIdx, 4L * length).asIntBuffer()
+  }
+
+}
+
+
+object MappedPrecrawledPath {
+  val MAGIC:Int = 0x42585754      // "TWXB" (in little-endian byte order)
+  val VERSION:Int = 2
+  val EXTENSION:String = ".twxb"
+
+  val NUM_COUNTS:Int = 8
+  val NUM_SECTIONS:Int = 16
+
+  val FLAG_SUCCESS:Int = 1
+  val FLAG_FAILURE:Int = 2
+  val FLAG_VALID:Int = 4
+
+  def load(filename:String):MappedPrecrawledPath = {
+    println (" * Loading binary precrawled path (" + filename + ").")
+    val out = new MappedPrecrawledPath(filename)
+    println (" * Successfully mapped (" + out.sizeNodes() + " nodes, " + out.sizeStrings() + " strings).")
+    return out
+  }
+
+  // Save a precrawled path in the binary format (to a temporary file first, so that other processes never read a
+  // partially written file)
+  def save(path:PrecrawledPath, filename:String): Unit = {
+    val tables = new SharedTables(path)
+    val (sectionOffsets, _) = this.getLayout(VERSION, tables.counts)
+
+    val tempFile = Paths.get(filename + ".tmp")
+    val out = new LittleEndianWriter(FileChannel.open(tempFile, StandardOpenOption.CREATE, StandardOpenOption.WRITE, StandardOpenOption.TRUNCATE_EXISTING))
+    try {
+      // Header
+      out.putInt(MAGIC)
+      out.putInt(VERSION)
+      for (count <- tables.counts) out.putLong(count)
+      for (sectionOffset <- sectionOffsets) out.putLong(sectionOffset)
+
+      // Node columns
+      out.alignTo(sectionOffsets(0)); for (node <- path.nodeLUT) out.putInt(node.result.obs)
+      out.alignTo(sectionOffsets(1)); for (node <- path.nodeLUT) out.putInt(node.result.look)
+      out.alignTo(sectionOffsets(2)); for (node <- path.nodeLUT) out.putInt(node.result.inv)
+      out.alignTo(sectionOffsets(3)); for (node <- path.nodeLUT) out.putDouble(node.result.score)
+      out.alignTo(sectionOffsets(4)); for (node <- path.nodeLUT) out.putDouble(node.result.scoreNorm)
+      out.alignTo(sectionOffsets(5))
+      for (node <- path.nodeLUT) {
+        var nodeFlags:Int = 0
+        if (node.result.succ) nodeFlags |= FLAG_SUCCESS
+        if (node.result.fail) nodeFlags |= FLAG_FAILURE
+        if (node.result.valid) nodeFlags |= FLAG_VALID
+        out.putByte(nodeFlags)
+      }
+      out.alignTo(sectionOffsets(6)); for (actListIdx <- tables.actLists) out.putInt(actListIdx)
+
+      // Valid action lists (CSR)
+      out.alignTo(sectionOffsets(7))
+      var numActsSoFar:Long = 0
+      out.putLong(0)
+      for (acts <- tables.uniqueActLists) {
+        numActsSoFar += acts.length
+        out.putLong(numActsSoFar)
+      }
+      out.alignTo(sectionOffsets(8)); for (acts <- tables.uniqueActLists; act <- acts) out.putInt(act)
+
+      // Steps (CSR, sorted by action string ID)
+      out.alignTo(sectionOffsets(9))
+      var numEdgesSoFar:Long = 0
+      out.putLong(0)
+      for (node <- path.nodeLUT) {
+        numEdgesSoFar += node.steps.size
+        out.putLong(numEdgesSoFar)
+      }
+      out.alignTo(sectionOffsets(10)); for (node <- path.nodeLUT; actionStrIdx <- node.steps.keys.toArray.sorted) out.putInt(actionStrIdx)
+      out.alignTo(sectionOffsets(11)); for (node <- path.nodeLUT; actionStrIdx <- node.steps.keys.toArray.sorted) out.putInt(node.steps(actionStrIdx))
+
+      // Strings (CSR, of segments)
+      out.alignTo(sectionOffsets(12))
+      var numSegmentsSoFar:Long = 0
+      out.putLong(0)
+      for (segments <- tables.stringSegments) {
+        numSegmentsSoFar += segments.length
+        out.putLong(numSegmentsSoFar)
+      }
+      out.alignTo(sectionOffsets(13)); for (segments <- tables.stringSegments; segmentIdx <- segments) out.putInt(segmentIdx)
+
+      // Segments
+      out.alignTo(sectionOffsets(14))
+      var numBytesSoFar:Long = 0
+      out.putLong(0)
+      for (bytes <- tables.segmentBytes) {
+        numBytesSoFar += bytes.length
+        out.putLong(numBytesSoFar)
+      }
+      out.alignTo(sectionOffsets(15)); for (bytes <- tables.segmentBytes) out.putBytes(bytes)
+    } finally {
+      out.close()
+    }
+
+    Files.move(tempFile, Paths.get(filename), StandardCopyOption.REPLACE_EXISTING, StandardCopyOption.ATOMIC_MOVE)
+  }
+
+  // The size of a path in the binary format, in bytes (e.g. in version 1, which does not share valid action lists or
+  // string segments)
+  def getSizeBytes(path:PrecrawledPath, version:Int = VERSION):Long = {
+    val counts = if (version == 1) {
+      Array(path.sizeNodes().toLong, path.nodeLUT.map(_.result.acts.length.toLong).sum, path.nodeLUT.map(_.steps.size.toLong).sum,
+        path.sizeStrings().toLong, path.stringLUT.map(_.getBytes(StandardCharsets.UTF_8).length.toLong).sum)
+    } else {
+      new SharedTables(path).counts
+    }
+    return this.getLayout(version, counts)._2
+  }
+
+  /*
+   * Layout
+   */
+  def getNumCounts(version:Int):Int = if (version == 1) 5 else NUM_COUNTS
+  def getNumSections(version:Int):Int = if (version == 1) 13 else NUM_SECTIONS
+  def getHeaderSize(version:Int):Int = 8 + (this.getNumCounts(version) * 8) + (this.getNumSections(version) * 8)
+
+  // The (8-byte aligned) offset of each section in the file, and the size of the file, from the counts in its header
+  private def getLayout(version:Int, counts:Array[Long]):(Array[Long], Long) = {
+    val sectionSizes = if (version == 1) {
+      val Array(numNodes, numActs, numEdges, numStrings, numStringBytes) = counts
+      Array(4 * numNodes, 4 * numNodes, 4 * numNodes, 8 * numNodes, 8 * numNodes, numNodes, 8 * (numNodes + 1), 4 * numActs,
+        8 * (numNodes + 1), 4 * numEdges, 4 * numEdges, 8 * (numStrings + 1), numStringBytes)
+    } else {
+      val Array(numNodes, numActLists, numActs, numEdges, numStrings, numStringSegments, numSegments, numSegmentBytes) = counts
+      Array(4 * numNodes, 4 * numNodes, 4 * numNodes, 8 * numNodes, 8 * numNodes, numNodes, 4 * numNodes, 8 * (numActLists + 1),
+        4 * numActs, 8 * (numNodes + 1), 4 * numEdges, 4 * numEdges, 8 * (numStrings + 1), 4 * numStringSegments,
+        8 * (numSegments + 1), numSegmentBytes)
+    }
+
+    val sectionOffsets = new Array[Long](sectionSizes.length)
+    var offset:Long = align(this.getHeaderSize(version))
+    var end:Long = offset
+    for (i <- 0 until sectionSizes.length) {
+      sectionOffsets(i) = offset
+      end = offset + sectionSizes(i)
+      offset = align(end)
+    }
+    return (sectionOffsets, end)
+  }
+
+  // Split a string into segments (sentences and lines), after each run of sentence-ending or newline characters, e.g.
+  // "You see a coin. You see a key." -> "You see a coin.", " You see a key."
+  def mkSegments(str:String):Array[String] = {
+    val out = new ArrayBuffer[String]()
+    var start:Int = 0
+    for (i <- 0 until str.length) {
+      if (isSegmentEnd(str.charAt(i)) && ((i + 1 == str.length) || !isSegmentEnd(str.charAt(i + 1)))) {
+        out.append(str.substring(start, i + 1))
+        start = i + 1
+      }
+    }
+    if (start < str.length) out.append(str.substring(start))
+    return out.toArray
+  }
+
+  private def isSegmentEnd(ch:Char):Boolean = (ch == '.') || (ch == '!') || (ch == '?') || (ch == '\n')
+
+  private def align(offset:Long):Long = (offset + 7) & ~7L
+
+  // Converted filename (e.g. 'path.json' -> 'path.twxb')
+  def mkBinaryFilename(filename:String):String = {
+    for (extension <- Array(".json", ChunkedPrecrawledPath.EXTENSION)) {
+      if (filename.endsWith(extension)) return filename.substring(0, filename.length - extension.length) + EXTENSION
+    }
+    return filename + EXTENSION
+  }
+
+  /*
+   * Convert precrawled paths (JSON, from PrecrawledPath.saveToJSON(), chunked, from ChunkedPathWriter, or binary) to the binary format.
+   * Usage: MappedPrecrawledPath <inputFilename> [outputFilename]
+   */
+  def main(args:Array[String]): Unit = {
+    if ((args.length < 1) || (args.length > 2)) {
+      println ("Usage: MappedPrecrawledPath <inputFilename:Str> <outputFilename:Str>")
+      println ("Where:")
+      println ("  inputFilename is a precrawled path (.json, chunked " + ChunkedPrecrawledPath.EXTENSION + ", or binary " + EXTENSION + ", e.g. in an older version of the format)")
+      println ("  outputFilename is optional (default: the input filename, with a " + EXTENSION + " extension)")
+      sys.exit(1)
+    }
+    val filenameIn = args(0)
+    val filenameOut = if (args.length > 1) args(1) else mkBinaryFilename(filenameIn)
+
+    val path = this.loadAnyFormat(filenameIn)
+    if (path.isEmpty) sys.exit(1)
+
+    println ("Saving output (" + filenameOut + ")...")
+    this.save(path.get, filenameOut)
+  }
+
+  // Load all the nodes of a precrawled path in any format (JSON, chunked, or binary), by its extension
+  def loadAnyFormat(filename:String):Option[PrecrawledPath] = {
+    if (filename.endsWith(ChunkedPrecrawledPath.EXTENSION)) {
+      val chunked = ChunkedPrecrawledPath.load(filename)
+      try {
+        return Some(chunked.toPrecrawledPath())
+      } finally {
+        chunked.close()
+      }
+    }
+    if (filename.endsWith(EXTENSION)) return Some(this.load(filename).toPrecrawledPath())
+
+    return PrecrawledPath.loadFromJSON(filename)
+  }
+
+}
+
+
+// The valid action lists and string segments of a path, shared as in the binary format (see MappedPrecrawledPath):
+// lists and segments are numbered in the order they are first used
+class SharedTables(path:PrecrawledPath) {
+  // The valid action list of each node
+  val actLists = new Array[Int](path.sizeNodes())
+  val uniqueActLists = new ArrayBuffer[Array[Int]]()
+  // The segments of each string
+  val stringSegments = new Array[Array[Int]](path.sizeStrings())
+  val segmentBytes = new ArrayBuffer[Array[Byte]]()
+
+  private val actListLUT = new mutable.HashMap[immutable.ArraySeq[Int], Int]()
+  for (i <- 0 until path.sizeNodes()) {
+    val acts = path.nodeLUT(i).result.acts
+    this.actLists(i) = this.actListLUT.getOrElseUpdate(immutable.ArraySeq.unsafeWrapArray(acts), {
+      this.uniqueActLists.append(acts)
+      this.uniqueActLists.length - 1
+    })
+  }
+
+  private val segmentLUT = new mutable.HashMap[String, Int]()
+  for (i <- 0 until path.sizeStrings()) {
+    this.stringSegments(i) = MappedPrecrawledPath.mkSegments(path.stringLUT(i)).map(segment => this.segmentLUT.getOrElseUpdate(segment, {
+      this.segmentBytes.append(segment.getBytes(StandardCharsets.UTF_8))
+      this.segmentBytes.length - 1
+    }))
+  }
+
+  // The counts in the header of the binary format
+  val counts:Array[Long] = Array(path.sizeNodes().toLong, this.uniqueActLists.length.toLong, this.uniqueActLists.map(_.length.toLong).sum,
+    path.nodeLUT.map(_.steps.size.toLong).sum, path.sizeStrings().toLong, this.stringSegments.map(_.length.toLong).sum,
+    this.segmentBytes.length.toLong, this.segmentBytes.map(_.length.toLong).sum)
+
+}
+
+
+// Buffered little-endian writes to a file channel
+class LittleEndianWriter(channel:FileChannel) {
+  private val buffer = ByteBuffer.allocate(1 << 16).order(ByteOrder.LITTLE_ENDIAN)
+  private var position:Long = 0
+
+  private def reserve(numBytes:Int): Unit = {
+    if (this.buffer.remaining() < numBytes) this.flush()
+    this.position += numBytes
+  }
+
+  def putByte(value:Int): Unit = { this.reserve(1); this.buffer.put(value.toByte) }
+  def putInt(value:Int): Unit = { this.reserve(4); this.buffer.putInt(value) }
+  def putLong(value:Long): Unit = { this.reserve(8); this.buffer.putLong(value) }
+  def putDouble(value:Double): Unit = { this.reserve(8); this.buffer.putDouble(value) }
+
+  def putBytes(bytes:Array[Byte]): Unit = {
+    if (this.buffer.remaining() < bytes.length) this.flush()
+    if (bytes.length > this.buffer.capacity()) {
+      // Too large to buffer
+      val wrapped = ByteBuffer.wrap(bytes)
+      while (wrapped.hasRemaining) this.channel.write(wrapped)
+    } else {
+      this.buffer.put(bytes)
+    }
+    this.position += bytes.length
+  }
+
+  // Pad with zeros, up to 'offset'
+  def alignTo(offset:Long): Unit = {
+    if (offset < this.position) throw new RuntimeException("ERROR: Can not align to offset " + offset + " (already at " + this.position + ").")
+    while (this.position < offset) this.putByte(0)
+  }
+
+  def flush(): Unit = {
+    this.buffer.flip()
+    while (this.buffer.hasRemaining) this.channel.write(this.buffer)
+    this.buffer.clear()
+  }
+
+  def close(): Unit = {
+    this.flush()
+    this.channel.close()
+  }
+
+}
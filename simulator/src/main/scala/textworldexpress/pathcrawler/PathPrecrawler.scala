@@ -1,177 +1,245 @@
 package textworldexpress.pathcrawler
 
+import java.nio.file.{Files, Paths, StandardCopyOption}
+import java.util
+import java.util.concurrent.{CompletableFuture, ConcurrentHashMap, ForkJoinPool, ForkJoinTask, RecursiveTask}
+import java.util.concurrent.atomic.AtomicLong
+
 import textworldexpress.generator.GameGenerator
 import textworldexpress.runtime.PythonInterface
-import textworldexpress.struct.{StepResult, TextGame}
+import textworldexpress.struct.{ConcurrentStringVocabulary, StateFingerprint, StepResult, TextGame}
 
 import scala.collection.mutable
 import scala.collection.mutable.ArrayBuffer
 import collection.JavaConverters._
 
 
-class CrawlerRunner1(id:Int, crawler:PathCrawler, initialPath:Array[String], maxDepth:Int=5) extends Thread {
-  private var isRunning:Boolean = false
-  private var isWinning:Boolean = false
-  private var isCompleted:Boolean = false
-
-  private val verboseDebugOutput:Boolean = true
+// Key of a node in the transposition table: nodes are merged if they have the same game state (see
+// TextGame.getStateFingerprint() ), the same observation, and the same depth.  The subtree of a node only depends on its
+// state (and the remaining depth), so merged nodes have the same subtrees, and including the depth keeps the crawl a
+// DAG (every edge goes one step deeper).
+case class CrawlKey(stateFingerprint:StateFingerprint, observationIdx:Int, depth:Int) {
 
-  // Set thread ID
-  //this.setName(id.toString)
-
-  var results:Option[PrecrawledPathNode] = None
+}
 
-  def isThreadRunning():Boolean = return this.isRunning
 
-  override def run(): Unit = {
-    this.isRunning = true
-    //if (verboseDebugOutput) println("Thread " + Thread.currentThread().getName() + " is running.")
+// Crawls the node reached by taking the valid action at 'validActionIdx' in 'parentGame' (or the start node, if
+// 'parentGame' is null and 'game' is given).  The parent game is only copied (never changed), so the tasks for all the
+// actions of a node can run at the same time.
+class CrawlTask(crawler:PathCrawler, parentGame:TextGame, validActionIdx:Int, var game:TextGame, var stepResult:StepResult, depth:Int, maxDepth:Int) extends RecursiveTask[Option[PrecrawledPathNode]] {
 
-    val out = crawler.crawlGame(maxDepth=maxDepth, pathSoFar = initialPath)
-    this.results = out
+  override def compute():Option[PrecrawledPathNode] = {
+    try {
+      if (crawler.isCancelled()) return None
 
-    //if (verboseDebugOutput) println("Thread " + Thread.currentThread().getName() + " is completed.")
-    this.isRunning = false
-    this.isCompleted = true
+      // Take this node's action on a copy of the parent game
+      if (this.parentGame != null) {
+        this.game = this.parentGame.deepCopy()
+        this.stepResult = this.game.step(this.validActionIdx)
+      }
+      return crawler.crawlFrom(this.game, this.stepResult, this.depth, this.maxDepth)
+    } finally {
+      crawler.taskFinished()
+      // Release the game (tasks are kept by their parent until it finishes)
+      this.game = null
+      this.stepResult = null
+    }
   }
 
 }
 
 
-
-
-class PathCrawler(SF_GAME_NAME:String = "coin", gameProps:Map[String, Int], seed:Int, gameFold:String) {
+/*
+ * Crawls every path through a game, up to a maximum depth.  Each child state is made by taking a valid action on a
+ * deep copy of its parent state (rather than regenerating the game and replaying the path from the start), and
+ * equivalent states reached by different action sequences (e.g. taking two objects in either order) are only crawled
+ * once, through a transposition table (see CrawlKey).  The result is a DAG of PrecrawledPathNodes, which has the same
+ * paths (and observations) as the full tree.  Note that the order of the valid actions of a merged node is that of the
+ * first path that reached it.
+ * The first thread to reach a node reserves it in the transposition table before crawling it, and other threads that
+ * reach it wait for that crawl, so that each node is crawled (and sent to the output) exactly once.  Keys include the
+ * depth, and a crawl only waits for nodes deeper than its own, so waiting can not deadlock.
+ * Every node is a task on a work-stealing (ForkJoin) pool with 'parallelism' threads, so that idle threads take over
+ * part of the remaining work, however unbalanced the subtrees are.  Progress (nodes per second, and the number of
+ * nodes waiting to be crawled) is reported every 'progressIntervalMsec' milliseconds (0 disables it), and a crawl can
+ * be stopped from another thread with cancel().
+ */
+class PathCrawler(SF_GAME_NAME:String = "coin", gameProps:Map[String, Int], seed:Int, gameFold:String, val parallelism:Int = Runtime.getRuntime.availableProcessors()) {
 
   val (success, generator) = GameGenerator.mkGameGenerator(gameName = SF_GAME_NAME, gameProps)
   if (!success) throw new RuntimeException("ERROR creating text game(): " + generator.errorStr)
 
-  // Clear the string LUT
-  StepResultHashed.resetLUT()
+  // String LUT of this crawler's nodes (see StepResultHashed)
+  val vocabulary = new ConcurrentStringVocabulary()
 
   // Store the generated game's full properties, for creating a verbose filename later on
   var generatedGameProps = Map[String, Int]()
 
+  var progressIntervalMsec:Long = 5000
+
+  // Transposition table (shared by the crawling threads), with the node of each key once it has been crawled
+  private val transpositions = new ConcurrentHashMap[CrawlKey, CompletableFuture[PrecrawledPathNode]]()
+
+  // Statistics
+  private val numNodesCrawled = new AtomicLong(0)
+  private val numTranspositions = new AtomicLong(0)
+  // Tasks that have been made, but not finished (the frontier of the crawl)
+  private val numPendingTasks = new AtomicLong(0)
+
+  @volatile private var cancelled:Boolean = false
+
+  // Where finished nodes are sent (if any)
+  private var output:Option[CrawlOutput] = None
+
   /*
    * Game crawling
    */
 
-  // TODO: Return
+  // Crawl the game, starting after the actions in 'pathSoFar'.  Returns None if the crawl was cancelled.
   def crawlGame(maxDepth:Int = 5, pathSoFar:Array[String] = Array.empty[String]): Option[PrecrawledPathNode] = {
-    val result = this.crawlGameHelper(pathSoFar, maxDepth)
-    return result
-  }
-
-  private def crawlGameHelper(pathSoFar:Array[String], maxDepth:Int = 5): Option[PrecrawledPathNode] = {
-    // Stop case: Check that we haven't crawled too deep
-    val curDepth = pathSoFar.length
-    if (curDepth >= maxDepth) return None
-
-    val startTime = System.currentTimeMillis()
+    this.transpositions.clear()
+    this.numNodesCrawled.set(0)
+    this.numTranspositions.set(0)
+    this.numPendingTasks.set(1)
+    this.cancelled = false
 
     // Create a fresh game
-    //val game = precachedGame.deepCopy()
-    //val (_game, _goldPath) = this.generator.mkGameWithGoldPath(seed = 1, "train")
-    //val game = _game
     val game = this.generator.mkGame(seed = seed, gameFold)
-    if (pathSoFar.length == 0) {
-      this.generatedGameProps = game.getGenerationProperties()
-      println("Game Generation Propreties: " + this.generatedGameProps.toString() + ")")
-    }
+    this.generatedGameProps = game.getGenerationProperties()
+    println("Game Generation Propreties: " + this.generatedGameProps.toString() + ")")
 
-    // Step 1: Do actions so far
+    // Do actions so far
     var stepResult:StepResult = game.initalStep()
-    // Subsequent steps
     for (actionStr <- pathSoFar) {
       stepResult = game.step(actionStr)
     }
-    val stepResultHashed = StepResultHashed.mkFromStepResult(stepResult)
 
-    // Check for other stop criteria -- e.g. game winning/losing
-    if ((stepResult.taskSuccess) || (stepResult.taskFailure)) return Some( new PrecrawledPathNode(stepResult = stepResultHashed, validSteps = Map[String, PrecrawledPathNode]()) )
+    val pool = new ForkJoinPool(math.max(1, this.parallelism))
+    val reporter = this.startProgressReporter()
+    try {
+      val result = pool.invoke(new CrawlTask(this, null, -1, game, stepResult, pathSoFar.length, maxDepth))
+      if (this.cancelled) return None
+      return result
+    } finally {
+      if (reporter.isDefined) reporter.get.interrupt()
+      pool.shutdown()
+    }
+  }
 
-    // Step 2: Get possible actions from this step
-    val validActions = stepResult.validActions
+  // Send each node to 'output' once it is finished, and keep the node that it returns in its place (e.g. so that nodes
+  // can be written to disk during the crawl, instead of being kept in memory; see ChunkedPathWriter)
+  def setOutput(output:Option[CrawlOutput]): Unit = {
+    this.output = output
+  }
 
-    val validStepResults = mutable.Map[String, PrecrawledPathNode]()
+  // Stop the current crawl (crawlGame() then returns None)
+  def cancel(): Unit = {
+    this.cancelled = true
+  }
 
-    // Step 3: For each action, try and crawl it
-    var useThreads:Boolean = false
-    //if (pathSoFar.length == 0) useThreads = true    // Use threads for the second path step
-    if (pathSoFar.length < 2) useThreads = true    // Use threads for the second path step
-
-    if (!useThreads) {
-      // Serialized/Non-threaded
-      var verboseIdx:Int = 0
-      for (validActionStr <- validActions) {
-        // Verbose reporting, for vague progress report
-        if (pathSoFar.length == 0) {
-          println(verboseIdx + " / " + validActions.length)
-        }
+  def isCancelled():Boolean = this.cancelled
 
-        val actionsToTake = pathSoFar ++ Array(validActionStr)
-        val result = this.crawlGameHelper(actionsToTake, maxDepth)      // Recursive call.  TODO: return
-        if (result.isDefined) {
-          validStepResults(validActionStr) = result.get
-        }
+  // Number of nodes that were crawled, in the current (or last) crawl
+  def getNumNodesCrawled():Long = this.numNodesCrawled.get()
 
-        verboseIdx += 1
-      }
+  // Number of nodes that were reached more than once (and so were only crawled once), in the current (or last) crawl
+  def getNumTranspositions():Long = this.numTranspositions.get()
 
-    } else {
-      // Threaded
-      val runners = new Array[CrawlerRunner1](validActions.length)
-
-      // Start threads
-      for (i <- 0 until validActions.length) {
-        val validActionStr = validActions(i)
-        val initialPath = pathSoFar ++ Array(validActionStr)
-        //runners(i) = new CrawlerRunner(i, SF_GAME_NAME, gameProps, initialPath, startSeed, gameFold, maxDepth)
-        runners(i) = new CrawlerRunner1(i, this, initialPath, maxDepth)
-        runners(i).start()
-      }
+  // Number of nodes waiting to be crawled (or being crawled)
+  def getFrontierSize():Long = this.numPendingTasks.get()
 
-      // Wait for threads to finish
-      var stillRunning = new ArrayBuffer[Int]()     // More elegant ways of doing this
-      stillRunning.append(-1)  // Initial
-
-      while (stillRunning.length > 0) {
-        stillRunning.clear()
-
-        for (i <- 0 until validActions.length) {
-          if (runners(i).isThreadRunning()) {
-            stillRunning.append(i)
-          } else {
-            // Get result
-            val validActionStr = validActions(i)
-            val result = runners(i).results
-            if (result.isDefined) {
-              validStepResults(validActionStr) = runners(i).results.get
-            }
-          }
-        }
+  private[pathcrawler] def taskFinished(): Unit = {
+    this.numPendingTasks.decrementAndGet()
+  }
 
-        // Debug output (for main thread)
-        if (pathSoFar.length == 0) {
-          Thread.sleep(1000)
-          val deltaTime = (System.currentTimeMillis() - startTime).toDouble / 1000.0
-          val deltaTimeInt = math.round(deltaTime).toInt
+  // Crawl from a game state ('game', which is not changed, and the step result that led to it), at depth 'depth'
+  def crawlFrom(game:TextGame, stepResult:StepResult, depth:Int, maxDepth:Int): Option[PrecrawledPathNode] = {
+    // Stop case: Check that we haven't crawled too deep
+    if (depth >= maxDepth) return None
+
+    val stepResultHashed = StepResultHashed.mkFromStepResult(stepResult, this.vocabulary)
+
+    // Reserve this node, unless it has already been reached (through another path).  If so, use its node (waiting
+    // for it, if another thread is still crawling it), so that each node is only crawled and stored once.
+    val key = new CrawlKey(game.getStateFingerprint(), stepResultHashed.obs, depth)
+    val reservation = new CompletableFuture[PrecrawledPathNode]()
+    val existing = this.transpositions.putIfAbsent(key, reservation)
+    if (existing != null) {
+      this.numTranspositions.incrementAndGet()
+      return Some(existing.join())
+    }
 
-          if (deltaTimeInt % 5 == 0) {
-            println("(" + deltaTimeInt + " sec) Threads still running: " + stillRunning.mkString(" "))
-          }
-        } else {
-          // Or, if not main thread, just pause briefly before rechecking if work is done
-          Thread.sleep(10)
-        }
+    try {
+      var node = this.crawlNode(game, stepResult, stepResultHashed, depth, maxDepth)
+      this.numNodesCrawled.incrementAndGet()
+      if (this.output.isDefined) node = this.output.get.finishNode(node)
+
+      reservation.complete(node)
+      return Some(node)
+    } catch {
+      case e:Throwable => {
+        // Let any threads waiting for this node fail too
+        reservation.completeExceptionally(e)
+        throw e
       }
+    }
+  }
+
+  private def crawlNode(game:TextGame, stepResult:StepResult, stepResultHashed:StepResultHashed, depth:Int, maxDepth:Int): PrecrawledPathNode = {
+    // Check for other stop criteria -- e.g. game winning/losing
+    if ((stepResult.taskSuccess) || (stepResult.taskFailure)) return new PrecrawledPathNode(stepResult = stepResultHashed, validSteps = Map[String, PrecrawledPathNode]())
 
+    // Step 2: Get possible actions from this step
+    val validActions = stepResult.validActions
+
+    val validStepResults = mutable.Map[String, PrecrawledPathNode]()
+
+    // Nodes at the maximum depth have no children, so there is no need to take their actions
+    if (depth + 1 >= maxDepth) return new PrecrawledPathNode(stepResult = stepResultHashed, validSteps = validStepResults.toMap)
+
+    // Step 3: Crawl each action as its own task (idle threads steal tasks that have not started yet)
+    val tasks = new util.ArrayList[CrawlTask](validActions.length)
+    for (i <- 0 until validActions.length) {
+      tasks.add( new CrawlTask(this, game, i, null, null, depth+1, maxDepth) )
     }
+    this.numPendingTasks.addAndGet(validActions.length)
+    ForkJoinTask.invokeAll(tasks)
 
+    for (i <- 0 until validActions.length) {
+      val result = tasks.get(i).join()
+      if (result.isDefined) {
+        validStepResults(validActions(i)) = result.get
+      }
+    }
 
     // Pack results into a PrecrawledPathNode
     val node = new PrecrawledPathNode(stepResult = stepResultHashed, validSteps = validStepResults.toMap)
-    return Some(node)
+    return node
+  }
 
+  // Report progress on a background thread (until it is interrupted)
+  private def startProgressReporter():Option[Thread] = {
+    if (this.progressIntervalMsec <= 0) return None
+
+    val thread = new Thread(new Runnable {
+      def run(): Unit = {
+        val startTime = System.currentTimeMillis()
+        try {
+          while (true) {
+            Thread.sleep(progressIntervalMsec)
+            val deltaTime = (System.currentTimeMillis() - startTime).toDouble / 1000.0
+            val numNodes = numNodesCrawled.get()
+            println("(" + math.round(deltaTime) + " sec) Nodes crawled: " + numNodes + " (" + math.round(numNodes / deltaTime) + " nodes/sec), transpositions: " + numTranspositions.get() + ", frontier: " + numPendingTasks.get())
+          }
+        } catch {
+          case _:InterruptedException => { }
+        }
+      }
+    }, "PathCrawlerProgress")
+    // Daemon thread, so that it never keeps the JVM alive
+    thread.setDaemon(true)
+    thread.start()
+    return Some(thread)
   }
 
 }
@@ -179,20 +247,67 @@ class PathCrawler(SF_GAME_NAME:String = "coin", gameProps:Map[String, Int], seed
 
 
 object PathPrecrawler {
-
-  def crawlPath(gameName:String, gameProps:Map[String, Int], seed:Int, gameFold:String, maxDepth:Int, filenameOutPrefix:String) = {
+  // Output formats: one JSON document (see PrecrawledPath), a memory-mappable binary file (see MappedPrecrawledPath), or
+  // chunks that are written during the crawl (see ChunkedPrecrawledPath), for crawls that are too large to keep in memory
+  val FORMAT_JSON = "json"
+  val FORMAT_BINARY = "binary"
+  val FORMAT_CHUNKED = "chunked"
+  val OUTPUT_FORMATS = Array(FORMAT_JSON, FORMAT_BINARY, FORMAT_CHUNKED)
+
+  def crawlPath(gameName:String, gameProps:Map[String, Int], seed:Int, gameFold:String, maxDepth:Int, filenameOutPrefix:String, numThreads:Int = Runtime.getRuntime.availableProcessors(), outputFormat:String = FORMAT_JSON):Unit = {
     // Create crawler
-    val crawler = new PathCrawler(gameName, gameProps.toMap, seed, gameFold)
+    val crawler = new PathCrawler(gameName, gameProps.toMap, seed, gameFold, parallelism = numThreads)
+    println ("Crawling with " + crawler.parallelism + " threads")
+
+    // In the chunked format, nodes are written as they are crawled (to a temporary file, since the filename includes
+    // the generated game's properties, which are only known once the crawl has started)
+    val tempFilename = filenameOutPrefix + "-game" + gameName + "-seed" + seed + ".partial"
+    val writer = if (outputFormat == FORMAT_CHUNKED) Some(new ChunkedPathWriter(tempFilename, crawler.vocabulary)) else None
+    crawler.setOutput(writer)
+
+    // Cancel the crawl if the JVM is stopped (e.g. with Ctrl-C), so the crawling threads stop promptly
+    val shutdownHook = new Thread(new Runnable { def run(): Unit = crawler.cancel() })
+    Runtime.getRuntime.addShutdownHook(shutdownHook)
 
     println ("Starting crawling...")
     val startTime = System.currentTimeMillis()
 
     //val (game, goldPath) = crawler.getPrecachedGame()
     val precrawledGameTree = crawler.crawlGame(maxDepth)
+    Runtime.getRuntime.removeShutdownHook(shutdownHook)
+    if (precrawledGameTree.isEmpty) {
+      if (writer.isDefined) {
+        writer.get.close()
+        Files.deleteIfExists(Paths.get(tempFilename))
+      }
+      println("Crawl cancelled.")
+      return
+    }
 
     val deltaTime = (System.currentTimeMillis() - startTime)
     println("Finished crawling... (time = " + deltaTime + " msec)")
-    println("Tree size: " + precrawledGameTree.get.treeSize() + " nodes")
+
+    // Create verbose filename
+    var propsStr:String = ""
+    for (key <- crawler.generatedGameProps.keySet.toList.sorted) {
+      if ((key != "seed") && (key != "gameSet")) {
+        propsStr += "-" + key + crawler.generatedGameProps(key)
+      }
+    }
+    val filenameOutBase = filenameOutPrefix + "-game" + gameName + "-seed" + seed + "-fold" + gameFold + "-maxDepth" + maxDepth + propsStr
+
+    if (writer.isDefined) {
+      // Chunked: the nodes have already been written (the crawler only kept references to them)
+      writer.get.finish(precrawledGameTree.get)
+      println("Crawl size: " + writer.get.getNumNodes() + " nodes, " + writer.get.getNumStrings() + " strings (" + crawler.getNumTranspositions() + " transpositions merged, " + math.round(crawler.getNumNodesCrawled() * 1000.0 / math.max(1, deltaTime)) + " nodes/sec)")
+
+      val filenameOut = filenameOutBase + ChunkedPrecrawledPath.EXTENSION
+      println ("Saving output (" + filenameOut + ")..." )
+      Files.move(Paths.get(tempFilename), Paths.get(filenameOut), StandardCopyOption.REPLACE_EXISTING)
+      return
+    }
+
+    println("Crawl size: " + PrecrawledPathNode.countNodes(precrawledGameTree.get) + " nodes (" + crawler.getNumTranspositions() + " transpositions merged, " + math.round(crawler.getNumNodesCrawled() * 1000.0 / math.max(1, deltaTime)) + " nodes/sec)")
     val (success, winningPath) = precrawledGameTree.get.winningPath()
     println("Shortest winning path (length = " + winningPath.length + "): " + winningPath.mkString(", "))
 
@@ -202,46 +317,51 @@ object PathPrecrawler {
 
 
     // Convert
-    val precrawled = PrecrawledPath.make(root = precrawledGameTree.get, stringLUT = StepResultHashed.stringLUT)
+    val precrawled = PrecrawledPath.make(root = precrawledGameTree.get, stringLUT = crawler.vocabulary.getStrs())
     //## println( precrawled.StringLUTToString() )
 
     // Save
-
-    // Create verbose filename
-    var propsStr:String = ""
-    for (key <- crawler.generatedGameProps.keySet.toList.sorted) {
-      if ((key != "seed") && (key != "gameSet")) {
-        propsStr += "-" + key + crawler.generatedGameProps(key)
-      }
+    if (outputFormat == FORMAT_BINARY) {
+      // Binary paths are meant to be loaded many at once (e.g. for training), so they are compacted first
+      println ("Compacting...")
+      val compacted = PrecrawledPathCompactor.compact(precrawled)
+      println (PrecrawledPathCompactor.mkReport(precrawled, compacted))
+
+      val filenameOut = filenameOutBase + MappedPrecrawledPath.EXTENSION
+      println ("Saving output (" + filenameOut + ")..." )
+      MappedPrecrawledPath.save(compacted, filenameOut)
+    } else {
+      val filenameOut = filenameOutBase + ".json"
+      println ("Saving output (" + filenameOut + ")..." )
+      precrawled.saveToJSON(filenameOut)
     }
 
-    val filenameOut = filenameOutPrefix + "-game" + gameName + "-seed" + seed + "-fold" + gameFold + "-maxDepth" + maxDepth + propsStr + ".json"
-    println ("Saving output (" + filenameOut + ")..." )
-    precrawled.saveToJSON(filenameOut)
-
   }
 
 
 
   def printUsage(): Unit = {
-    println ("Usage: PathPrecrawler <gameName:Str> <gameFold:Str> <gameSeed:Int> <gameProperties:Str>")
+    println ("Usage: PathPrecrawler <gameName:Str> <gameFold:Str> <gameSeed:Int> <maxDepth:Int> <gameProperties:Str> <numThreads:Int> <outputFormat:Str>")
     println ("Where:")
     println ("  gameName is one of: " + GameGenerator.VALID_GAME_NAMES.sorted.mkString(", "))
     println ("  gameFold is one of: train, dev, test")
     println ("  gameSeed is a positive integer (e.g. 1, 2, 3). ")
     println ("  maxDepth is the maximum depth to crawl in the game state tree (maximum of 12 recommended).")
     println ("  gameProperties is an optional comma-delimited list of game properties to set, without spaces (e.g. numLocations=4,includeDoors=1,numDistractorItems=1,limitInventorySize=0)")
+    println ("  numThreads is the optional number of crawling threads (default: the number of cores)")
+    println ("  outputFormat is optional, and one of: json (default), binary (memory-mappable, see MappedPrecrawledPath), chunked (written during the crawl, for crawls too large to keep in memory)")
     println ("")
     println ("Example:")
-    println ("  PathCrawler twc train 0 6 numLocations=1,includeDoors=0,numItemsToPutAway=2")
+    println ("  PathCrawler twc train 0 6 numLocations=1,includeDoors=0,numItemsToPutAway=2 16")
+    println ("  PathCrawler twc train 0 12 numLocations=3,includeDoors=0,numItemsToPutAway=2 16 chunked")
   }
 
   // Main Entry Point
   def main(args:Array[String]): Unit = {
 
     // Step 1: Parse command line arguments
-    if ((args.length < 4) || (args.length > 5)) {
-      println ("ERROR: Expected 3 or 4 arguments (found " + args.length + ").")
+    if ((args.length < 4) || (args.length > 7)) {
+      println ("ERROR: Expected 4 to 7 arguments (found " + args.length + ").")
       println ("")
       this.printUsage()
       sys.exit(1)
@@ -334,7 +454,7 @@ object PathPrecrawler {
     // Parse game properties string.
     var gamePropsStr = ""
     var gameProps = Map[String, Int]()
-    if (args.length == 5) {
+    if (args.length >= 5) {
       gamePropsStr = args(4)
       val (_props, propErrorStr) = PythonInterface.parseParamStr(gamePropsStr)
       if (propErrorStr.length > 0) {
@@ -349,6 +469,34 @@ object PathPrecrawler {
       println ("No game properties found.   Using default properties.")
     }
 
+    // Parse number of threads
+    var numThreads:Int = Runtime.getRuntime.availableProcessors()
+    if (args.length >= 6) {
+      try {
+        numThreads = args(5).toInt
+      } catch {
+        case _:Throwable => numThreads = -1
+      }
+      if (numThreads < 1) {
+        println ("ERROR: Number of threads (" + args(5) + ") must be a positive integer.")
+        println ("")
+        this.printUsage()
+        sys.exit(1)
+      }
+    }
+
+    // Parse output format
+    var outputFormat:String = FORMAT_JSON
+    if (args.length == 7) {
+      outputFormat = args(6).toLowerCase.trim()
+      if (!OUTPUT_FORMATS.contains(outputFormat)) {
+        println ("ERROR: Unknown output format (" + outputFormat + ").  Valid formats: " + OUTPUT_FORMATS.mkString(", "))
+        println ("")
+        this.printUsage()
+        sys.exit(1)
+      }
+    }
+
     println ("Game Name: " + gameName)
     println ("Game Fold: " + gameFold)
     println ("Game Seed: " + gameSeed)
@@ -357,7 +505,7 @@ object PathPrecrawler {
 
 
     // Step 2: Do crawling
-    this.crawlPath(gameName, gameProps, seed = gameSeed, gameFold, maxDepth, filenameOutPrefix = "precrawledpath")
+    this.crawlPath(gameName, gameProps, seed = gameSeed, gameFold, maxDepth, filenameOutPrefix = "precrawledpath", numThreads = numThreads, outputFormat = outputFormat)
 
   }
 
@@ -148,7 +148,7 @@ object PrecrawledPath {
    * Creation
    */
 
-  def make(root:PrecrawledPathNode, stringLUT:ArrayBuffer[String]): PrecrawledPath = {
+  def make(root:PrecrawledPathNode, stringLUT:Array[String]): PrecrawledPath = {
     // Step 1: First, label the path nodes with unique sequential IDs
     PrecrawledPathNode.assignUniqueIDs(root)
 
@@ -157,27 +157,35 @@ object PrecrawledPath {
     val nodeLUT = new Array[PrecrawledNode](numNodes)
 
     // Step 3: Populate the nodes
-    this.populateNodeLUT(root, nodeLUT, stringLUT)
+    val stringToIdx = new mutable.HashMap[String, Int]()
+    for (i <- 0 until stringLUT.length) {
+      if (!stringToIdx.contains(stringLUT(i))) stringToIdx(stringLUT(i)) = i
+    }
+    this.populateNodeLUT(root, nodeLUT, stringToIdx)
 
     // Step 4: Generate storage class
-    val out = new PrecrawledPath(nodeLUT = nodeLUT, stringLUT = stringLUT.toArray)
+    val out = new PrecrawledPath(nodeLUT = nodeLUT, stringLUT = stringLUT)
 
     return out
   }
 
 
-  // Recursively populate all the nodes into the node look-up table (converting them to a different storage class in the process)
-  private def populateNodeLUT(in:PrecrawledPathNode, nodeLUT:Array[PrecrawledNode], stringLUT:ArrayBuffer[String]): Unit = {
+  // Recursively populate all the nodes into the node look-up table (converting them to a different storage class in the process).
+  // Nodes that are reached through more than one path are only converted once.
+  private def populateNodeLUT(in:PrecrawledPathNode, nodeLUT:Array[PrecrawledNode], stringToIdx:collection.Map[String, Int]): Unit = {
+    // Check whether this node has already been stored
+    val nodeIdx = in.id
+    if (nodeLUT(nodeIdx) != null) return
+
     // Convert this node
-    val converted = PrecrawledNode.mkFromRaw(in, stringLUT)
+    val converted = PrecrawledNode.mkFromRaw(in, stringToIdx)
 
     // Store this node
-    val nodeIdx = in.id
     nodeLUT(nodeIdx) = converted
 
     // Recurse
     for (child <- in.validSteps.values) {
-      this.populateNodeLUT(child, nodeLUT, stringLUT)
+      this.populateNodeLUT(child, nodeLUT, stringToIdx)
     }
   }
 
@@ -208,7 +216,8 @@ case class PrecrawledNode(val result:StepResultHashed, val steps:Map[Int, Int])
 
 object PrecrawledNode {
 
-  def mkFromRaw(in:PrecrawledPathNode, stringLUT:ArrayBuffer[String]):PrecrawledNode = {
+  // 'stringToIdx' maps each string to its index in the string LUT
+  def mkFromRaw(in:PrecrawledPathNode, stringToIdx:collection.Map[String, Int]):PrecrawledNode = {
     val stepResult = in.stepResult
 
     // Convert valid steps to hashes
@@ -217,7 +226,7 @@ object PrecrawledNode {
       val actionStr = step._1
       val resultingNode = step._2
 
-      val actionStrIdx = stringLUT.indexOf(actionStr)
+      val actionStrIdx = stringToIdx.getOrElse(actionStr, -1)
       val nodeIdx = resultingNode.id
       validSteps(actionStrIdx) = nodeIdx
     }
@@ -0,0 +1,177 @@
+package textworldexpress.pathcrawler
+
+import scala.collection.{immutable, mutable}
+import scala.collection.mutable.ArrayBuffer
+
+
+/*
+ * Compacts precrawled paths, so that more of them (e.g. the crawls of many seeds) fit in memory at once.
+ * The crawler only merges nodes that have the same game state at the same depth, but crawls also repeat many identical
+ * subtrees whose game states differ (e.g. in ways that the crawl does not observe), or that are reached at different
+ * depths (e.g. winning and losing leaves).  Compaction merges these into a DAG (see dedupSubtrees() ), and removes the
+ * strings that are no longer used (see compactStringLUT() ).  Compacted paths also share their valid action lists in
+ * memory, and the binary format (see MappedPrecrawledPath) shares valid action lists and string segments on disk.
+ */
+object PrecrawledPathCompactor {
+
+  // Merge identical subtrees, then remove unused strings
+  def compact(path:PrecrawledPath):PrecrawledPath = {
+    return this.compactStringLUT(this.dedupSubtrees(path))
+  }
+
+  /*
+   * Subtree deduplication
+   */
+
+  // Merge structurally identical subtrees (nodes with the same step result, whose steps lead to identical subtrees), by
+  // hash-consing the nodes bottom-up, so that each distinct subtree is stored once.  Nodes that can not be reached from
+  // the start node are removed, and the rest are numbered in depth-first order from the start node (node 0), taking
+  // steps in order of action string ID.
+  def dedupSubtrees(path:PrecrawledPath):PrecrawledPath = {
+    if (path.sizeNodes() == 0) return path
+
+    // Step 1: Find the distinct subtrees (with steps to the indices of their subtrees)
+    val subtreeIdxs = Array.fill(path.sizeNodes())(-1)
+    val subtrees = new ArrayBuffer[PrecrawledNode]()
+    val subtreeLUT = new mutable.HashMap[SubtreeKey, Int]()
+    val sharedActs = new mutable.HashMap[immutable.ArraySeq[Int], Array[Int]]()
+
+    def findSubtree(nodeIdx:Int):Int = {
+      if (subtreeIdxs(nodeIdx) >= 0) return subtreeIdxs(nodeIdx)
+      if (subtreeIdxs(nodeIdx) == IN_PROGRESS) throw new RuntimeException("ERROR: Precrawled path has a cycle (at node " + nodeIdx + "), so its subtrees can not be merged.")
+      subtreeIdxs(nodeIdx) = IN_PROGRESS
+
+      val node = path.getNode(nodeIdx)
+      val steps = node.steps.keys.toArray.sorted.map(actionStrIdx => (actionStrIdx, findSubtree(node.steps(actionStrIdx))))
+      val acts = sharedActs.getOrElseUpdate(immutable.ArraySeq.unsafeWrapArray(node.result.acts), node.result.acts)
+
+      val key = new SubtreeKey(node.result.copy(acts = null), immutable.ArraySeq.unsafeWrapArray(acts), immutable.ArraySeq.unsafeWrapArray(steps))
+      val subtreeIdx = subtreeLUT.getOrElseUpdate(key, {
+        subtrees.append(new PrecrawledNode(result = node.result.copy(acts = acts), steps = steps.toMap))
+        subtrees.length - 1
+      })
+      subtreeIdxs(nodeIdx) = subtreeIdx
+      return subtreeIdx
+    }
+    val rootIdx = findSubtree(0)
+
+    // Step 2: Number the subtrees (depth-first, from the start node)
+    val newIdxs = Array.fill(subtrees.length)(-1)
+    val order = new ArrayBuffer[Int]()
+
+    def numberSubtree(subtreeIdx:Int): Unit = {
+      if (newIdxs(subtreeIdx) >= 0) return
+      newIdxs(subtreeIdx) = order.length
+      order.append(subtreeIdx)
+
+      val steps = subtrees(subtreeIdx).steps
+      for (actionStrIdx <- steps.keys.toArray.sorted) numberSubtree(steps(actionStrIdx))
+    }
+    numberSubtree(rootIdx)
+
+    // Step 3: Make the nodes
+    val nodeLUT = new Array[PrecrawledNode](order.length)
+    for (i <- 0 until order.length) {
+      val subtree = subtrees(order(i))
+      nodeLUT(i) = new PrecrawledNode(result = subtree.result, steps = subtree.steps.map(step => (step._1, newIdxs(step._2))))
+    }
+
+    return new PrecrawledPath(nodeLUT = nodeLUT, stringLUT = path.stringLUT)
+  }
+
+  /*
+   * String LUT compaction
+   */
+
+  // Remove the strings that no node uses (rather than blanking them, as PathStepifyer.minimizeStringLUT() does), and
+  // renumber the rest (keeping their order).  Nodes with the same valid actions share one array of valid actions.
+  def compactStringLUT(path:PrecrawledPath):PrecrawledPath = {
+    // Step 1: Find the strings that are used
+    val used = new Array[Boolean](path.sizeStrings())
+    for (node <- path.nodeLUT) {
+      used(node.result.obs) = true
+      used(node.result.look) = true
+      used(node.result.inv) = true
+      for (actIdx <- node.result.acts) used(actIdx) = true
+      for (actionStrIdx <- node.steps.keys) used(actionStrIdx) = true
+    }
+
+    // Step 2: Renumber them
+    val newIdxs = Array.fill(path.sizeStrings())(-1)
+    val stringLUT = new ArrayBuffer[String]()
+    for (i <- 0 until path.sizeStrings()) {
+      if (used(i)) {
+        newIdxs(i) = stringLUT.length
+        stringLUT.append(path.stringLUT(i))
+      }
+    }
+
+    // Step 3: Renumber the strings of the nodes
+    val sharedActs = new mutable.HashMap[immutable.ArraySeq[Int], Array[Int]]()
+    val nodeLUT = new Array[PrecrawledNode](path.sizeNodes())
+    for (i <- 0 until path.sizeNodes()) {
+      val node = path.nodeLUT(i)
+      val result = node.result
+      val acts = sharedActs.getOrElseUpdate(immutable.ArraySeq.unsafeWrapArray(result.acts), result.acts.map(newIdxs(_)))
+      nodeLUT(i) = new PrecrawledNode(result = result.copy(obs = newIdxs(result.obs), look = newIdxs(result.look), inv = newIdxs(result.inv), acts = acts),
+        steps = node.steps.map(step => (newIdxs(step._1), step._2)))
+    }
+
+    return new PrecrawledPath(nodeLUT = nodeLUT, stringLUT = stringLUT.toArray)
+  }
+
+  /*
+   * Reporting
+   */
+
+  // The sizes of a path before and after compaction (in nodes, strings, and bytes in the binary format)
+  def mkReport(before:PrecrawledPath, after:PrecrawledPath):String = {
+    val os = new mutable.StringBuilder()
+    os.append(" * Nodes: " + before.sizeNodes() + " -> " + after.sizeNodes() + "\n")
+    os.append(" * Strings: " + before.sizeStrings() + " -> " + after.sizeStrings() + "\n")
+    os.append(" * Binary size: " + MappedPrecrawledPath.getSizeBytes(before, version = 1) + " bytes (version 1 format), " + MappedPrecrawledPath.getSizeBytes(before) + " bytes -> " + MappedPrecrawledPath.getSizeBytes(after) + " bytes")
+    return os.toString()
+  }
+
+  private val IN_PROGRESS:Int = -2
+
+  /*
+   * Compact a precrawled path (JSON, chunked, or binary), and save it in the binary format.
+   * Usage: PrecrawledPathCompactor <inputFilename> [outputFilename]
+   */
+  def main(args:Array[String]): Unit = {
+    if ((args.length < 1) || (args.length > 2)) {
+      println ("Usage: PrecrawledPathCompactor <inputFilename:Str> <outputFilename:Str>")
+      println ("Where:")
+      println ("  inputFilename is a precrawled path (.json, chunked " + ChunkedPrecrawledPath.EXTENSION + ", or binary " + MappedPrecrawledPath.EXTENSION + ")")
+      println ("  outputFilename is optional (default: the input filename, with a " + MappedPrecrawledPath.EXTENSION + " extension, or a -compacted" + MappedPrecrawledPath.EXTENSION + " suffix for binary input)")
+      sys.exit(1)
+    }
+    val filenameIn = args(0)
+    val filenameOut = if (args.length > 1) {
+      args(1)
+    } else if (filenameIn.endsWith(MappedPrecrawledPath.EXTENSION)) {
+      filenameIn.substring(0, filenameIn.length - MappedPrecrawledPath.EXTENSION.length) + "-compacted" + MappedPrecrawledPath.EXTENSION
+    } else {
+      MappedPrecrawledPath.mkBinaryFilename(filenameIn)
+    }
+
+    val path = MappedPrecrawledPath.loadAnyFormat(filenameIn)
+    if (path.isEmpty) sys.exit(1)
+
+    println ("Compacting...")
+    val compacted = this.compact(path.get)
+    println (this.mkReport(path.get, compacted))
+
+    println ("Saving output (" + filenameOut + ")...")
+    MappedPrecrawledPath.save(compacted, filenameOut)
+  }
+
+}
+
+
+// A node, with the subtrees of its steps (used to find identical subtrees).  The node's valid actions are compared
+// by value (arrays are compared by reference), so they are stored separately from its step result.
+case class SubtreeKey(result:StepResultHashed, acts:immutable.ArraySeq[Int], steps:immutable.ArraySeq[(Int, Int)]) {
+
+}
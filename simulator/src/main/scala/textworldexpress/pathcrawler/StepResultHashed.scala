@@ -1,8 +1,6 @@
 package textworldexpress.pathcrawler
 
-import textworldexpress.struct.StepResult
-
-import scala.collection.mutable.ArrayBuffer
+import textworldexpress.struct.{ConcurrentStringVocabulary, StepResult}
 
 // Note: Storage class names are shortened, to reduce JSON size when serializing
 case class StepResultHashed(val obs:Int, val look:Int, val inv:Int, val acts:Array[Int], val score:Double, val scoreNorm:Double, val succ:Boolean, val fail:Boolean, val valid:Boolean) {
@@ -53,41 +51,37 @@ case class StepResultHashed(val obs:Int, val look:Int, val inv:Int, val acts:Arr
 }
 
 object StepResultHashed {
-  val stringLUT = new ArrayBuffer[String]()
+  // The default string LUT (used when no vocabulary is given, e.g. by EntryPointPathCrawler).  Crawlers that may run at
+  // the same time as others (e.g. PathCrawler) have their own.
+  val sharedVocabulary = new ConcurrentStringVocabulary()
 
-  def resetLUT(): Unit = {
-    stringLUT.clear()
-  }
+  def stringLUT:Array[String] = sharedVocabulary.getStrs()
 
-  private def add(strIn:String):Int = synchronized {
-    val idx = this.stringLUT.indexOf(strIn)
-    // Check for existing
-    if (idx != -1) return idx
-    // Does not exist -- add
-    this.stringLUT.append(strIn)
-    return this.stringLUT.length-1
+  def resetLUT(): Unit = {
+    sharedVocabulary.clear()
   }
 
   def getStr(idx:Int):String = {
-    if (idx < this.stringLUT.length) {
-      return this.stringLUT(idx)
+    if (idx < this.sharedVocabulary.size) {
+      return this.sharedVocabulary.getStr(idx)
     }
 
     return "--UNDEFINED--"
   }
 
-  def mkFromStepResult(in:StepResult):StepResultHashed = {
-    val obsStrIdx = this.add(in.observationStr)
-    val freeLookStrIdx = this.add(in.freeLookStr)
-    val inventoryStrIdx = this.add(in.inventoryStr)
-
-    val validActionsIdx = new Array[Int](in.validActions.length)
-    for (i <- 0 until in.validActions.length) {
-      validActionsIdx(i) = this.add( in.validActions(i) )
-    }
+  // Note: All the strings of a step result are interned at once (see ConcurrentStringVocabulary.getIds() ), since step
+  // results are hashed by many crawling threads at once
+  def mkFromStepResult(in:StepResult, vocabulary:ConcurrentStringVocabulary = sharedVocabulary):StepResultHashed = {
+    val strs = new Array[String](3 + in.validActions.length)
+    strs(0) = in.observationStr
+    strs(1) = in.freeLookStr
+    strs(2) = in.inventoryStr
+    System.arraycopy(in.validActions, 0, strs, 3, in.validActions.length)
+    val strIdxs = new Array[Int](strs.length)
+    vocabulary.getIds(strs, strIdxs)
 
     // Export
-    val out = new StepResultHashed(obs = obsStrIdx, look = freeLookStrIdx, inv = inventoryStrIdx, acts = validActionsIdx, score = in.scoreRaw, scoreNorm = in.scoreNormalized, succ = in.taskSuccess, fail = in.taskFailure, valid = in.wasValidAction)
+    val out = new StepResultHashed(obs = strIdxs(0), look = strIdxs(1), inv = strIdxs(2), acts = java.util.Arrays.copyOfRange(strIdxs, 3, strIdxs.length), score = in.scoreRaw, scoreNorm = in.scoreNormalized, succ = in.taskSuccess, fail = in.taskFailure, valid = in.wasValidAction)
     return out
   }
 
@@ -0,0 +1,105 @@
+package textworldexpress.runtime
+
+import java.nio.ByteBuffer
+import java.nio.charset.StandardCharsets
+import java.util.Base64
+
+import textworldexpress.struct.StepResult
+
+
+/*
+ * A compact binary encoding of a StepResult (an alternative to StepResult.toJSON(), that needs no escaping or parsing).
+ * Layout (big-endian):
+ *    float64   scoreRaw
+ *    float64   scoreNormalized
+ *    uint8     flags (1 = taskSuccess, 2 = taskFailure, 4 = wasValidAction, 8 = has look, 16 = has inventory, 32 = has valid actions)
+ *    int32     number of valid actions (N)
+ *    Then a string table of UTF-8 strings (observation, look, inventory, and each valid action): an int32 byte length
+ *    for each string, followed by the bytes of the strings.
+ *    Optional fields that are not included in the step result (see TextGame.stepFields) are omitted from the table.
+ * The strings are length-prefixed (rather than separated), so they may contain any character (including NUL), and the
+ * lengths are stored together so that the Python side can read them with a single unpack.
+ * Results are written into a buffer that is reused between calls (and grown as needed), and are returned as a view of it.
+ * Note: py4j converts byte arrays into Python bytes one byte at a time, which is much slower than transferring a String,
+ * so the Python interface receives the encoded bytes as Base64 text (see encodeBase64() ).
+ */
+class BinaryStepResultEncoder(initialCapacity:Int = 4096) {
+  private var buffer = ByteBuffer.allocate(initialCapacity)
+  private var lengthPos:Int = 0     // Position of the next string length in the table
+
+  // Encode a step result.  The returned buffer is a view of the reused buffer, that is only valid until the next call.
+  def encode(stepResult:StepResult):ByteBuffer = {
+    this.buffer.clear()
+
+    var flags:Int = 0
+    if (stepResult.taskSuccess) flags |= BinaryStepResultEncoder.FLAG_TASK_SUCCESS
+    if (stepResult.taskFailure) flags |= BinaryStepResultEncoder.FLAG_TASK_FAILURE
+    if (stepResult.wasValidAction) flags |= BinaryStepResultEncoder.FLAG_VALID_ACTION
+    if (stepResult.freeLookStr != null) flags |= BinaryStepResultEncoder.FLAG_HAS_LOOK
+    if (stepResult.inventoryStr != null) flags |= BinaryStepResultEncoder.FLAG_HAS_INVENTORY
+    if (stepResult.validActions != null) flags |= BinaryStepResultEncoder.FLAG_HAS_VALID_ACTIONS
+    val numValidActions = if (stepResult.validActions != null) stepResult.validActions.length else 0
+
+    this.ensureCapacity(BinaryStepResultEncoder.HEADER_SIZE)
+    this.buffer.putDouble(stepResult.scoreRaw)
+    this.buffer.putDouble(stepResult.scoreNormalized)
+    this.buffer.put(flags.toByte)
+    this.buffer.putInt(numValidActions)
+
+    // Reserve the table of string lengths (filled in as the strings are written)
+    var numStrings = 1 + numValidActions
+    if (stepResult.freeLookStr != null) numStrings += 1
+    if (stepResult.inventoryStr != null) numStrings += 1
+    this.ensureCapacity(numStrings * 4)
+    this.lengthPos = this.buffer.position()
+    this.buffer.position(this.lengthPos + numStrings * 4)
+
+    this.putString(stepResult.observationStr)
+    if (stepResult.freeLookStr != null) this.putString(stepResult.freeLookStr)
+    if (stepResult.inventoryStr != null) this.putString(stepResult.inventoryStr)
+    for (i <- 0 until numValidActions) {
+      this.putString(stepResult.validActions(i))
+    }
+
+    // (Not a read-only view, since Base64.Encoder copies buffers that do not expose their backing array)
+    val out = this.buffer.duplicate()
+    out.flip()
+    return out
+  }
+
+  def encodeBase64(stepResult:StepResult):String = {
+    // The Base64 characters are all ASCII, so they can be converted to a String directly
+    val encoded = Base64.getEncoder.encode( this.encode(stepResult) )
+    return new String(encoded.array(), encoded.arrayOffset(), encoded.remaining(), StandardCharsets.ISO_8859_1)
+  }
+
+  private def putString(str:String): Unit = {
+    val bytes = str.getBytes(StandardCharsets.UTF_8)
+    this.ensureCapacity(bytes.length)
+    this.buffer.put(bytes)
+    this.buffer.putInt(this.lengthPos, bytes.length)
+    this.lengthPos += 4
+  }
+
+  // Grow the buffer (keeping its contents) if there are less than 'numBytes' remaining
+  private def ensureCapacity(numBytes:Int): Unit = {
+    if (this.buffer.remaining() >= numBytes) return
+
+    val newBuffer = ByteBuffer.allocate(math.max(this.buffer.capacity() * 2, this.buffer.position() + numBytes))
+    this.buffer.flip()
+    newBuffer.put(this.buffer)
+    this.buffer = newBuffer
+  }
+
+}
+
+object BinaryStepResultEncoder {
+  val HEADER_SIZE:Int = 8 + 8 + 1 + 4
+
+  val FLAG_TASK_SUCCESS:Int = 1
+  val FLAG_TASK_FAILURE:Int = 2
+  val FLAG_VALID_ACTION:Int = 4
+  val FLAG_HAS_LOOK:Int = 8
+  val FLAG_HAS_INVENTORY:Int = 16
+  val FLAG_HAS_VALID_ACTIONS:Int = 32
+}
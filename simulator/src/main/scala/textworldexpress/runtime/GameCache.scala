@@ -0,0 +1,226 @@
+package textworldexpress.runtime
+
+import java.nio.charset.StandardCharsets
+import java.nio.file.{Files, Path, Paths, StandardCopyOption}
+import java.security.MessageDigest
+import java.util
+
+import textworldexpress.generator.GameGenerator
+import textworldexpress.struct.TextGame
+
+import collection.JavaConverters._
+
+
+/*
+ * A least-recently-used cache of pristine (freshly generated, never stepped) games, keyed by the generator configuration,
+ * seed, and fold.  Generating a game (building rooms, connecting them, placing objects) is much slower than copying one,
+ * so games that are requested again (e.g. when cycling through the training seeds) are returned as a deepCopy() of the
+ * cached game.  At most 'maxGames' games are kept (0 disables the cache).  This is a limit on the number of entries, not
+ * on memory: games are not measured, so the memory used by a full cache depends on the size of the games (e.g. games with
+ * many locations or objects), and 'maxGames' should be lowered for large games.
+ * Gold paths are memoized separately (with the same keys), since they are much smaller than games and much slower to
+ * generate.  They are generated on a copy of the pristine game, and can also be stored in a directory (see
+ * setGoldPathDir() ), so that they are reused across runs.
+ * The cache is shared by all the sessions (PythonInterfaces) in the JVM (see GameCache.shared).
+ */
+class GameCache(private var maxGames:Int) {
+  private val games = new util.LinkedHashMap[String, TextGame](16, 0.75f, true) {
+    override def removeEldestEntry(eldest:util.Map.Entry[String, TextGame]):Boolean = {
+      if (this.size() <= maxGames) return false
+      numEvictions += 1
+      return true
+    }
+  }
+  private val goldPaths = new util.LinkedHashMap[String, Array[String]](16, 0.75f, true) {
+    override def removeEldestEntry(eldest:util.Map.Entry[String, Array[String]]):Boolean = this.size() > GameCache.MAX_GOLD_PATHS
+  }
+  private var goldPathDir:Option[Path] = None
+
+  // Statistics
+  private var numHits:Long = 0
+  private var numMisses:Long = 0
+  private var numEvictions:Long = 0
+  private var numGoldPathHits:Long = 0
+  private var numGoldPathDiskHits:Long = 0
+  private var numGoldPathsGenerated:Long = 0
+
+  // Get a new copy of a game
+  def getGame(gameGenerator:GameGenerator, seed:Long, fold:String):TextGame = {
+    return this.getPristineGame(gameGenerator, seed, fold, updateStats = true).deepCopy()
+  }
+
+  // Get the cached game (or generate it).  Pristine games must not be changed, so they are only copied.
+  // The hit/miss statistics only count requests for games (and not those for generating gold paths).
+  private def getPristineGame(gameGenerator:GameGenerator, seed:Long, fold:String, updateStats:Boolean):TextGame = {
+    val key = GameCache.mkKey(gameGenerator, seed, fold)
+
+    // Check for a cached game
+    val cached = this.synchronized {
+      val cached = this.games.get(key)
+      if (updateStats) {
+        if (cached != null) {
+          this.numHits += 1
+        } else {
+          this.numMisses += 1
+        }
+      }
+      cached
+    }
+    if (cached != null) return cached
+
+    // Generate the game (outside the lock, since this can be slow), and cache it
+    val game = gameGenerator.mkGame(seed, fold)
+    this.synchronized {
+      if (this.maxGames > 0) this.games.put(key, game)
+    }
+    return game
+  }
+
+  // Get the gold path of a game, looking in memory first, then in the gold path directory (if any), and generating it
+  // (on a copy of the pristine game) only if it is not found.  Returns an empty array if no gold path could be generated.
+  def getGoldPath(gameGenerator:GameGenerator, seed:Long, fold:String):Array[String] = {
+    val key = GameCache.mkKey(gameGenerator, seed, fold)
+    val (cached, goldPathDir) = this.synchronized {
+      val cached = this.goldPaths.get(key)
+      if (cached != null) this.numGoldPathHits += 1
+      (cached, this.goldPathDir)
+    }
+    if (cached != null) return cached
+
+    // Check the gold path directory
+    if (goldPathDir.isDefined) {
+      val stored = GameCache.readGoldPath(goldPathDir.get, key)
+      if (stored.isDefined) {
+        this.synchronized {
+          this.goldPaths.put(key, stored.get)
+          this.numGoldPathDiskHits += 1
+        }
+        return stored.get
+      }
+    }
+
+    // Generate the gold path (outside the lock, since this can be slow).  Failures are not memoized.
+    val goldPath = gameGenerator.mkGoldPath( this.getPristineGame(gameGenerator, seed, fold, updateStats = false) )
+    if (goldPath.isEmpty) return goldPath
+
+    this.synchronized {
+      this.goldPaths.put(key, goldPath)
+      this.numGoldPathsGenerated += 1
+    }
+    if (goldPathDir.isDefined) GameCache.writeGoldPath(goldPathDir.get, key, goldPath)
+    return goldPath
+  }
+
+  // Set a directory where gold paths are stored (and looked up), so that they are reused across runs.  An empty
+  // string disables storing gold paths.  Returns an empty string on success, or an error message.
+  def setGoldPathDir(path:String):String = {
+    if (path.isEmpty) {
+      this.synchronized { this.goldPathDir = None }
+      return ""
+    }
+
+    try {
+      val dir = Files.createDirectories(Paths.get(path))
+      this.synchronized { this.goldPathDir = Some(dir) }
+    } catch {
+      case e:Exception => return "ERROR: Unable to use gold path directory (" + path + "): " + e.toString
+    }
+    return ""
+  }
+
+  def setMaxGames(maxGames:Int): Unit = this.synchronized {
+    this.maxGames = math.max(0, maxGames)
+
+    // Evict any games over the new limit (least recently used first)
+    val iter = this.games.entrySet().iterator()
+    while ((this.games.size() > this.maxGames) && iter.hasNext) {
+      iter.next()
+      iter.remove()
+      this.numEvictions += 1
+    }
+  }
+
+  def getMaxGames():Int = this.synchronized { this.maxGames }
+
+  def size():Int = this.synchronized { this.games.size() }
+
+  // Clear the games and gold paths in memory (gold paths stored in the gold path directory are kept)
+  def clear(): Unit = this.synchronized {
+    this.games.clear()
+    this.goldPaths.clear()
+    this.numHits = 0
+    this.numMisses = 0
+    this.numEvictions = 0
+    this.numGoldPathHits = 0
+    this.numGoldPathDiskHits = 0
+    this.numGoldPathsGenerated = 0
+  }
+
+  def getStatsJSON():String = this.synchronized {
+    val os = new StringBuilder()
+    os.append("{\"hits\": " + this.numHits + ", \"misses\": " + this.numMisses + ", \"evictions\": " + this.numEvictions + ", \"size\": " + this.games.size() + ", \"maxGames\": " + this.maxGames + ", ")
+    os.append("\"goldPathHits\": " + this.numGoldPathHits + ", \"goldPathDiskHits\": " + this.numGoldPathDiskHits + ", \"goldPathsGenerated\": " + this.numGoldPathsGenerated + "}")
+    return os.toString()
+  }
+
+}
+
+// A gold path that is only looked up (or generated) when it is first requested
+class LazyGoldPath(val gameCache:GameCache, val gameGenerator:GameGenerator, val seed:Long, val fold:String) {
+  lazy val goldPath:Array[String] = gameCache.getGoldPath(gameGenerator, seed, fold)
+}
+
+object GameCache {
+  // Maximum number of cached games (an entry limit, see above)
+  val DEFAULT_MAX_GAMES:Int = 1000
+  // Gold paths are small (typically a few dozen short strings), so many more of them are kept
+  val MAX_GOLD_PATHS:Int = 100000
+
+  // Cache shared by all the sessions in this JVM
+  val shared = new GameCache(DEFAULT_MAX_GAMES)
+
+  // The generator configuration string includes the game name, and all its generation parameters
+  def mkKey(gameGenerator:GameGenerator, seed:Long, fold:String):String = {
+    return gameGenerator.getConfigStr() + "seed: " + seed + "\nfold: " + fold
+  }
+
+  /*
+   * Gold path directory (one file per key, named after the key's hash, with one action per line)
+   */
+  private def mkGoldPathFile(dir:Path, key:String):Path = {
+    val hash = MessageDigest.getInstance("SHA-256").digest(key.getBytes(StandardCharsets.UTF_8))
+    return dir.resolve("goldpath-" + hash.map("%02x".format(_)).mkString + ".txt")
+  }
+
+  private def readGoldPath(dir:Path, key:String):Option[Array[String]] = {
+    val file = mkGoldPathFile(dir, key)
+    if (!Files.exists(file)) return None
+
+    try {
+      val lines = Files.readAllLines(file, StandardCharsets.UTF_8).asScala
+      // The first line is the key (to detect hash collisions), followed by the actions
+      if (lines.isEmpty || (lines.head != key.replace("\n", "\t"))) return None
+      return Some( lines.tail.toArray )
+    } catch {
+      case _:Exception => return None
+    }
+  }
+
+  // Write to a temporary file first, so that other processes never read a partially written gold path
+  private def writeGoldPath(dir:Path, key:String, goldPath:Array[String]): Unit = {
+    val file = mkGoldPathFile(dir, key)
+    try {
+      val tempFile = Files.createTempFile(dir, "goldpath-", ".tmp")
+      try {
+        val lines = (Array(key.replace("\n", "\t")) ++ goldPath).toList.asJava
+        Files.write(tempFile, lines, StandardCharsets.UTF_8)
+        Files.move(tempFile, file, StandardCopyOption.REPLACE_EXISTING, StandardCopyOption.ATOMIC_MOVE)
+      } finally {
+        Files.deleteIfExists(tempFile)
+      }
+    } catch {
+      case e:Exception => println("WARNING: Unable to store gold path (" + file.toString + "): " + e.toString)
+    }
+  }
+
+}
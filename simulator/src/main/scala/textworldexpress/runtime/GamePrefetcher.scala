@@ -0,0 +1,72 @@
+package textworldexpress.runtime
+
+import java.util.concurrent.{ArrayBlockingQueue, TimeUnit}
+
+import textworldexpress.generator.GameGenerator
+import textworldexpress.struct.TextGame
+
+import scala.util.Random
+
+
+/*
+ * Generates games for random seeds of a fold on a background thread, so that they are ready before they are needed
+ * (see PythonInterface.resetWithRandomSeed() ).  Up to 'numGames' games are generated ahead of time.
+ * The seeds are drawn from a random number generator seeded with 'seed', and games are handed out in the order
+ * their seeds were drawn, so the sequence of games is reproducible.
+ */
+class GamePrefetcher(val gameGenerator:GameGenerator, val seeds:Range, val gameFold:String, val generateGoldPath:Boolean, val numGames:Int, val seed:Long) {
+  private val random = new Random(seed)
+  private val queue = new ArrayBlockingQueue[PrefetchedGame](math.max(1, numGames))
+  @volatile private var running:Boolean = true
+  // Set if generation fails on the background thread (and reported by the next call to take() )
+  @volatile private var error:Throwable = null
+
+  private val thread = new Thread(new Runnable {
+    def run(): Unit = {
+      try {
+        while (running) {
+          val gameSeed = seeds.start + random.nextInt(seeds.length)
+          val game = GameCache.shared.getGame(gameGenerator, gameSeed, gameFold)
+          // Generate the gold path now (so that it is memoized in the cache), if it will be needed
+          if (generateGoldPath) GameCache.shared.getGoldPath(gameGenerator, gameSeed, gameFold)
+          queue.put(new PrefetchedGame(gameSeed, game))
+        }
+      } catch {
+        case _:InterruptedException => { }
+        case e:Throwable => error = e
+      }
+    }
+  }, "GamePrefetcher")
+  // Daemon thread, so that it never keeps the JVM alive
+  this.thread.setDaemon(true)
+  this.thread.start()
+
+  // Check whether this prefetcher generates the games requested by a reset
+  def matches(gameFold:String, generateGoldPath:Boolean):Boolean = {
+    return (this.gameFold == gameFold) && (this.generateGoldPath == generateGoldPath)
+  }
+
+  // Take the next game (waiting for it to be generated, if it is not ready yet)
+  def take():PrefetchedGame = {
+    while (true) {
+      val prefetched = this.queue.poll(100, TimeUnit.MILLISECONDS)
+      if (prefetched != null) return prefetched
+      if (this.error != null) throw new RuntimeException("ERROR: Prefetching games failed: " + this.error.toString, this.error)
+    }
+    return null
+  }
+
+  // Number of games that are ready
+  def numReady():Int = this.queue.size()
+
+  def stop(): Unit = {
+    this.running = false
+    this.thread.interrupt()
+  }
+
+}
+
+// Storage class for a prefetched game
+class PrefetchedGame(val seed:Int, val game:TextGame) {
+
+}
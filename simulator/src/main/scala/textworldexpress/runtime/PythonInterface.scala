@@ -1,8 +1,10 @@
 package textworldexpress.runtime
 
 import java.io.PrintWriter
+import java.util
 
 import py4j.GatewayServer
+import textworldexpress.JSON
 import textworldexpress.generator.GameGenerator
 import textworldexpress.struct.{StepResult, TextGame}
 
@@ -16,19 +18,44 @@ class PythonInterface() {
   var errorStr:String = ""
 
   // Game and gold path
+  var gameName:String = ""
   var gameGenerator:GameGenerator = null
   var game:TextGame = null
-  var goldPath:Array[String] = Array.empty[String]
+  // Generated (or looked up in the game cache) when first requested
+  var goldPath:LazyGoldPath = null
   var properties:Map[String, Int] = Map[String, Int]()
   var curStepResult:StepResult = null
+  var stepFields:Int = StepResult.FIELDS_ALL
+
+  // Reusable encoder for the binary protocol (see the *Binary() mirrors)
+  private val binaryEncoder = new BinaryStepResultEncoder()
+  // Encoder (and string vocabularies) for the integer ID protocol (see the *Ids() mirrors)
+  private val idEncoder = new StepResultIdEncoder()
+
+  // Background generation of the games for resets with random seeds (see enablePrefetch() )
+  private var prefetcher:Option[GamePrefetcher] = None
+  // Runs whole episodes with built-in policies (see rolloutJSON() ).  Made when first used after load().
+  private var rolloutEngine:RolloutEngine = null
+
+  // Time this interface was last used (for closing idle sessions, see SessionRegistry)
+  @volatile var lastAccessMsec:Long = System.currentTimeMillis()
+
+  // Snapshots of the game state (see snapshot()/restore() ), indexed by handle.  Least recently used snapshots are
+  // released once there are more than 'maxSnapshots'.
+  var maxSnapshots:Int = 1000
+  private var nextSnapshotHandle:Int = 0
+  private val snapshots = new util.LinkedHashMap[Int, GameSnapshot](16, 0.75f, true) {
+    override def removeEldestEntry(eldest:util.Map.Entry[Int, GameSnapshot]):Boolean = this.size() > maxSnapshots
+  }
 
   /*
    * Load/reset/shutdown server
    */
   def load(gameName:String, paramStr:String):String = {
+    this.lastAccessMsec = System.currentTimeMillis()
     // Clear variables
     this.game = null
-    this.goldPath = Array.empty[String]
+    this.goldPath = null
     this.errorStr = ""
     this.curStepResult = null
     this.gameGenerator = null
@@ -47,6 +74,32 @@ class PythonInterface() {
       return errorStr
     }
     this.gameGenerator = gameGenerator
+
+    this.gameName = gameName
+    this.rolloutEngine = null
+
+    // Prefetch games for the new generator (with the same settings)
+    if (this.prefetcher.isDefined) {
+      val old = this.prefetcher.get
+      old.stop()
+      this.prefetcher = Some( new GamePrefetcher(this.mkPrefetchGenerator(), old.seeds, old.gameFold, old.generateGoldPath, old.numGames, old.seed) )
+    }
+
+    return ""
+  }
+
+  // Set the optional fields (comma-separated, from StepResult.FIELD_NAMES) included in the results of the following steps.
+  // Takes effect from the next generated game.  Returns an empty string on success, or an error message.
+  def setStepFields(fieldsStr:String):String = {
+    var fields:Int = 0
+    for (fieldName <- fieldsStr.split(",").map(_.trim).filter(_.nonEmpty)) {
+      if (!StepResult.FIELD_NAMES.contains(fieldName)) {
+        return "ERROR: Unknown step field (" + fieldName + ").  Valid options are (" + StepResult.FIELD_NAMES.keys.mkString(", ") + ")."
+      }
+      fields |= StepResult.FIELD_NAMES(fieldName)
+    }
+
+    this.stepFields = fields
     return ""
   }
 
@@ -69,26 +122,29 @@ class PythonInterface() {
 
   // Assumes that load() has already been called, and gameGenerator is valud.
   def generateNewGame(seed:Int, gameFold:String, generateGoldPath:Boolean):StepResult = {
+    this.lastAccessMsec = System.currentTimeMillis()
     if (this.gameGenerator == null) {
       errorStr = "ERROR: Game generator is not initialized.  Call load() before attempting to generate new games."
       return StepResult.mkErrorMessage(errorStr)
     }
 
-    // Generate new game
-    if (generateGoldPath) {
-      // With gold path
-      val (_game, _goldPath) = this.gameGenerator.mkGameWithGoldPath(seed, gameFold)
-      this.game = _game
-      this.goldPath = _goldPath
+    // Generate new game (or copy it from the cache of pristine games)
+    val _game = GameCache.shared.getGame(this.gameGenerator, seed, gameFold)
+    return this.startGame(_game, seed, gameFold, generateGoldPath)
+  }
 
+  // Start playing a newly generated game.  The gold path is only generated when it is first requested (see
+  // getGoldActionSequence() ), unless 'generateGoldPath' is true.
+  private def startGame(game:TextGame, seed:Int, gameFold:String, generateGoldPath:Boolean):StepResult = {
+    this.game = game
+    this.goldPath = new LazyGoldPath(GameCache.shared, this.gameGenerator, seed, gameFold)
+    if (generateGoldPath) {
       // Check gold path is present
-      if (goldPath.length == 0) this.errorStr = "ERROR: Unable to generate gold path."
-    } else {
-      // Without gold path
-      this.game = this.gameGenerator.mkGame(seed, gameFold)
+      if (this.goldPath.goldPath.length == 0) this.errorStr = "ERROR: Unable to generate gold path."
     }
 
     // Take first 'step'
+    this.game.stepFields = this.stepFields
     this.curStepResult = game.initalStep()
     return this.curStepResult
   }
@@ -99,8 +155,27 @@ class PythonInterface() {
     stepResult.toJSON()
   }
 
+  // Mirror with binary output (see BinaryStepResultEncoder)
+  def generateNewGameBinary(seed:Int, gameFold:String, generateGoldPath:Boolean):String = {
+    val stepResult = this.generateNewGame(seed, gameFold, generateGoldPath)
+    this.binaryEncoder.encodeBase64(stepResult)
+  }
+
+  // Mirror with integer ID output (see StepResultIdEncoder)
+  def generateNewGameIds(seed:Int, gameFold:String, generateGoldPath:Boolean):String = {
+    val stepResult = this.generateNewGame(seed, gameFold, generateGoldPath)
+    this.idEncoder.encodeJSON(stepResult)
+  }
+
 
   def resetWithRandomSeed(gameFold:String, generateGoldPath:Boolean):StepResult = {
+    // Use the next prefetched game, if games are being prefetched for this fold
+    if (this.prefetcher.isDefined && this.prefetcher.get.matches(gameFold, generateGoldPath) && (this.gameGenerator != null)) {
+      this.lastAccessMsec = System.currentTimeMillis()
+      val prefetched = this.prefetcher.get.take()
+      return this.startGame(prefetched.game, prefetched.seed, gameFold, generateGoldPath)
+    }
+
     // Step 1: Create random seed according to fold
     var randSeed = -1
     gameFold match {
@@ -123,6 +198,29 @@ class PythonInterface() {
     stepResult.toJSON()
   }
 
+  // Mirror with binary output (see BinaryStepResultEncoder)
+  def resetWithRandomSeedBinary(gameFold:String, generateGoldPath:Boolean):String = {
+    val stepResult = this.resetWithRandomSeed(gameFold, generateGoldPath)
+    this.binaryEncoder.encodeBase64(stepResult)
+  }
+
+  // Mirror with integer ID output (see StepResultIdEncoder)
+  def resetWithRandomSeedIds(gameFold:String, generateGoldPath:Boolean):String = {
+    val stepResult = this.resetWithRandomSeed(gameFold, generateGoldPath)
+    this.idEncoder.encodeJSON(stepResult)
+  }
+
+
+  // Close this interface (e.g. when its session is closed), releasing the game, generator, and any snapshots
+  def close(): Unit = {
+    this.disablePrefetch()
+    this.game = null
+    this.gameGenerator = null
+    this.curStepResult = null
+    this.goldPath = null
+    this.snapshots.clear()
+    this.errorStr = "ERROR: Session is closed (either by the client, or after being idle for too long)."
+  }
 
   // Shutdown server
   def shutdown(): Unit = {
@@ -137,6 +235,9 @@ class PythonInterface() {
     GameGenerator.VALID_GAME_NAMES.toList.asJava
   }
 
+  // Mirror with JSON output (a single transfer, rather than one call per element of a java.util.List)
+  def getGameNamesJSON():String = JSON.mkList(GameGenerator.VALID_GAME_NAMES)
+
   /*
    * Get generation properties
    */
@@ -174,35 +275,50 @@ class PythonInterface() {
     return ""
   }
 
+  // Fingerprint of the current game state, as 32 hexadecimal digits (see TextGame.getStateFingerprint() ), or an empty
+  // string if the game is not initialized
+  def getStateFingerprint():String = {
+    if (this.game == null) return ""
+    return this.game.getStateFingerprint().toString
+  }
+
   /*
    * Train/development/test sets
    */
 
   def getSeedsTrain():java.util.List[Int] = {
-    return Range(0, 1000).toList.asJava
+    return PythonInterface.SEEDS_TRAIN.toList.asJava
   }
 
   def getSeedsDev():java.util.List[Int] = {
-    return Range(10000, 11000).toList.asJava
+    return PythonInterface.SEEDS_DEV.toList.asJava
   }
 
   def getSeedsTest():java.util.List[Int] = {
-    return Range(20000, 21000).toList.asJava
+    return PythonInterface.SEEDS_TEST.toList.asJava
+  }
+
+  // The seeds of each fold, as (start, end) ranges (end exclusive): {"train": [0, 1000], ...}
+  def getSeedRangesJSON():String = {
+    val ranges = for ((foldName, seeds) <- Array(("train", PythonInterface.SEEDS_TRAIN), ("dev", PythonInterface.SEEDS_DEV), ("test", PythonInterface.SEEDS_TEST))) yield {
+      "\"" + foldName + "\": [" + seeds.start + ", " + seeds.end + "]"
+    }
+    return ranges.mkString("{", ", ", "}")
   }
 
 
   def getRandomSeedTrain():Int = {
-    val randSeed = scala.util.Random.nextInt(1000) + 0
+    val randSeed = scala.util.Random.nextInt(PythonInterface.SEEDS_TRAIN.length) + PythonInterface.SEEDS_TRAIN.start
     return randSeed
   }
 
   def getRandomSeedDev():Int = {
-    val randSeed = scala.util.Random.nextInt(1000) + 10000
+    val randSeed = scala.util.Random.nextInt(PythonInterface.SEEDS_DEV.length) + PythonInterface.SEEDS_DEV.start
     return randSeed
   }
 
   def getRandomSeedTest():Int = {
-    val randSeed = scala.util.Random.nextInt(1000) + 20000
+    val randSeed = scala.util.Random.nextInt(PythonInterface.SEEDS_TEST.length) + PythonInterface.SEEDS_TEST.start
     return randSeed
   }
 
@@ -210,8 +326,77 @@ class PythonInterface() {
   /*
    * Gold action sequence
    */
+  // Generated (on a copy of the pristine game) when first requested, and memoized in the game cache
   def getGoldActionSequence():java.util.List[String] = {
-    return this.goldPath.toList.asJava
+    return this.getGoldPath().toList.asJava
+  }
+
+  // Mirror with JSON output
+  def getGoldActionSequenceJSON():String = JSON.mkList(this.getGoldPath())
+
+  private def getGoldPath():Array[String] = {
+    this.lastAccessMsec = System.currentTimeMillis()
+    if (this.goldPath == null) return Array.empty[String]
+    return this.goldPath.goldPath
+  }
+
+  // Set a directory where gold paths are stored, so that they are reused across runs (an empty string disables it).
+  // Returns an empty string on success, or an error message.  Note that this is shared by all sessions in the JVM.
+  def setGoldPathCacheDir(path:String):String = {
+    return GameCache.shared.setGoldPathDir(path)
+  }
+
+
+  /*
+   * Snapshots
+   */
+
+  // Store a deep copy of the current game state, and return a handle that can be passed to restore() (or -1 if the game is not initialized).
+  def snapshot():Int = {
+    this.lastAccessMsec = System.currentTimeMillis()
+    if (this.game == null) return -1
+
+    val handle = this.nextSnapshotHandle
+    this.nextSnapshotHandle += 1
+    this.snapshots.put(handle, new GameSnapshot(this.game.deepCopy(), this.curStepResult, this.goldPath, this.errorStr))
+    return handle
+  }
+
+  // Restore the game state stored in a snapshot.  The snapshot is kept, so it can be restored more than once.
+  // Returns an empty string on success, or an error message.
+  def restore(handle:Int):String = {
+    this.lastAccessMsec = System.currentTimeMillis()
+    val snapshot = this.snapshots.get(handle)
+    if (snapshot == null) return "ERROR: Unknown snapshot handle (" + handle + ").  The snapshot may have been released, or evicted (the maximum number of snapshots is " + this.maxSnapshots + ")."
+
+    this.game = snapshot.game.deepCopy()
+    this.stepFields = this.game.stepFields
+    this.curStepResult = snapshot.stepResult
+    this.goldPath = snapshot.goldPath
+    this.errorStr = snapshot.errorStr
+    return ""
+  }
+
+  // Release a snapshot.  Returns true if the snapshot existed.
+  def releaseSnapshot(handle:Int):Boolean = {
+    return (this.snapshots.remove(handle) != null)
+  }
+
+  def releaseAllSnapshots(): Unit = {
+    this.snapshots.clear()
+  }
+
+  def getNumSnapshots():Int = this.snapshots.size()
+
+  def setMaxSnapshots(maxSnapshots:Int): Unit = {
+    this.maxSnapshots = math.max(1, maxSnapshots)
+
+    // Evict any snapshots over the new limit (least recently used first)
+    val iter = this.snapshots.values().iterator()
+    while (this.snapshots.size() > this.maxSnapshots) {
+      iter.next()
+      iter.remove()
+    }
   }
 
 
@@ -229,6 +414,7 @@ class PythonInterface() {
 
   // Normal
   def step(userInputString:String):StepResult = {
+    this.lastAccessMsec = System.currentTimeMillis()
     // Error checking
     if (this.errorStr != "") return StepResult.mkErrorMessage(this.errorStr)
     if (this.game == null) return StepResult.mkErrorMessage(this.ERROR_MESSAGE_UNINITIALIZED)
@@ -237,7 +423,7 @@ class PythonInterface() {
     val userInputSanitized = userInputString.trim
 
     // Check for valid action
-    if (!this.curStepResult.validActions.contains(userInputSanitized)) {
+    if (!this.game.isValidAction(userInputSanitized)) {
       return StepResult.mkInvalidStep(this.curStepResult)
     }
 
@@ -254,9 +440,231 @@ class PythonInterface() {
     stepResult.toJSON()
   }
 
+  // Mirror with binary output (see BinaryStepResultEncoder)
+  def stepBinary(userInputString:String):String = {
+    val stepResult = this.step(userInputString)
+    this.binaryEncoder.encodeBase64(stepResult)
+  }
+
+  // Mirror with integer ID output (see StepResultIdEncoder)
+  def stepIds(userInputString:String):String = {
+    val stepResult = this.step(userInputString)
+    this.idEncoder.encodeJSON(stepResult)
+  }
+
+  // Step by the index of an action in the last step's valid actions (in the order they were returned)
+  def stepIndex(validActionIdx:Int):StepResult = {
+    this.lastAccessMsec = System.currentTimeMillis()
+    // Error checking
+    if (this.errorStr != "") return StepResult.mkErrorMessage(this.errorStr)
+    if (this.game == null) return StepResult.mkErrorMessage(this.ERROR_MESSAGE_UNINITIALIZED)
+
+    // Check for valid action
+    if ((validActionIdx < 0) || (validActionIdx >= this.game.getNumValidActions())) {
+      return StepResult.mkInvalidStep(this.curStepResult)
+    }
+
+    // Take step
+    this.curStepResult = game.step(validActionIdx)
+
+    // Return
+    return this.curStepResult
+  }
+
+  // Mirrors of stepIndex() for Python.  The action string that was taken (see getValidActionStr() ) is returned along
+  // with the step result (see prefixActionStr() ), so it does not need to be requested separately.
+
+  // Mirror with JSON output
+  def stepIndexJSON(validActionIdx:Int):String = {
+    val actionStr = this.getValidActionStr(validActionIdx)
+    val stepResult = this.stepIndex(validActionIdx)
+    this.prefixActionStr(actionStr, stepResult.toJSON())
+  }
+
+  // Mirror with binary output (see BinaryStepResultEncoder)
+  def stepIndexBinary(validActionIdx:Int):String = {
+    val actionStr = this.getValidActionStr(validActionIdx)
+    val stepResult = this.stepIndex(validActionIdx)
+    this.prefixActionStr(actionStr, this.binaryEncoder.encodeBase64(stepResult))
+  }
+
+  // Mirror with integer ID output (see StepResultIdEncoder)
+  def stepIndexIds(validActionIdx:Int):String = {
+    val actionStr = this.getValidActionStr(validActionIdx)
+    val stepResult = this.stepIndex(validActionIdx)
+    this.prefixActionStr(actionStr, this.idEncoder.encodeJSON(stepResult))
+  }
+
+  // Prefix an action string to an encoded step result, as "<length of the action string>:<action string><step result>".
+  // The length is in code points (rather than UTF-16 chars), so that it matches the length of the string in Python.
+  private def prefixActionStr(actionStr:String, encodedStepResult:String):String = {
+    return actionStr.codePointCount(0, actionStr.length) + ":" + actionStr + encodedStepResult
+  }
+
+  /*
+   * Lookahead
+   */
+
+  // Get the outcome of each valid action (in the order of the last step's valid actions), without changing the game:
+  // each action is taken on its own copy of the game.  Returns, for each action, the observation, score, score delta
+  // ('reward', from the current score), whether the game would be done (on task success or failure, or a score of
+  // 1.0), and the fingerprint of the next state, as JSON.  Errors are returned as {"errorStr": ...}.
+  def lookaheadJSON():String = {
+    this.lastAccessMsec = System.currentTimeMillis()
+    def mkErrorJSON(errorStr:String):String = "{\"errorStr\":\"" + JSON.sanitize(errorStr) + "\"}"
+
+    if (this.errorStr != "") return mkErrorJSON(this.errorStr)
+    if (this.game == null) return mkErrorJSON(this.ERROR_MESSAGE_UNINITIALIZED)
+
+    val curScore = this.curStepResult.scoreNormalized
+    val outcomes = new ArrayBuffer[String]()
+    for (validActionIdx <- 0 until this.game.getNumValidActions()) {
+      val gameCopy = this.game.deepCopy()
+      // Only the observation is used, so no optional fields are generated
+      gameCopy.stepFields = 0
+      val stepResult = gameCopy.step(validActionIdx)
+
+      val os = new StringBuilder()
+      os.append("{\"action\":\"" + JSON.sanitize(this.game.getValidAction(validActionIdx)._1) + "\",")
+      os.append("\"observation\":\"" + JSON.sanitize(stepResult.observationStr) + "\",")
+      os.append("\"score\":" + stepResult.scoreNormalized + ",")
+      os.append("\"reward\":" + (stepResult.scoreNormalized - curScore) + ",")
+      os.append("\"done\":" + RolloutEngine.isDone(stepResult) + ",")
+      os.append("\"tasksuccess\":" + stepResult.taskSuccess + ",")
+      os.append("\"taskfailure\":" + stepResult.taskFailure + ",")
+      os.append("\"fingerprint\":\"" + gameCopy.getStateFingerprint().toString + "\"}")
+      outcomes.append(os.toString())
+    }
+
+    return "{\"outcomes\":[" + outcomes.mkString(",") + "]}"
+  }
+
+  /*
+   * Prefetching (see GamePrefetcher)
+   */
+
+  // Generate the games for resets with a random seed (from 'gameFold', and with gold paths if 'generateGoldPath' is true)
+  // on a background thread, keeping up to 'numGames' games ready.  The random seeds are drawn from a random number
+  // generator seeded with 'seed'.  Prefetching continues (with the same settings) after loading another game.
+  // Returns an empty string on success, or an error message.
+  def enablePrefetch(numGames:Int, seed:Long, gameFold:String, generateGoldPath:Boolean):String = {
+    if (this.gameGenerator == null) return "ERROR: Game generator is not initialized.  Call load() before enabling prefetching."
+    if (numGames < 1) return "ERROR: The number of games to prefetch must be at least 1 (specified value = " + numGames + ")."
+    val seeds = PythonInterface.getSeeds(gameFold)
+    if (seeds.isEmpty) return "ERROR: Unknown game fold (" + gameFold + ").  Valid options are (train, dev, test)."
+
+    this.disablePrefetch()
+    this.prefetcher = Some( new GamePrefetcher(this.mkPrefetchGenerator(), seeds.get, gameFold, generateGoldPath, numGames, seed) )
+    return ""
+  }
+
+  // The prefetcher gets its own game generator (with the same configuration), since generators are not thread-safe
+  private def mkPrefetchGenerator():GameGenerator = {
+    val (_, gameGenerator) = GameGenerator.mkGameGenerator(this.gameName, this.properties)
+    return gameGenerator
+  }
+
+  def disablePrefetch(): Unit = {
+    if (this.prefetcher.isDefined) this.prefetcher.get.stop()
+    this.prefetcher = None
+  }
+
+  // Number of prefetched games that are ready (or -1 if prefetching is disabled)
+  def getNumPrefetchedGames():Int = {
+    if (this.prefetcher.isEmpty) return -1
+    return this.prefetcher.get.numReady()
+  }
+
+  /*
+   * Rollouts (see RolloutEngine)
+   */
+
+  // Run one episode for each seed in 'seedsStr' (a comma-delimited list) with a built-in policy ("random", "gold", or
+  // "epsilon-gold"), and return the episodes (with integer IDs for actions and observations) and summary statistics
+  // as JSON.  If 'outputPath' is not empty, the episodes are streamed to that file instead (one JSON episode per line),
+  // and only the summary statistics are returned.  Errors are returned as {"errorStr": ...}.
+  def rolloutJSON(seedsStr:String, gameFold:String, policy:String, epsilon:Double, maxSteps:Int, policySeed:Long, includeObservations:Boolean, numThreads:Int, outputPath:String):String = {
+    this.lastAccessMsec = System.currentTimeMillis()
+    def mkErrorJSON(errorStr:String):String = "{\"errorStr\":\"" + JSON.sanitize(errorStr) + "\"}"
+
+    if (this.gameGenerator == null) return mkErrorJSON("ERROR: Game generator is not initialized.  Call load() before running rollouts.")
+    if (PythonInterface.getSeeds(gameFold).isEmpty) return mkErrorJSON("ERROR: Unknown game fold (" + gameFold + ").  Valid options are (train, dev, test).")
+    if (!RolloutEngine.POLICIES.contains(policy)) return mkErrorJSON("ERROR: Unknown policy (" + policy + ").  Valid options are (" + RolloutEngine.POLICIES.mkString(", ") + ").")
+    if ((epsilon < 0.0) || (epsilon > 1.0)) return mkErrorJSON("ERROR: Epsilon must be between 0 and 1 (specified value = " + epsilon + ").")
+
+    // Parse seeds
+    val seeds = try {
+      seedsStr.split(",").map(_.trim).filter(_.nonEmpty).map(_.toInt)
+    } catch {
+      case _:NumberFormatException => return mkErrorJSON("ERROR: Unable to parse seeds (" + seedsStr + ") into integers.")
+    }
+
+    if (this.rolloutEngine == null) this.rolloutEngine = new RolloutEngine(this.gameName, this.properties)
+    try {
+      if (outputPath.isEmpty) {
+        return RolloutEngine.runToJSON(this.rolloutEngine, seeds, gameFold, policy, epsilon, maxSteps, policySeed, includeObservations, numThreads)
+      } else {
+        return RolloutEngine.runToFile(this.rolloutEngine, seeds, gameFold, policy, epsilon, maxSteps, policySeed, includeObservations, numThreads, outputPath)
+      }
+    } catch {
+      case e:Exception => return mkErrorJSON("ERROR: Rollout failed: " + e.toString)
+    }
+  }
+
+  /*
+   * Cache of pristine games (see GameCache).  Note that the cache is shared by all sessions in the JVM.
+   */
+
+  def getGameCacheStatsJSON():String = GameCache.shared.getStatsJSON()
+
+  // Set the maximum number of cached games (0 disables the cache).  This limits the number of games, not their memory.
+  def setGameCacheSize(maxGames:Int): Unit = {
+    GameCache.shared.setMaxGames(maxGames)
+  }
+
+  def clearGameCache(): Unit = {
+    GameCache.shared.clear()
+  }
+
+  /*
+   * Integer ID vocabularies (see StepResultIdEncoder)
+   */
+
+  def getTextVocabulary():java.util.List[String] = this.idEncoder.textVocabulary.strings.toList.asJava
+
+  def getActionVocabulary():java.util.List[String] = this.idEncoder.actionVocabulary.strings.toList.asJava
+
+  def resetVocabularies(): Unit = {
+    this.idEncoder.clear()
+  }
+
+  // Get the string of an action in the last step's valid actions (or an empty string, if the index is out of range)
+  def getValidActionStr(validActionIdx:Int):String = {
+    if ((this.game == null) || (validActionIdx < 0) || (validActionIdx >= this.game.getNumValidActions())) return ""
+    return this.game.getValidAction(validActionIdx)._1
+  }
+
+}
+
+// Storage class for a snapshot of the game state (see PythonInterface.snapshot() )
+class GameSnapshot(val game:TextGame, val stepResult:StepResult, val goldPath:LazyGoldPath, val errorStr:String) {
+
 }
 
 object PythonInterface {
+  // Seeds of each fold
+  val SEEDS_TRAIN:Range = Range(0, 1000)
+  val SEEDS_DEV:Range = Range(10000, 11000)
+  val SEEDS_TEST:Range = Range(20000, 21000)
+
+  def getSeeds(gameFold:String):Option[Range] = {
+    gameFold match {
+      case "train" => Some(SEEDS_TRAIN)
+      case "dev" => Some(SEEDS_DEV)
+      case "test" => Some(SEEDS_TEST)
+      case _ => None
+    }
+  }
 
   /*
    * Helper functions
@@ -292,27 +700,39 @@ object PythonInterface {
   }
 
   def printUsage(): Unit = {
-    println("Usage: PythonInterface <portNumber>")
+    println("Usage: PythonInterface [portNumber] [--idleTimeout <seconds>]")
+    println("  --idleTimeout: Close sessions (see SessionRegistry) that have not been used for this many seconds (default: never).")
   }
 
   def main(args:Array[String]): Unit = {
     println ("Initializing TextWorldExpress Python Server...")
     val obj = new PythonInterface()
 
-    // Parse command line argument for port
+    // Parse command line arguments
     var port:Int = 25335      // Default port (if not specified)
-    if (args.length == 1) {
+    var idleTimeoutSec:Int = 0
+    var i:Int = 0
+    while (i < args.length) {
       try {
-        port = args(0).toInt
+        if (args(i) == "--idleTimeout") {
+          idleTimeoutSec = args(i+1).toInt
+          i += 2
+        } else {
+          port = args(i).toInt
+          i += 1
+        }
       } catch {
         case e:Throwable => {
           printUsage()
-          throw new RuntimeException("ERROR: Unable to parse port number into integer(" + args(0) + ").")
+          throw new RuntimeException("ERROR: Unable to parse command line arguments (" + args.mkString(" ") + ").")
         }
       }
-    } else if (args.length > 1) {
-      printUsage()
-      sys.exit(1)
+    }
+
+    // Idle session cleanup
+    if (idleTimeoutSec > 0) {
+      println ("Closing sessions that are idle for more than " + idleTimeoutSec + " seconds.")
+      SessionRegistry.startIdleSessionCleanup(idleTimeoutSec)
     }
 
     println ("Starting server on port " + port + ".")
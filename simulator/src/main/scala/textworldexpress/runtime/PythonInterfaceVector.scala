@@ -0,0 +1,260 @@
+package textworldexpress.runtime
+
+import java.util.concurrent.{Callable, ExecutorService, Executors, Future, ThreadFactory}
+
+import textworldexpress.JSON
+import textworldexpress.generator.GameGenerator
+import textworldexpress.struct.StepResult
+
+import collection.JavaConverters._
+
+
+/*
+ * A vectorized version of the Python interface, that holds N independent games and steps/resets all of them in a
+ * single call (i.e. a single py4j round trip).  Each game is backed by its own PythonInterface instance.
+ * Batched inputs (seeds, actions) are passed in as delimited strings, and results are returned as a single JSON array.
+ * Optionally, the games in a batch can be stepped/reset in parallel on a fixed-size thread pool (see setNumThreads()).
+ */
+class PythonInterfaceVector(val numEnvs:Int) {
+  val envs = Array.fill[PythonInterface](numEnvs)(new PythonInterface())
+
+  // Per-environment episode bookkeeping (used for calculating reward/done, and for auto-resetting finished games)
+  val numMoves = new Array[Int](numEnvs)
+  val lastScores = new Array[Double](numEnvs)
+
+  var envStepLimit:Int = 100
+  var autoReset:Boolean = false
+
+  // Options from the last reset (reused when auto-resetting)
+  var gameFold:String = "train"
+  var generateGoldPath:Boolean = false
+
+  // Thread pool for parallel batches (None = run batches serially on the calling thread)
+  private var numThreads:Int = 1
+  private var threadPool:Option[ExecutorService] = None
+
+  // Timing of the last batch (used for sizing the thread pool)
+  private var lastBatchWallNanos:Long = 0
+  private val lastBatchEnvNanos = new Array[Long](numEnvs)
+
+  /*
+   * Configuration
+   */
+  def load(gameName:String, paramStr:String):String = {
+    for (env <- this.envs) {
+      val errMsg = env.load(gameName, paramStr)
+      if (errMsg != "") return errMsg
+    }
+    return ""
+  }
+
+  def setEnvStepLimit(envStepLimit:Int): Unit = {
+    this.envStepLimit = envStepLimit
+  }
+
+  def setAutoReset(autoReset:Boolean): Unit = {
+    this.autoReset = autoReset
+  }
+
+  def getNumEnvs():Int = this.numEnvs
+
+  // Set the number of threads used to step/reset the games in a batch.  Values of 1 (or less) run batches serially.
+  def setNumThreads(numThreads:Int): Unit = {
+    this.shutdownThreadPool()
+    this.numThreads = math.max(1, numThreads)
+
+    if (this.numThreads > 1) {
+      // Daemon threads, so an idle pool never keeps the JVM alive
+      val threadFactory = new ThreadFactory {
+        val defaultFactory = Executors.defaultThreadFactory()
+        def newThread(r:Runnable):Thread = {
+          val thread = defaultFactory.newThread(r)
+          thread.setDaemon(true)
+          thread
+        }
+      }
+      this.threadPool = Some( Executors.newFixedThreadPool(this.numThreads, threadFactory) )
+    }
+  }
+
+  def getNumThreads():Int = this.numThreads
+
+  def shutdownThreadPool(): Unit = {
+    if (this.threadPool.isDefined) this.threadPool.get.shutdown()
+    this.threadPool = None
+    this.numThreads = 1
+  }
+
+  /*
+   * Reset
+   */
+
+  // Reset a single environment, with a specific seed (or a random seed from the fold, if the seed is negative).
+  private def resetEnv(envIdx:Int, seed:Int):StepResult = {
+    this.numMoves(envIdx) = 0
+    this.lastScores(envIdx) = 0.0
+
+    if (seed < 0) {
+      return this.envs(envIdx).resetWithRandomSeed(this.gameFold, this.generateGoldPath)
+    } else {
+      return this.envs(envIdx).generateNewGame(seed, this.gameFold, this.generateGoldPath)
+    }
+  }
+
+  // Serialize the first step of a freshly reset environment (including the task description, which is constant for the episode)
+  private def mkResetJSON(envIdx:Int, stepResult:StepResult):String = {
+    val extraFields = "\"reward\":0.0,\"done\":false,\"numMoves\":0,\"taskDescription\":\"" + JSON.sanitize(this.envs(envIdx).getTaskDescription()) + "\""
+    return stepResult.toJSON(extraFields)
+  }
+
+  // Reset all environments.
+  // 'seedsStr' is a comma-delimited list of seeds (one per environment), where negative values request a random seed from the fold.
+  // An empty string uses random seeds for all environments.
+  def resetJSON(seedsStr:String, gameFold:String, generateGoldPath:Boolean):String = {
+    this.gameFold = gameFold
+    this.generateGoldPath = generateGoldPath
+
+    // Parse seeds
+    val seeds = Array.fill[Int](numEnvs)(-1)
+    if (seedsStr.trim.length > 0) {
+      val fields = seedsStr.split(",").map(_.trim)
+      if (fields.length != numEnvs) return this.mkErrorJSON("ERROR: Expected " + numEnvs + " seeds (found " + fields.length + ").")
+      for (i <- 0 until numEnvs) {
+        try {
+          seeds(i) = fields(i).toInt
+        } catch {
+          case _:Throwable => return this.mkErrorJSON("ERROR: Unable to parse seed (" + fields(i) + ") into an integer.")
+        }
+      }
+    }
+
+    // Reset
+    val out = this.runBatch( i => this.mkResetJSON(i, this.resetEnv(i, seeds(i))) )
+    return out.mkString("[", ",", "]")
+  }
+
+  /*
+   * Step
+   */
+
+  // Take one step in environment 'envIdx', and serialize the result (including reward/done/numMoves).
+  // If auto-reset is enabled and the episode is completed, the environment is reset, and its first step is included in the 'reset' field.
+  private def stepEnv(envIdx:Int, actionStr:String):String = {
+    val stepResult = this.envs(envIdx).step(actionStr)
+    this.numMoves(envIdx) += 1
+
+    // Calculate reward (delta score)
+    val score = stepResult.scoreNormalized
+    val reward = score - this.lastScores(envIdx)
+    this.lastScores(envIdx) = score
+
+    // Calculate whether a 'done' condition has been met (mirrors TextWorldExpressEnv.step() )
+    var isCompleted:Boolean = false
+    if (this.numMoves(envIdx) > this.envStepLimit) isCompleted = true
+    if (score >= 1.0) isCompleted = true
+    if (stepResult.taskSuccess || stepResult.taskFailure) isCompleted = true
+
+    var extraFields = "\"reward\":" + reward + ",\"done\":" + isCompleted + ",\"numMoves\":" + this.numMoves(envIdx)
+
+    // Auto-reset
+    if (isCompleted && this.autoReset) {
+      val resetResult = this.resetEnv(envIdx, seed = -1)
+      extraFields += ",\"reset\":" + this.mkResetJSON(envIdx, resetResult)
+    }
+
+    return stepResult.toJSON(extraFields)
+  }
+
+  // Step all environments.
+  // 'actionsStr' is a newline-delimited list of actions (one per environment).
+  def stepJSON(actionsStr:String):String = {
+    val actions = actionsStr.split("\n", -1)
+    if (actions.length != numEnvs) return this.mkErrorJSON("ERROR: Expected " + numEnvs + " actions (found " + actions.length + ").")
+
+    val out = this.runBatch( i => this.stepEnv(i, actions(i)) )
+    return out.mkString("[", ",", "]")
+  }
+
+  /*
+   * Batch execution
+   */
+
+  // Run 'fn' once for each environment index, and return the results in environment order.
+  // Each game is only ever touched by one task per batch, so results are the same whether the batch is run serially or in parallel.
+  private def runBatch(fn:Int => String):Array[String] = {
+    val out = new Array[String](numEnvs)
+    val startTime = System.nanoTime()
+
+    // Run one environment, keeping track of how long it took
+    def runTimed(envIdx:Int):String = {
+      val envStartTime = System.nanoTime()
+      val result = fn(envIdx)
+      this.lastBatchEnvNanos(envIdx) = System.nanoTime() - envStartTime
+      result
+    }
+
+    if (this.threadPool.isEmpty) {
+      // Serial
+      for (i <- 0 until numEnvs) out(i) = runTimed(i)
+    } else {
+      // Parallel
+      val futures = new Array[Future[String]](numEnvs)
+      for (i <- 0 until numEnvs) {
+        futures(i) = this.threadPool.get.submit(new Callable[String] {
+          def call():String = runTimed(i)
+        })
+      }
+      for (i <- 0 until numEnvs) out(i) = futures(i).get()
+    }
+
+    this.lastBatchWallNanos = System.nanoTime() - startTime
+    return out
+  }
+
+  // Timing of the last batch (reset or step).  'envMsecTotal' is the time spent in the games themselves, so
+  // 'envMsecTotal / wallMsec' is the effective parallelism achieved by the thread pool.
+  def getBatchTimingJSON():String = {
+    val wallMsec = this.lastBatchWallNanos.toDouble / 1000000.0
+    val envMsecTotal = this.lastBatchEnvNanos.sum.toDouble / 1000000.0
+    val envMsecMax = if (numEnvs > 0) { this.lastBatchEnvNanos.max.toDouble / 1000000.0 } else { 0.0 }
+    val parallelism = if (wallMsec > 0) { envMsecTotal / wallMsec } else { 0.0 }
+
+    val os = new StringBuilder()
+    os.append("{")
+    os.append("\"numEnvs\":" + numEnvs + ",")
+    os.append("\"numThreads\":" + numThreads + ",")
+    os.append("\"wallMsec\":" + wallMsec + ",")
+    os.append("\"envMsecTotal\":" + envMsecTotal + ",")
+    os.append("\"envMsecMax\":" + envMsecMax + ",")
+    os.append("\"parallelism\":" + parallelism)
+    os.append("}")
+    return os.toString()
+  }
+
+  /*
+   * Accessors
+   */
+  def getGameNames():java.util.List[String] = {
+    GameGenerator.VALID_GAME_NAMES.toList.asJava
+  }
+
+  def getGameNamesJSON():String = JSON.mkList(GameGenerator.VALID_GAME_NAMES)
+
+  def getTaskDescription(envIdx:Int):String = this.envs(envIdx).getTaskDescription()
+
+  def getGoldActionSequence(envIdx:Int):java.util.List[String] = this.envs(envIdx).getGoldActionSequence()
+
+  def getGoldActionSequenceJSON(envIdx:Int):String = this.envs(envIdx).getGoldActionSequenceJSON()
+
+  def getGenerationPropertiesJSON(envIdx:Int):String = this.envs(envIdx).getGenerationPropertiesJSON()
+
+  /*
+   * Helpers
+   */
+  // Error messages are returned as a JSON array with one error step result per environment, so that the shape of the output is unchanged.
+  private def mkErrorJSON(errorStr:String):String = {
+    val errorJSON = StepResult.mkErrorMessage(errorStr).toJSON("\"reward\":0.0,\"done\":true,\"numMoves\":0")
+    return Array.fill[String](numEnvs)(errorJSON).mkString("[", ",", "]")
+  }
+
+}
@@ -0,0 +1,223 @@
+package textworldexpress.runtime
+
+import java.io.{BufferedWriter, FileOutputStream, OutputStreamWriter}
+import java.nio.charset.StandardCharsets
+import java.util.concurrent.{Callable, ExecutorService, Executors, Future, ThreadFactory}
+
+import textworldexpress.JSON
+import textworldexpress.generator.GameGenerator
+import textworldexpress.objects.FastObject
+import textworldexpress.struct.{StepResult, StringVocabulary}
+
+import scala.collection.mutable.ArrayBuffer
+import scala.util.Random
+
+
+/*
+ * Runs whole episodes on the JVM with a built-in policy, for fast data collection (a single call runs many episodes,
+ * instead of making one py4j round trip per step).  The policies are:
+ *  - "random": a uniformly random valid action at each step
+ *  - "gold": the actions of the game's gold path (see GameCache.getGoldPath() )
+ *  - "epsilon-gold": with probability 'epsilon', a random valid action.  Otherwise, the next action of the gold path
+ *    (or a random valid action, if the gold path is finished).  Gold path actions that are not valid are skipped.
+ * Episodes end on task success or failure, on reaching a score of 1.0, or after 'maxSteps' steps.
+ * Each episode's random choices come from a random number generator seeded with both 'policySeed' and the episode's
+ * seed, so the trajectories do not depend on the number of threads, or on the other episodes in the call.
+ * Each thread has its own game generator, since generators are not thread-safe.
+ */
+class RolloutEngine(val gameName:String, val properties:Map[String, Int]) {
+  private val gameGenerators = new ArrayBuffer[GameGenerator]()
+
+  // Run one episode
+  def runEpisode(gameGenerator:GameGenerator, seed:Int, gameFold:String, policy:String, epsilon:Double, maxSteps:Int, policySeed:Long, includeObservations:Boolean):RolloutEpisode = {
+    val random = new Random(policySeed * 1000003L + seed)
+    val game = GameCache.shared.getGame(gameGenerator, seed, gameFold)
+    // Only the observations are used, so no optional fields are generated (valid actions are still indexed by the game)
+    game.stepFields = 0
+
+    val goldPath = if (policy == RolloutEngine.POLICY_RANDOM) { Array.empty[String] } else { GameCache.shared.getGoldPath(gameGenerator, seed, gameFold) }
+    var goldIdx:Int = 0
+
+    val actions = new ArrayBuffer[String]()
+    val scores = new ArrayBuffer[Double]()
+    val observations = new ArrayBuffer[String]()
+
+    var stepResult = game.initalStep()
+    if (includeObservations) observations.append(stepResult.observationStr)
+
+    while ((actions.length < maxSteps) && !RolloutEngine.isDone(stepResult) && (game.getNumValidActions() > 0)) {
+      // Choose the next action
+      var action:(String, Int, Array[FastObject]) = null
+      val useGold = (policy == RolloutEngine.POLICY_GOLD) || ((policy == RolloutEngine.POLICY_EPSILON_GOLD) && (random.nextDouble() >= epsilon))
+      if (useGold) {
+        // Gold paths can include actions that are not valid (e.g. opening a container that is already open), which
+        // would have no effect, so they are skipped
+        while ((action == null) && (goldIdx < goldPath.length)) {
+          action = game.getValidAction(goldPath(goldIdx))
+          goldIdx += 1
+        }
+      }
+      if (action == null) {
+        // The gold policy only takes gold actions (and stops when there are none left)
+        if (policy == RolloutEngine.POLICY_GOLD) return new RolloutEpisode(seed, actions.toArray, scores.toArray, observations.toArray, stepResult.taskSuccess, stepResult.taskFailure)
+        action = game.getValidAction(random.nextInt(game.getNumValidActions()))
+      }
+
+      // Take it
+      stepResult = game.step(action._1, action._2, action._3)
+      actions.append(action._1)
+      scores.append(stepResult.scoreNormalized)
+      if (includeObservations) observations.append(stepResult.observationStr)
+    }
+
+    return new RolloutEpisode(seed, actions.toArray, scores.toArray, observations.toArray, stepResult.taskSuccess, stepResult.taskFailure)
+  }
+
+  // Run the episodes for each seed (in parallel on 'numThreads' threads), passing them to 'output' in order of their seeds.
+  // Episodes are run in chunks, so that only a chunk of episodes is kept in memory at a time.
+  def run(seeds:Array[Int], gameFold:String, policy:String, epsilon:Double, maxSteps:Int, policySeed:Long, includeObservations:Boolean, numThreads:Int, output:RolloutEpisode => Unit): Unit = {
+    val numWorkers = math.max(1, math.min(numThreads, seeds.length))
+    while (this.gameGenerators.length < numWorkers) {
+      val (success, gameGenerator) = GameGenerator.mkGameGenerator(this.gameName, this.properties)
+      if (!success) throw new RuntimeException("ERROR: Unable to create game generator: " + gameGenerator.errorStr)
+      this.gameGenerators.append(gameGenerator)
+    }
+
+    if (numWorkers == 1) {
+      for (seed <- seeds) output( this.runEpisode(this.gameGenerators(0), seed, gameFold, policy, epsilon, maxSteps, policySeed, includeObservations) )
+      return
+    }
+
+    // Parallel: each worker runs every numWorkers'th episode of a chunk, with its own game generator
+    val threadPool = RolloutEngine.mkThreadPool(numWorkers)
+    try {
+      for (chunkStart <- seeds.indices by RolloutEngine.CHUNK_SIZE) {
+        val chunk = seeds.slice(chunkStart, chunkStart + RolloutEngine.CHUNK_SIZE)
+        val episodes = new Array[RolloutEpisode](chunk.length)
+        val futures = new Array[Future[Unit]](numWorkers)
+        for (workerIdx <- 0 until numWorkers) {
+          futures(workerIdx) = threadPool.submit(new Callable[Unit] {
+            def call(): Unit = {
+              for (i <- workerIdx until chunk.length by numWorkers) {
+                episodes(i) = runEpisode(gameGenerators(workerIdx), chunk(i), gameFold, policy, epsilon, maxSteps, policySeed, includeObservations)
+              }
+            }
+          })
+        }
+        for (future <- futures) future.get()
+        for (episode <- episodes) output(episode)
+      }
+    } finally {
+      threadPool.shutdown()
+    }
+  }
+
+}
+
+
+// Storage class for one episode.  'scores' are the (normalized) scores after each action, and 'observations' (if
+// requested) are the observations before the first action, and after each action.
+class RolloutEpisode(val seed:Int, val actions:Array[String], val scores:Array[Double], val observations:Array[String], val taskSuccess:Boolean, val taskFailure:Boolean) {
+
+}
+
+
+/*
+ * Encodes episodes as JSON, with integer IDs in place of action and observation strings (as in StepResultIdEncoder).
+ * Each episode includes the strings that were added to the vocabularies since the previous episode ("newActions" and
+ * "newTexts"), so that a stream of episodes can be decoded in order.
+ */
+class RolloutEncoder {
+  val actionVocabulary = new StringVocabulary()
+  val textVocabulary = new StringVocabulary()
+  private var numActionsSent:Int = 0
+  private var numTextsSent:Int = 0
+
+  // Summary statistics
+  var numEpisodes:Int = 0
+  var numSteps:Long = 0
+  var numSuccesses:Int = 0
+
+  def encodeJSON(episode:RolloutEpisode):String = {
+    this.numEpisodes += 1
+    this.numSteps += episode.actions.length
+    if (episode.taskSuccess) this.numSuccesses += 1
+
+    val os = new StringBuilder()
+    os.append("{\"seed\":" + episode.seed + ",")
+    os.append("\"actions\":[" + episode.actions.map(this.actionVocabulary.getId).mkString(",") + "],")
+    os.append("\"scores\":[" + episode.scores.mkString(",") + "],")
+    if (episode.observations.nonEmpty) os.append("\"observations\":[" + episode.observations.map(this.textVocabulary.getId).mkString(",") + "],")
+    os.append("\"tasksuccess\":" + episode.taskSuccess + ",")
+    os.append("\"taskfailure\":" + episode.taskFailure + ",")
+
+    // New strings
+    os.append("\"newActions\":" + JSON.mkList( this.actionVocabulary.strings.view.slice(this.numActionsSent, this.actionVocabulary.size) ) + ",")
+    os.append("\"newTexts\":" + JSON.mkList( this.textVocabulary.strings.view.slice(this.numTextsSent, this.textVocabulary.size) ))
+    this.numActionsSent = this.actionVocabulary.size
+    this.numTextsSent = this.textVocabulary.size
+
+    os.append("}")
+    return os.toString()
+  }
+
+  def getSummaryJSON():String = {
+    return "\"numEpisodes\":" + this.numEpisodes + ",\"numSteps\":" + this.numSteps + ",\"numSuccesses\":" + this.numSuccesses
+  }
+
+}
+
+
+object RolloutEngine {
+  val POLICY_RANDOM = "random"
+  val POLICY_GOLD = "gold"
+  val POLICY_EPSILON_GOLD = "epsilon-gold"
+  val POLICIES = Array(POLICY_RANDOM, POLICY_GOLD, POLICY_EPSILON_GOLD)
+
+  // Number of episodes run (and kept in memory) at a time, when running in parallel
+  val CHUNK_SIZE:Int = 1024
+
+  // Same conditions as the Python environment (except for the step limit, which is checked by the caller)
+  def isDone(stepResult:StepResult):Boolean = {
+    return stepResult.taskSuccess || stepResult.taskFailure || (stepResult.scoreNormalized >= 1.0)
+  }
+
+  // Run episodes, and return them as a single JSON object (with the episodes, vocabularies, and summary statistics).
+  def runToJSON(engine:RolloutEngine, seeds:Array[Int], gameFold:String, policy:String, epsilon:Double, maxSteps:Int, policySeed:Long, includeObservations:Boolean, numThreads:Int):String = {
+    val encoder = new RolloutEncoder()
+    val episodesJSON = new ArrayBuffer[String]()
+    engine.run(seeds, gameFold, policy, epsilon, maxSteps, policySeed, includeObservations, numThreads, episode => episodesJSON.append(encoder.encodeJSON(episode)))
+
+    return "{" + encoder.getSummaryJSON() + ",\"episodes\":[" + episodesJSON.mkString(",") + "]}"
+  }
+
+  // Run episodes, streaming them to a file (one JSON episode per line), and return the summary statistics as JSON.
+  def runToFile(engine:RolloutEngine, seeds:Array[Int], gameFold:String, policy:String, epsilon:Double, maxSteps:Int, policySeed:Long, includeObservations:Boolean, numThreads:Int, filename:String):String = {
+    val encoder = new RolloutEncoder()
+    val writer = new BufferedWriter(new OutputStreamWriter(new FileOutputStream(filename), StandardCharsets.UTF_8))
+    try {
+      engine.run(seeds, gameFold, policy, epsilon, maxSteps, policySeed, includeObservations, numThreads, episode => {
+        writer.write(encoder.encodeJSON(episode))
+        writer.write("\n")
+      })
+    } finally {
+      writer.close()
+    }
+
+    return "{" + encoder.getSummaryJSON() + "}"
+  }
+
+  private def mkThreadPool(numThreads:Int):ExecutorService = {
+    // Daemon threads, so the pool never keeps the JVM alive
+    val threadFactory = new ThreadFactory {
+      val defaultFactory = Executors.defaultThreadFactory()
+      def newThread(r:Runnable):Thread = {
+        val thread = defaultFactory.newThread(r)
+        thread.setDaemon(true)
+        thread
+      }
+    }
+    return Executors.newFixedThreadPool(numThreads, threadFactory)
+  }
+
+}
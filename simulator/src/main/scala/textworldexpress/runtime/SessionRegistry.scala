@@ -0,0 +1,101 @@
+package textworldexpress.runtime
+
+import java.util.concurrent.{ConcurrentHashMap, Executors, ScheduledExecutorService, ThreadFactory, TimeUnit}
+import java.util.concurrent.atomic.AtomicInteger
+
+import collection.JavaConverters._
+
+
+/*
+ * A registry of PythonInterface sessions, so that a single JVM can host many environments.
+ * Each session is an independent PythonInterface (its own game generator, game, and snapshots), keyed by a session id.
+ * Sessions can be created/accessed/closed from any number of gateway connections (and Python processes) at the same time.
+ * For long-running servers, sessions that have not been used for some time (e.g. from clients that exited without
+ * closing them) can be closed automatically (see startIdleSessionCleanup() ).
+ */
+object SessionRegistry {
+  private val sessions = new ConcurrentHashMap[Int, PythonInterface]()
+  private val nextSessionId = new AtomicInteger(0)
+
+  // Background thread that periodically closes idle sessions
+  private var cleanupThread:Option[ScheduledExecutorService] = None
+
+  // Create a new session, and return its id
+  def newSession():Int = {
+    val sessionId = this.nextSessionId.getAndIncrement()
+    this.sessions.put(sessionId, new PythonInterface())
+    return sessionId
+  }
+
+  // Get the interface for a session (or null, if the session does not exist)
+  def getSession(sessionId:Int):PythonInterface = {
+    return this.sessions.get(sessionId)
+  }
+
+  // Close a session.  Returns true if the session existed.
+  def closeSession(sessionId:Int):Boolean = {
+    val session = this.sessions.remove(sessionId)
+    if (session == null) return false
+
+    session.close()
+    return true
+  }
+
+  def getNumSessions():Int = this.sessions.size()
+
+  def getSessionIds():java.util.List[Int] = {
+    return this.sessions.keySet().asScala.toList.sorted.asJava
+  }
+
+  /*
+   * Idle sessions
+   */
+
+  // Close any sessions that have not been used in the last 'idleTimeoutMsec' milliseconds.  Returns the number of sessions closed.
+  def closeIdleSessions(idleTimeoutMsec:Long):Int = {
+    val curTime = System.currentTimeMillis()
+    var numClosed:Int = 0
+    for (sessionId <- this.sessions.keySet().asScala.toList) {
+      val session = this.sessions.get(sessionId)
+      if ((session != null) && (curTime - session.lastAccessMsec > idleTimeoutMsec)) {
+        if (this.sessions.remove(sessionId, session)) {
+          session.close()
+          numClosed += 1
+        }
+      }
+    }
+    return numClosed
+  }
+
+  // Start closing sessions that have been idle for more than 'idleTimeoutSec' seconds (checked periodically, in the background).
+  def startIdleSessionCleanup(idleTimeoutSec:Int): Unit = synchronized {
+    this.stopIdleSessionCleanup()
+
+    // Daemon thread, so that it never keeps the JVM alive
+    val threadFactory = new ThreadFactory {
+      def newThread(r:Runnable):Thread = {
+        val thread = new Thread(r, "SessionRegistry-idle-cleanup")
+        thread.setDaemon(true)
+        thread
+      }
+    }
+
+    val idleTimeoutMsec = idleTimeoutSec.toLong * 1000
+    val checkIntervalMsec = math.max(1000L, math.min(idleTimeoutMsec / 2, 60000L))
+    val executor = Executors.newSingleThreadScheduledExecutor(threadFactory)
+    executor.scheduleWithFixedDelay(new Runnable {
+      def run(): Unit = {
+        val numClosed = closeIdleSessions(idleTimeoutMsec)
+        if (numClosed > 0) println ("Closed " + numClosed + " idle session(s).")
+      }
+    }, checkIntervalMsec, checkIntervalMsec, TimeUnit.MILLISECONDS)
+
+    this.cleanupThread = Some(executor)
+  }
+
+  def stopIdleSessionCleanup(): Unit = synchronized {
+    if (this.cleanupThread.isDefined) this.cleanupThread.get.shutdown()
+    this.cleanupThread = None
+  }
+
+}
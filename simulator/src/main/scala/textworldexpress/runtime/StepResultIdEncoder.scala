@@ -0,0 +1,60 @@
+package textworldexpress.runtime
+
+import textworldexpress.JSON
+import textworldexpress.struct.{StepResult, StringVocabulary}
+
+
+/*
+ * Encodes StepResults with integer IDs in place of strings, so that strings that repeat across steps (e.g. "move north",
+ * or the description of a room) are only transferred once.  Action strings and texts (observation, look, inventory) have
+ * separate vocabularies, whose IDs are stable for as long as the encoder exists (i.e. across steps, episodes and games).
+ * Each result is JSON, with the same keys as StepResult.toJSON(), but with IDs as values, plus the strings that were added
+ * to each vocabulary since the last result ("newTexts" and "newActions", in ID order).
+ */
+class StepResultIdEncoder {
+  val textVocabulary = new StringVocabulary()
+  val actionVocabulary = new StringVocabulary()
+
+  // Number of strings in each vocabulary that have already been sent
+  private var numTextsSent:Int = 0
+  private var numActionsSent:Int = 0
+
+  def encodeJSON(stepResult:StepResult):String = synchronized {
+    val os = new StringBuilder()
+    os.append("{")
+    os.append("\"observation\":" + this.textVocabulary.getId(stepResult.observationStr) + ",")
+    if (stepResult.freeLookStr != null) os.append("\"look\":" + this.textVocabulary.getId(stepResult.freeLookStr) + ",")
+    if (stepResult.inventoryStr != null) os.append("\"inventory\":" + this.textVocabulary.getId(stepResult.inventoryStr) + ",")
+    if (stepResult.validActions != null) os.append("\"validActions\":[" + stepResult.validActions.map(this.actionVocabulary.getId).mkString(",") + "],")
+    os.append("\"scoreRaw\":" + stepResult.scoreRaw + ",")
+    os.append("\"score\":" + stepResult.scoreNormalized + ",")
+    os.append("\"tasksuccess\": " + stepResult.taskSuccess + ",")
+    os.append("\"taskfailure\": " + stepResult.taskFailure + ",")
+
+    // New strings
+    os.append("\"newTexts\":" + StepResultIdEncoder.mkJSONList(this.textVocabulary, this.numTextsSent) + ",")
+    os.append("\"newActions\":" + StepResultIdEncoder.mkJSONList(this.actionVocabulary, this.numActionsSent))
+    this.numTextsSent = this.textVocabulary.size
+    this.numActionsSent = this.actionVocabulary.size
+
+    os.append("}")
+    return os.toString()
+  }
+
+  // Clear both vocabularies (IDs are reassigned from 0)
+  def clear(): Unit = synchronized {
+    this.textVocabulary.clear()
+    this.actionVocabulary.clear()
+    this.numTextsSent = 0
+    this.numActionsSent = 0
+  }
+
+}
+
+object StepResultIdEncoder {
+
+  private def mkJSONList(vocabulary:StringVocabulary, startIdx:Int):String = {
+    return JSON.mkList( vocabulary.strings.view.slice(startIdx, vocabulary.size) )
+  }
+
+}
@@ -0,0 +1,86 @@
+package textworldexpress.struct
+
+import java.util.concurrent.ConcurrentHashMap
+
+
+/*
+ * A thread-safe StringVocabulary: assigns stable integer IDs to strings, in the order they are first seen.
+ * Looking up strings that are already in the vocabulary (the common case, e.g. when crawling) does not take a lock, so
+ * many threads can intern strings at once.  Only adding new strings is serialized, and getIds() adds all the new
+ * strings of a batch (e.g. the strings of one step) under a single lock.
+ */
+class ConcurrentStringVocabulary(initialCapacity:Int = 1024) {
+  private val ids = new ConcurrentHashMap[String, Integer](initialCapacity)
+  // The string for each ID.  The array is replaced (never changed in place below 'numStrings') when it grows, and
+  // 'numStrings' is only increased after the string is stored, so strings can be read without taking the lock.
+  @volatile private var strings = new Array[String](math.max(16, initialCapacity))
+  @volatile private var numStrings:Int = 0
+
+  // Get the ID of a string, adding it to the vocabulary if it has not been seen before
+  def getId(str:String):Int = {
+    val id = this.ids.get(str)
+    if (id != null) return id.intValue()
+
+    return synchronized { this.add(str) }
+  }
+
+  // Get the IDs of several strings at once (into 'out'), adding the ones that have not been seen before (in order)
+  def getIds(strs:Array[String], out:Array[Int]): Unit = {
+    var numMissing:Int = 0
+    var i:Int = 0
+    while (i < strs.length) {
+      val id = this.ids.get(strs(i))
+      if (id != null) {
+        out(i) = id.intValue()
+      } else {
+        out(i) = -1
+        numMissing += 1
+      }
+      i += 1
+    }
+    if (numMissing == 0) return
+
+    synchronized {
+      for (i <- 0 until strs.length) {
+        if (out(i) < 0) out(i) = this.add(strs(i))
+      }
+    }
+  }
+
+  def contains(str:String):Boolean = this.ids.containsKey(str)
+
+  def getStr(id:Int):String = {
+    if ((id < 0) || (id >= this.numStrings)) throw new IndexOutOfBoundsException("String ID " + id + " is not in the vocabulary (size " + this.numStrings + ").")
+    return this.strings(id)
+  }
+
+  def size:Int = this.numStrings
+
+  // The strings with IDs from 'startIdx' onwards (e.g. the strings added since they were last saved)
+  def getStrs(startIdx:Int = 0):Array[String] = {
+    val numStrings = this.numStrings
+    return java.util.Arrays.copyOfRange(this.strings, math.min(startIdx, numStrings), numStrings)
+  }
+
+  // Note: Not safe to call while other threads are using the vocabulary
+  def clear(): Unit = synchronized {
+    this.ids.clear()
+    this.strings = new Array[String](this.strings.length)
+    this.numStrings = 0
+  }
+
+  // Must hold the lock
+  private def add(str:String):Int = {
+    // Another thread may have added the string since it was looked up
+    val existing = this.ids.get(str)
+    if (existing != null) return existing.intValue()
+
+    val id = this.numStrings
+    if (id >= this.strings.length) this.strings = java.util.Arrays.copyOf(this.strings, this.strings.length * 2)
+    this.strings(id) = str
+    this.numStrings = id + 1
+    this.ids.put(str, id)
+    return id
+  }
+
+}
@@ -0,0 +1,43 @@
+package textworldexpress.struct
+
+import scala.util.Random
+
+/*
+ * A java.util.Random whose internal state can be copied to another instance, so that a cloned game continues to
+ * generate exactly the same random sequence (e.g. for shuffling the valid action list) as the game it was cloned from.
+ * This uses the same linear congruential generator as java.util.Random, so a given seed produces the same sequence.
+ */
+class CopyableRandom(seed:Long) extends java.util.Random(seed) {
+  // Note: no initializer, since the superclass constructor sets this (through setSeed()) before this class is initialized
+  private var state:Long = _
+
+  override def setSeed(seed:Long): Unit = synchronized {
+    super.setSeed(seed)
+    this.state = (seed ^ CopyableRandom.MULTIPLIER) & CopyableRandom.MASK
+  }
+
+  override protected def next(bits:Int):Int = {
+    this.state = (this.state * CopyableRandom.MULTIPLIER + CopyableRandom.ADDEND) & CopyableRandom.MASK
+    return (this.state >>> (48 - bits)).toInt
+  }
+
+  def copyStateFrom(other:CopyableRandom): Unit = {
+    this.state = other.state
+  }
+
+}
+
+object CopyableRandom {
+  private val MULTIPLIER:Long = 0x5DEECE66DL
+  private val ADDEND:Long = 0xBL
+  private val MASK:Long = (1L << 48) - 1
+
+  // Make a (Scala) random number generator whose state can be copied with copyState()
+  def mkRandom(seed:Long):Random = new Random(new CopyableRandom(seed))
+
+  // Copy the state of one random number generator (made with mkRandom()) to another
+  def copyState(from:Random, to:Random): Unit = {
+    to.self.asInstanceOf[CopyableRandom].copyStateFrom( from.self.asInstanceOf[CopyableRandom] )
+  }
+
+}
@@ -0,0 +1,70 @@
+package textworldexpress.struct
+
+
+/*
+ * Incremental 128-bit hash of a game state (see TextGame.getStateFingerprint() ).  Values are added in a fixed order,
+ * to two independent 64-bit lanes, which are mixed again when the fingerprint is taken.  This is not a cryptographic
+ * hash, but collisions between different states are vanishingly unlikely.
+ */
+class StateHasher {
+  private var h1:Long = StateHasher.SEED1
+  private var h2:Long = StateHasher.SEED2
+
+  def addLong(value:Long): Unit = {
+    this.h1 = (this.h1 ^ value) * StateHasher.PRIME1
+    this.h2 = java.lang.Long.rotateLeft(this.h2 + value * StateHasher.PRIME2, 31) * StateHasher.PRIME1
+  }
+
+  def addInt(value:Int): Unit = this.addLong(value.toLong)
+
+  def addBoolean(value:Boolean): Unit = this.addLong(if (value) 1L else 0L)
+
+  def addDouble(value:Double): Unit = this.addLong(java.lang.Double.doubleToLongBits(value))
+
+  // Strings are length-prefixed, so that consecutive strings can not run together
+  def addStr(str:String): Unit = {
+    this.addInt(str.length)
+    var i:Int = 0
+    while (i < str.length) {
+      this.addLong(str.charAt(i).toLong)
+      i += 1
+    }
+  }
+
+  def fingerprint():StateFingerprint = {
+    val hi = StateHasher.mix(this.h1 ^ java.lang.Long.rotateLeft(this.h2, 17))
+    val lo = StateHasher.mix(this.h2 + hi)
+    return new StateFingerprint(hi, lo)
+  }
+
+}
+
+object StateHasher {
+  private val SEED1:Long = 0xcbf29ce484222325L
+  private val SEED2:Long = 0x9e3779b97f4a7c15L
+  private val PRIME1:Long = 0x100000001b3L
+  private val PRIME2:Long = 0xc2b2ae3d27d4eb4fL
+
+  // Finalizer of MurmurHash3 (64-bit), so that every bit of the input affects every bit of the output
+  private def mix(value:Long):Long = {
+    var h = value
+    h ^= (h >>> 33)
+    h *= 0xff51afd7ed558ccdL
+    h ^= (h >>> 33)
+    h *= 0xc4ceb9fe1a85ec53L
+    h ^= (h >>> 33)
+    return h
+  }
+
+}
+
+
+// A 128-bit state fingerprint.  Fingerprints are equal (and have the same hashCode) if their states are equal, so they
+// can be used as keys (e.g. to deduplicate states).
+case class StateFingerprint(hi:Long, lo:Long) {
+  // 64-bit version (e.g. for compact keys)
+  def toLong():Long = this.hi
+
+  // 32 hexadecimal digits
+  override def toString():String = "%016x%016x".format(this.hi, this.lo)
+}
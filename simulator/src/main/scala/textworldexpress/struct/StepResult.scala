@@ -4,20 +4,25 @@ import textworldexpress.JSON
 
 /*
  * Storage class for the result of an environment step
+ * Optional fields (free look, inventory, valid actions) are null when they were not requested (see TextGame.stepFields).
  */
 class StepResult(val observationStr:String, val freeLookStr:String, val inventoryStr:String, val validActions:Array[String], val scoreRaw:Double, val scoreNormalized:Double, val taskSuccess:Boolean, val taskFailure:Boolean, val wasValidAction:Boolean) {
 
-  def toJSON():String = {
+  def toJSON():String = this.toJSON(extraFields = "")
+
+  // Serialize, appending any additional (already JSON-formatted) key/value pairs after the standard fields
+  def toJSON(extraFields:String):String = {
     val os = new StringBuilder()
     os.append("{")
     os.append("\"observation\":\"" + JSON.sanitize(observationStr) + "\",")
-    os.append("\"look\":\"" + JSON.sanitize(freeLookStr) + "\",")
-    os.append("\"inventory\":\"" + JSON.sanitize(inventoryStr) + "\",")
-    os.append("\"validActions\":[\"" + validActions.mkString("\",\"") + "\"],")
+    if (freeLookStr != null) os.append("\"look\":\"" + JSON.sanitize(freeLookStr) + "\",")
+    if (inventoryStr != null) os.append("\"inventory\":\"" + JSON.sanitize(inventoryStr) + "\",")
+    if (validActions != null) os.append("\"validActions\":[\"" + validActions.map(JSON.sanitize).mkString("\",\"") + "\"],")
     os.append("\"scoreRaw\":" + scoreRaw + ",")
     os.append("\"score\":" + scoreNormalized + ",")
     os.append("\"tasksuccess\": " + taskSuccess + ",")
     os.append("\"taskfailure\": " + taskFailure)
+    if (extraFields.length > 0) os.append("," + extraFields)
     os.append("}")
 
     os.toString()
@@ -26,6 +31,13 @@ class StepResult(val observationStr:String, val freeLookStr:String, val inventor
 }
 
 object StepResult {
+  // Optional fields (bit mask)
+  val FIELD_LOOK:Int = 1
+  val FIELD_INVENTORY:Int = 2
+  val FIELD_VALID_ACTIONS:Int = 4
+  val FIELDS_ALL:Int = FIELD_LOOK | FIELD_INVENTORY | FIELD_VALID_ACTIONS
+
+  val FIELD_NAMES:Map[String, Int] = Map("look" -> FIELD_LOOK, "inventory" -> FIELD_INVENTORY, "validActions" -> FIELD_VALID_ACTIONS)
 
   // Make a faux invalid action.
   def mkInvalidStep(in:StepResult):StepResult = {
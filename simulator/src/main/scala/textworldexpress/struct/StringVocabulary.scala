@@ -0,0 +1,35 @@
+package textworldexpress.struct
+
+import scala.collection.mutable
+import scala.collection.mutable.ArrayBuffer
+
+/*
+ * Assigns stable integer IDs to strings, in the order they are first seen (so the IDs are 0, 1, 2, ...).
+ */
+class StringVocabulary {
+  private val ids = new mutable.HashMap[String, Int]()
+  // The string for each ID
+  val strings = new ArrayBuffer[String]()
+
+  // Get the ID of a string, adding it to the vocabulary if it has not been seen before
+  def getId(str:String):Int = {
+    val id = this.ids.getOrElse(str, -1)
+    if (id >= 0) return id
+
+    this.strings.append(str)
+    this.ids(str) = this.strings.length - 1
+    return this.strings.length - 1
+  }
+
+  def contains(str:String):Boolean = this.ids.contains(str)
+
+  def getStr(id:Int):String = this.strings(id)
+
+  def size:Int = this.strings.length
+
+  def clear(): Unit = {
+    this.ids.clear()
+    this.strings.clear()
+  }
+
+}
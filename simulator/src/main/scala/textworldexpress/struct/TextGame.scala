@@ -1,16 +1,69 @@
 package textworldexpress.struct
 
+import java.util
+
 import textworldexpress.objects.{FastObject, Room}
 
-import scala.collection.mutable.ArrayBuffer
+import scala.collection.mutable
+import scala.collection.mutable.{ArrayBuffer, ListBuffer}
+import scala.util.Random
 
 abstract class TextGame {
+  // Valid actions (action string, action number, action parameters) from the last step, in the same order as the
+  // valid action strings of the last StepResult (so step(validActionIdx) takes the action at that index).
+  // Also indexed by array position and by action string, so that looking up an action takes constant time.
+  private var _lastValidActions = ListBuffer.empty[(String, Int, Array[FastObject])]
+  private var validActionsByIdx = Array.empty[(String, Int, Array[FastObject])]
+  private val validActionsByStr = new mutable.HashMap[String, (String, Int, Array[FastObject])]()
+
+  // Optional fields of the StepResults that are generated on each step (see StepResult.FIELD_*).  Fields that are not
+  // included are not generated, and are null in the StepResult.
+  var stepFields:Int = StepResult.FIELDS_ALL
 
   /*
    * Cloning
    */
   def deepCopy():TextGame
 
+  // Helper for deepCopy(): copy a list of valid actions, pointing each action's parameters to the copied objects
+  protected def copyValidActions(validActions:ListBuffer[(String, Int, Array[FastObject])], copies:util.IdentityHashMap[FastObject, FastObject]):ListBuffer[(String, Int, Array[FastObject])] = {
+    return validActions.map(action => (action._1, action._2, FastObject.copyOf(action._3, copies)))
+  }
+
+  /*
+   * State fingerprint
+   */
+
+  // Add everything about the current state that can change during a game (other than the history, and the random
+  // number generator, which only affects the order of the valid actions) to a state hash
+  protected def hashState(hasher:StateHasher): Unit
+
+  // Helper for hashState(): add the state of the world (the objects in each location, the agent's location and
+  // inventory, and the objects that were deleted)
+  protected def hashWorld(hasher:StateHasher, locations:Array[Room], agentLocation:Room, agentInventory:FastObject, deletedObjects:Iterable[FastObject]): Unit = {
+    hasher.addInt(locations.length)
+    for (location <- locations) location.hashState(hasher)
+    hasher.addInt(locations.indexOf(agentLocation))
+    agentInventory.hashState(hasher)
+    hasher.addInt(deletedObjects.size)
+    for (obj <- deletedObjects) obj.hashState(hasher)
+  }
+
+  // 128-bit fingerprint of the current state (see StateHasher).  Two states of a game have the same fingerprint if they
+  // have the same world (objects, doors, agent location and inventory) and score, however they were reached, and so
+  // give the same observations for the same actions.  This is fast enough to compute on every step.
+  def getStateFingerprint():StateFingerprint = {
+    val hasher = new StateHasher()
+    this.hashState(hasher)
+
+    val score = this.getScore()
+    hasher.addDouble(score.scoreRaw)
+    hasher.addDouble(score.scoreNormalized)
+    hasher.addBoolean(score.taskSuccess)
+    hasher.addBoolean(score.taskFailure)
+    return hasher.fingerprint()
+  }
+
   /*
    * Properties
    */
@@ -37,6 +90,40 @@ abstract class TextGame {
    * Steps
    */
 
+  def includesField(field:Int):Boolean = ((this.stepFields & field) != 0)
+
+  def lastValidActions:ListBuffer[(String, Int, Array[FastObject])] = this._lastValidActions
+
+  def lastValidActions_=(validActions:ListBuffer[(String, Int, Array[FastObject])]): Unit = {
+    this._lastValidActions = validActions
+    this.validActionsByIdx = validActions.toArray
+    this.validActionsByStr.clear()
+    for (action <- this.validActionsByIdx) {
+      // If more than one action has the same string, the first one is used
+      if (!this.validActionsByStr.contains(action._1)) this.validActionsByStr(action._1) = action
+    }
+  }
+
+  def getNumValidActions():Int = this.validActionsByIdx.length
+
+  // Get a valid action from the last step by index (in the order of the last StepResult's valid actions)
+  def getValidAction(validActionIdx:Int):(String, Int, Array[FastObject]) = this.validActionsByIdx(validActionIdx)
+
+  // Get a valid action from the last step by action string (or null, if the action is not valid)
+  def getValidAction(actionStr:String):(String, Int, Array[FastObject]) = this.validActionsByStr.getOrElse(actionStr, null)
+
+  // Check whether an action string is one of the valid actions from the last step
+  def isValidAction(actionStr:String):Boolean = this.validActionsByStr.contains(actionStr)
+
+  // Helper for step(): store the next valid actions (in a random presentation order), and return their strings
+  // (or null if valid actions are not included in the step fields).
+  protected def setValidActions(validActions:ListBuffer[(String, Int, Array[FastObject])], random:Random):Array[String] = {
+    this.lastValidActions = random.shuffle(validActions)
+    if (!this.includesField(StepResult.FIELD_VALID_ACTIONS)) return null
+
+    return this.validActionsByIdx.map(_._1)
+  }
+
   def initalStep():StepResult
 
   def step(actionStr:String):StepResult
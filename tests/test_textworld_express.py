@@ -1,5 +1,12 @@
+import sys
+import random
 import time
-from textworld_express import TextWorldExpressEnv
+import socket
+import subprocess
+import json
+import base64
+from textworld_express import TextWorldExpressEnv, TextWorldExpressServer, TextWorldExpressVectorEnv, readRollouts
+from textworld_express import PrecrawledPath, PrecrawledPathEnv, PrecrawledPathWalker, compactPrecrawledPath, convertPrecrawledPath
 
 
 GAME_PARAMS = [
@@ -168,6 +175,517 @@ def test_clone():
     assert env.getRunHistory() == clone_env.getRunHistory()
 
 
+def test_binary_protocol():
+    env_json = TextWorldExpressEnv()
+    env_binary = TextWorldExpressEnv(protocol="binary")
+    for game_name, game_params in GAME_PARAMS:
+        if "gameLength=1000" in game_params:
+            continue  # Too slow.
+
+        obs_json, infos_json = env_json.reset(gameName=game_name, gameParams=game_params, seed=42, generateGoldPath=True)
+        obs_binary, infos_binary = env_binary.reset(gameName=game_name, gameParams=game_params, seed=42, generateGoldPath=True)
+        assert obs_json == obs_binary
+        assert infos_json == infos_binary
+
+        for action in env_json.getGoldActionSequence() + ["not a valid action"]:
+            assert env_json.step(action) == env_binary.step(action)
+
+
+def test_binary_protocol_strings():
+    from textworld_express.textworld_express import _BINARY_HEADER, _FLAG_HAS_VALID_ACTIONS, _decodeBinaryStepResult
+
+    # Strings are length-prefixed, so they may contain NUL (and any other) characters.
+    strs = ["obs\0with NUL", "", "café"]
+    encoded = [s.encode("utf-8") for s in strs]
+    data = _BINARY_HEADER.pack(1.0, 0.5, _FLAG_HAS_VALID_ACTIONS, 2)
+    data += b"".join(len(s).to_bytes(4, "big") for s in encoded) + b"".join(encoded)
+
+    out = _decodeBinaryStepResult(base64.b64encode(data).decode("ascii"))
+    assert out["observation"] == strs[0]
+    assert out["validActions"] == strs[1:]
+    assert (out["scoreRaw"], out["score"]) == (1.0, 0.5)
+
+
+def test_step_fields():
+    env_all = TextWorldExpressEnv()
+    env_json = TextWorldExpressEnv()
+    env_binary = TextWorldExpressEnv(protocol="binary")
+    for game_name, game_params in GAME_PARAMS:
+        if "gameLength=1000" in game_params:
+            continue  # Too slow.
+
+        _, infos_all = env_all.reset(gameName=game_name, gameParams=game_params, seed=42, generateGoldPath=True)
+        for env in (env_json, env_binary):
+            obs, infos = env.reset(gameName=game_name, gameParams=game_params, seed=42, fields=["validActions"])
+            assert obs == infos_all["observation"]
+            assert set(infos) == set(infos_all) - {"look", "inventory", "taskDescription"}
+            assert infos["validActions"] == infos_all["validActions"]
+
+        for action in env_all.getGoldActionSequence() + ["not a valid action"]:
+            obs_all, reward_all, done_all, infos_all = env_all.step(action)
+            for env in (env_json, env_binary):
+                obs, reward, done, infos = env.step(action)
+                assert (obs, reward, done) == (obs_all, reward_all, done_all)
+                assert infos["validActions"] == infos_all["validActions"]
+
+    # The fields are kept for the following episodes.
+    _, infos = env_json.reset(seed=1)
+    assert "look" not in infos
+
+    _, infos = env_json.reset(seed=1, fields=["look", "taskDescription"])
+    assert set(infos) >= {"look", "taskDescription"} and "validActions" not in infos and "inventory" not in infos
+    assert infos["taskDescription"] == env_json.getTaskDescription()
+
+    try:
+        env_json.reset(fields=["unknown"])
+        assert False, "Unknown fields should raise an error."
+    except ValueError:
+        pass
+
+
+def test_step_index():
+    rng = random.Random(0)
+    env_str = TextWorldExpressEnv()
+    env_idx = TextWorldExpressEnv(protocol="binary")
+    for game_name, game_params in GAME_PARAMS:
+        if "gameLength=1000" in game_params:
+            continue  # Too slow.
+
+        _, infos = env_str.reset(gameName=game_name, gameParams=game_params, seed=42)
+        env_idx.reset(gameName=game_name, gameParams=game_params, seed=42)
+        for _ in range(20):
+            idx = rng.randrange(len(infos["validActions"]))
+            obs, reward, done, infos = env_str.step(infos["validActions"][idx])
+            assert env_idx.step_index(idx) == (obs, reward, done, infos)
+            if done:
+                break
+
+        # Out-of-range indices are invalid actions.
+        obs, _, _, _ = env_idx.step_index(len(infos["validActions"]))
+        assert obs.startswith("Unknown action")
+
+    # Without valid actions in the step fields, indices refer to the same (unreturned) order.
+    _, infos = env_str.reset(seed=3)
+    obs = env_str.step(infos["validActions"][0])[0]
+    for protocol in ("json", "binary", "ids"):
+        env_idx = TextWorldExpressEnv(protocol=protocol)
+        env_idx.reset(gameName=env_str.gameName, gameParams=env_str.gameParams, seed=3, fields=["look"])
+        assert env_idx.step_index(0)[0] == obs
+        assert env_idx.getRunHistory()["history"][-1]["lastActionStr"] == infos["validActions"][0]
+
+
+def test_ids_protocol():
+    env_json = TextWorldExpressEnv()
+    env_ids = TextWorldExpressEnv(protocol="ids")
+    id_keys = {"observationId", "lookId", "inventoryId", "validActionIds"}
+    action_ids = {}
+    num_actions_seen = 0
+    for game_name, game_params in GAME_PARAMS:
+        if "gameLength=1000" in game_params:
+            continue  # Too slow.
+
+        _, infos_json = env_json.reset(gameName=game_name, gameParams=game_params, seed=42, generateGoldPath=True)
+        _, infos = env_ids.reset(gameName=game_name, gameParams=game_params, seed=42)
+        steps = [(infos_json, infos)]
+        for action in env_json.getGoldActionSequence():
+            steps.append((env_json.step(action)[-1], env_ids.step(action)[-1]))
+
+        for infos_json, infos in steps:
+            assert {k: v for k, v in infos.items() if k not in id_keys} == infos_json
+            assert env_ids.getTextVocabulary()[infos["observationId"]] == infos["observation"]
+            for action, action_id in zip(infos["validActions"], infos["validActionIds"]):
+                assert action_ids.setdefault(action, action_id) == action_id  # IDs are stable across steps and games.
+            num_actions_seen += len(infos["validActions"])
+
+    assert sorted(action_ids.values()) == list(range(len(env_ids.getActionVocabulary())))
+    assert len(action_ids) < num_actions_seen
+
+    env_ids.resetVocabularies()
+    obs, infos = env_ids.reset()
+    assert env_ids.getTextVocabulary()[infos["observationId"]] == obs
+    assert len(env_ids.getActionVocabulary()) == len(set(infos["validActions"]))
+
+
+def test_game_cache():
+    env = TextWorldExpressEnv()
+    env_uncached = TextWorldExpressEnv()
+    env_uncached.setGameCacheSize(0)
+    for game_name, game_params in GAME_PARAMS:
+        if "gameLength=1000" in game_params:
+            continue  # Too slow.
+
+        for _ in range(2):  # The second time, games come from the cache.
+            for seed in (1, 2):
+                env_uncached.reset(gameName=game_name, gameParams=game_params, seed=seed, generateGoldPath=True)
+                env.reset(gameName=game_name, gameParams=game_params, seed=seed, generateGoldPath=True)
+                assert env.getGoldActionSequence() == env_uncached.getGoldActionSequence()
+                for action in env.getGoldActionSequence():
+                    env.step(action)
+                    env_uncached.step(action)
+                assert env.getRunHistory() == env_uncached.getRunHistory()
+
+    stats = env.getGameCacheStats()
+    assert stats["hits"] > 0 and stats["hits"] == stats["misses"] == stats["size"]
+    assert env_uncached.getGameCacheStats()["size"] == 0
+
+    env.setGameCacheSize(1)
+    assert env.getGameCacheStats()["size"] == 1
+
+
+def test_lazy_gold_path(tmp_path):
+    env = TextWorldExpressEnv()
+    env.clearGameCache()
+    env.setGoldPathCacheDir(str(tmp_path))
+    for game_name, game_params in GAME_PARAMS:
+        if "gameLength=1000" in game_params:
+            continue  # Too slow.
+
+        # Generated when first requested, on a copy of the game (so the game itself is not changed).
+        obs, infos = env.reset(gameName=game_name, gameParams=game_params, seed=7)
+        gold_path = env.getGoldActionSequence()
+        assert len(gold_path) > 0
+        for action in gold_path:
+            obs, reward, done, infos = env.step(action)
+        assert infos["tasksuccess"]
+
+        env.reset(seed=7, generateGoldPath=True)
+        assert env.getGoldActionSequence() == gold_path
+
+    stats = env.getGameCacheStats()
+    assert stats["goldPathsGenerated"] == len(list(tmp_path.iterdir())) > 0
+    assert stats["goldPathHits"] == stats["goldPathsGenerated"]
+
+    # Gold paths stored on disk are reused (e.g. by another run).
+    env.clearGameCache()
+    for game_name, game_params in GAME_PARAMS:
+        if "gameLength=1000" in game_params:
+            continue
+
+        env.reset(gameName=game_name, gameParams=game_params, seed=7)
+        env.getGoldActionSequence()
+
+    assert env.getGameCacheStats()["goldPathsGenerated"] == 0
+    env.setGoldPathCacheDir(None)
+
+
+def test_prefetch():
+    env1 = TextWorldExpressEnv()
+    env2 = TextWorldExpressEnv()
+    for env in (env1, env2):
+        env.load("twc", "numLocations=3,numItemsToPutAway=2")
+        env.enablePrefetch(numGames=2, seed=123, gameFold="dev")
+
+    # Same prefetch seed, same sequence of games.
+    for _ in range(5):
+        obs1, infos1 = env1.reset(gameFold="dev")
+        obs2, infos2 = env2.reset(gameFold="dev")
+        assert infos1 == infos2
+
+    assert 0 <= env1.getNumPrefetchedGames() <= 2
+
+    # Resets that are not prefetched (explicit seed, other fold) still generate their game.
+    _, infos = env1.reset(seed=42, gameFold="train")
+    env2.disablePrefetch()
+    assert env2.getNumPrefetchedGames() == -1
+    _, infos2 = env2.reset(seed=42, gameFold="train")
+    assert infos == infos2
+
+    try:
+        env1.enablePrefetch(numGames=0)
+        assert False, "Prefetching no games should raise an error."
+    except ValueError:
+        pass
+
+
+def test_state_fingerprint():
+    env = TextWorldExpressEnv()
+    env.reset(gameName="cookingworld", gameParams="numLocations=1,includeDoors=0", seed=5)
+    start = env.getStateFingerprint()
+    assert len(start) == 32
+    assert env.getStateFingerprint() == start  # Deterministic.
+
+    # Actions that do not change the world keep the fingerprint, and undoing an action returns to the same fingerprint.
+    env.step("look around")
+    assert env.getStateFingerprint() == start
+    env.step("open fridge")
+    opened = env.getStateFingerprint()
+    assert opened != start
+    env.step("close fridge")
+    assert env.getStateFingerprint() == start
+
+    # Same state in another environment (and after a reset), different state for another seed.
+    other_env = TextWorldExpressEnv()
+    other_env.reset(gameName="cookingworld", gameParams="numLocations=1,includeDoors=0", seed=5)
+    assert other_env.getStateFingerprint() == start
+    other_env.step("open fridge")
+    assert other_env.getStateFingerprint() == opened
+    other_env.reset(seed=6)
+    assert other_env.getStateFingerprint() != start
+
+
+def test_lookahead():
+    env = TextWorldExpressEnv()
+    for game_name, game_params in GAME_PARAMS:
+        if "gameLength=1000" in game_params:
+            continue  # Too slow.
+
+        obs, infos = env.reset(gameName=game_name, gameParams=game_params, seed=3, generateGoldPath=True)
+        for action in env.getGoldActionSequence()[:2]:
+            obs, reward, done, infos = env.step(action)
+
+        history = env.getRunHistory()
+        outcomes = env.lookahead()
+        assert [outcome["action"] for outcome in outcomes] == infos["validActions"]
+        assert env.getRunHistory() == history  # The game is not changed.
+
+        handle = env.snapshot()
+        for outcome in outcomes:
+            env.restore(handle)
+            obs, reward, done, infos = env.step(outcome["action"])
+            assert outcome["observation"] == obs
+            assert outcome["score"] == infos["score"]
+            assert outcome["reward"] == reward
+            assert outcome["done"] == done
+            assert outcome["tasksuccess"] == infos["tasksuccess"]
+            assert outcome["fingerprint"] == env.getStateFingerprint()
+
+
+def test_rollout(tmp_path):
+    env = TextWorldExpressEnv()
+    for game_name, game_params in GAME_PARAMS:
+        if "gameLength=1000" in game_params:
+            continue  # Too slow.
+
+        env.load(game_name, game_params)
+        results = env.rollout(range(5), policy="gold", maxSteps=1000)
+        assert results["numEpisodes"] == 5
+        assert results["numSuccesses"] == 5
+        assert results["numSteps"] == sum(len(episode["actions"]) for episode in results["episodes"])
+
+    # Same policy seed, same episodes (whatever the number of threads).
+    env.load("twc", "numLocations=3,numItemsToPutAway=2")
+    seeds = list(range(10))
+    results = env.rollout(seeds, policy="epsilon-gold", epsilon=0.5, maxSteps=20, policySeed=3, includeObservations=True)
+    results_threaded = env.rollout(seeds, policy="epsilon-gold", epsilon=0.5, maxSteps=20, policySeed=3, includeObservations=True, numThreads=2)
+    assert results == results_threaded
+    assert [episode["seed"] for episode in results["episodes"]] == seeds
+
+    # Replaying an episode gives the same observations and scores.
+    episode = results["episodes"][4]
+    obs, infos = env.reset(seed=4)
+    assert obs == episode["observations"][0]
+    for action, observation, score in zip(episode["actions"], episode["observations"][1:], episode["scores"]):
+        obs, reward, done, infos = env.step(action)
+        assert obs == observation
+        assert infos["score"] == score
+
+    # Episodes written to a file.
+    output_path = str(tmp_path / "rollouts.jsonl")
+    summary = env.rollout(seeds, policy="epsilon-gold", epsilon=0.5, maxSteps=20, policySeed=3, includeObservations=True, outputPath=output_path)
+    assert "episodes" not in summary
+    assert summary["numSteps"] == results["numSteps"]
+    assert list(readRollouts(output_path)) == results["episodes"]
+
+    # maxSteps=0 (rather than the default step limit) takes no steps.
+    assert env.rollout(seeds, policy="random", maxSteps=0)["numSteps"] == 0
+
+    try:
+        env.rollout(seeds, policy="unknown")
+        assert False, "Unknown policies should raise an error."
+    except ValueError:
+        pass
+
+
+def _mkPrecrawledPathJSON(tmp_path):
+    """ A small precrawled path, in the JSON format of the path crawler. """
+    stringLUT = ["You are in the kitchen.", "look", "inv", "take coin", "eat coin", "You win!", "You lose!"]
+    def mkNode(obs, acts, score, succ, fail, steps):
+        return {"result": {"obs": obs, "look": 1, "inv": 2, "acts": acts, "score": score, "scoreNorm": score, "succ": succ, "fail": fail, "valid": True},
+                "steps": {str(actionIdx): nodeIdx for actionIdx, nodeIdx in steps.items()}}
+    nodeLUT = [mkNode(0, [4, 3], 0.0, False, False, {4: 2, 3: 1}),
+               mkNode(5, [], 1.0, True, False, {}),
+               mkNode(6, [], 0.0, False, True, {})]
+    filenameJSON = str(tmp_path / "path.json")
+    with open(filenameJSON, "w") as f:
+        json.dump({"nodeLUT": nodeLUT, "stringLUT": stringLUT}, f)
+
+    return filenameJSON, stringLUT
+
+
+def test_precrawled_path_binary(tmp_path):
+    filenameJSON, stringLUT = _mkPrecrawledPathJSON(tmp_path)
+    filename = convertPrecrawledPath(filenameJSON)
+    assert filename == str(tmp_path / "path.twxb")
+    path = PrecrawledPath(filename)
+    assert path.numNodes == 3
+    assert path.numStrings == len(stringLUT)
+    assert [path.getStr(idx) for idx in range(path.numStrings)] == stringLUT
+
+    node = path.getNode(0)
+    assert node["result"]["obs"] == "You are in the kitchen."
+    assert node["result"]["acts"] == ["eat coin", "take coin"]
+    assert node["steps"] == {"take coin": 1, "eat coin": 2}
+    assert path.step(0, "take coin") == 1
+    assert path.step(0, "eat coin") == 2
+    assert path.step(0, "look") == -1
+    assert path.step(1, "take coin") == -1
+
+    assert path.getNode(1)["result"]["succ"] and path.getNode(1)["result"]["score"] == 1.0
+    assert path.getNode(2)["result"]["fail"]
+    assert path.getNode(2)["steps"] == {}
+
+
+def test_precrawled_path_compaction(tmp_path):
+    # Three identical losing leaves, a node that can not be reached, and an unused string
+    stringLUT = ["You are in the kitchen. You see a coin.", "look", "inv", "take coin", "eat coin", "You lose! You see a coin.", "unused", "drop coin"]
+    def mkNode(obs, acts, fail, steps):
+        return {"result": {"obs": obs, "look": 1, "inv": 2, "acts": acts, "score": 0.0, "scoreNorm": 0.0, "succ": False, "fail": fail, "valid": True},
+                "steps": {str(actionIdx): nodeIdx for actionIdx, nodeIdx in steps.items()}}
+    nodeLUT = [mkNode(0, [4, 3, 7], False, {4: 1, 3: 2, 7: 3}),
+               mkNode(5, [], True, {}),
+               mkNode(5, [], True, {}),
+               mkNode(5, [], True, {}),
+               mkNode(6, [], False, {})]
+    filenameJSON = str(tmp_path / "path.json")
+    with open(filenameJSON, "w") as f:
+        json.dump({"nodeLUT": nodeLUT, "stringLUT": stringLUT}, f)
+
+    path = PrecrawledPath(convertPrecrawledPath(filenameJSON))
+    assert path.numNodes == 5 and path.numStrings == 8
+    assert path.counts["numActLists"] == 2  # The nodes without valid actions share one (empty) list
+    assert path.counts["numSegments"] == 9  # " You see a coin." is shared
+
+    compacted = PrecrawledPath(convertPrecrawledPath(filenameJSON, str(tmp_path / "compacted.twxb"), compact=True))
+    assert compacted.numNodes == 2 and compacted.counts["numSegments"] == 8
+    assert [compacted.getStr(idx) for idx in range(compacted.numStrings)] == [string for string in stringLUT if string != "unused"]
+    assert compacted.getSteps(0) == {"take coin": 1, "eat coin": 1, "drop coin": 1}
+    for actionStr, nodeIdx in path.getSteps(0).items():
+        assert compacted.getNode(compacted.step(0, actionStr)) == path.getNode(nodeIdx)
+    assert compacted.getNode(0)["result"] == path.getNode(0)["result"]
+
+    # Compacting again changes nothing
+    nodeLUTOut, stringLUTOut = compactPrecrawledPath(nodeLUT, stringLUT)
+    assert compactPrecrawledPath(nodeLUTOut, stringLUTOut) == (nodeLUTOut, stringLUTOut)
+
+
+def test_precrawled_path_env(tmp_path):
+    filenameJSON, _ = _mkPrecrawledPathJSON(tmp_path)
+    path = PrecrawledPath(convertPrecrawledPath(filenameJSON))
+    # Environments share the path
+    env, env2 = PrecrawledPathEnv(path), PrecrawledPathEnv(path, envStepLimit=1)
+
+    obs, infos = env.reset()
+    assert obs == "You are in the kitchen."
+    assert infos["validActions"] == ["eat coin", "take coin"]
+    assert infos["look"] == "look" and infos["inventory"] == "inv"
+    assert infos["reward"] == 0 and not infos["done"] and infos["numMoves"] == 0
+
+    # Invalid actions do not change the game
+    obs, reward, done, infos = env.step("dance")
+    assert obs == PrecrawledPathEnv.INVALID_ACTION_OBSERVATION
+    assert not done and infos["numMoves"] == 1
+    assert infos["validActions"] == ["eat coin", "take coin"]
+
+    obs, reward, done, infos = env.step("take coin")
+    assert obs == "You win!"
+    assert reward == 1.0 and done and infos["tasksuccess"]
+    assert infos["lastActionStr"] == "take coin" and infos["numMoves"] == 2
+    assert len(env.getRunHistory()["history"]) == 3
+
+    obs, infos = env2.reset(fields=["validActions"])
+    assert "look" not in infos and "inventory" not in infos
+    obs, reward, done, infos = env2.step_index(0)
+    assert obs == "You lose!"
+    assert done and infos["taskfailure"]
+
+    # The step limit ends episodes
+    env2.reset()
+    env2.step("dance")
+    obs, reward, done, infos = env2.step("dance")
+    assert done and not infos["taskfailure"]
+
+    try:
+        env.reset(fields=["taskDescription"])
+        assert False, "Fields that are not stored in precrawled paths should raise an error."
+    except ValueError:
+        pass
+
+
+def test_precrawled_path_walker(tmp_path):
+    import numpy as np
+    filenameJSON, stringLUT = _mkPrecrawledPathJSON(tmp_path)
+    walker = PrecrawledPathWalker(convertPrecrawledPath(filenameJSON))
+    assert walker.maxSteps == 2
+
+    # Slots are sorted by action string ID ("take coin" (3), then "eat coin" (4))
+    nodes = walker.getStartNodes(4)
+    assert (walker.getActionIds(nodes) == [[3, 4]] * 4).all()
+    assert walker.getActionMask(nodes).all()
+
+    nextNodes, scores, done, mask = walker.step(nodes, np.array([0, 1, 2, -1]))
+    assert nextNodes.tolist() == [1, 2, 0, 0]  # Out-of-range slots are invalid actions
+    assert scores.tolist() == [1.0, 0.0, 0.0, 0.0]
+    assert done.tolist() == [True, True, False, False]
+    assert mask.tolist() == [[False, False], [False, False], [True, True], [True, True]]
+    assert (walker.getActionIds(nextNodes)[:2] == -1).all()
+
+    # Stepping from done nodes keeps them where they are
+    nextNodes, scores, done, mask = walker.step(nextNodes[:2], walker.sampleSlots(nextNodes[:2], np.random.default_rng(0)))
+    assert nextNodes.tolist() == [1, 2]
+    assert done.all()
+
+
+def test_snapshot_restore():
+    env = TextWorldExpressEnv()
+    for game_name, game_params in GAME_PARAMS:
+        if "gameLength=1000" in game_params:
+            continue  # Too slow to replay.
+
+        env.reset(gameName=game_name, gameParams=game_params, seed=42, generateGoldPath=True)
+        solution = env.getGoldActionSequence()
+        for action in solution[:len(solution) // 2]:
+            env.step(action)
+
+        handle = env.snapshot()
+        history = list(env.getRunHistory()["history"])
+
+        # Continue the game, then go back to the snapshot and continue it again (twice).
+        for action in solution[len(solution) // 2:]:
+            env.step(action)
+        history_full = list(env.getRunHistory()["history"])
+
+        for _ in range(2):
+            obs, infos = env.restore(handle)
+            assert obs == history[-1]["observation"]
+            assert env.getRunHistory()["history"] == history
+
+            for action in solution[len(solution) // 2:]:
+                env.step(action)
+            assert env.getRunHistory()["history"] == history_full
+
+        assert env.releaseSnapshot(handle)
+        try:
+            env.restore(handle)
+            assert False, "Released snapshots should not be restorable."
+        except KeyError:
+            pass
+
+
+def test_snapshot_lru():
+    env = TextWorldExpressEnv()
+    env.reset(gameName="coin", seed=42)
+    env.setMaxSnapshots(2)
+    handles = [env.snapshot() for _ in range(3)]
+    assert env.server.getNumSnapshots() == 2
+    env.restore(handles[1])
+    env.restore(handles[2])
+    try:
+        env.restore(handles[0])
+        assert False, "Least recently used snapshot should have been evicted."
+    except KeyError:
+        pass
+
+
 def test_serialize_deserialize():
     env = TextWorldExpressEnv()
     env.reset(gameName="cookingworld", seed=42)
@@ -186,8 +704,166 @@ def test_close():
     assert env._gateway.java_process.poll() is not None
 
 
+def test_bulk_accessors():
+    env = TextWorldExpressEnv()
+    assert env.getValidSeedsTrain() == list(env.server.getSeedsTrain())
+    assert env.getValidSeedsDev() == list(env.server.getSeedsDev())
+    assert env.getValidSeedsTest() == list(env.server.getSeedsTest())
+    assert env.getGameNames() == list(env.server.getGameNames())
+
+    env.reset(gameName="cookingworld", seed=1, generateGoldPath=True)
+    gold_path = env.getGoldActionSequence()
+    assert gold_path == list(env.server.getGoldActionSequence())
+
+    # The gold path is fetched again for each episode.
+    env.reset(seed=2, generateGoldPath=True)
+    assert env.getGoldActionSequence() == list(env.server.getGoldActionSequence()) != gold_path
+
+
 def test_get_game_names():
     env = TextWorldExpressEnv()
     game_names = env.getGameNames()
     assert isinstance(game_names, list)
     assert "cookingworld" in game_names
+
+
+def test_shared_server():
+    server = TextWorldExpressServer()
+    envs = [TextWorldExpressEnv(server=server) for _ in range(3)]
+    assert server.getNumSessions() == 3
+    assert len(set(env.sessionId for env in envs)) == 3
+
+    # Sessions on the same server are independent.
+    standalone_env = TextWorldExpressEnv()
+    for game_name, game_params in GAME_PARAMS[:3]:
+        obs_orig, _ = standalone_env.reset(gameName=game_name, gameParams=game_params, seed=42)
+        envs[0].reset(gameName=game_name, gameParams=game_params, seed=42)
+        envs[1].reset(gameName="arithmetic", gameParams="", seed=1)
+        envs[0].step("look around")
+        envs[1].step("look around")
+        obs, _ = envs[0].reset()
+        assert obs == obs_orig
+
+    # Attaching to the same server through its address (as another process would).
+    attached = TextWorldExpressServer(address=server.address)
+    assert not attached.ownsServer
+    env = TextWorldExpressEnv(server=attached)
+    obs, _ = env.reset(gameName="cookingworld", seed=42)
+    obs_orig, _ = standalone_env.reset(gameName="cookingworld", gameParams="", seed=42)
+    assert obs == obs_orig
+    assert server.getNumSessions() == 4
+
+    # Attaching from another process.
+    script = "from textworld_express import *; env = TextWorldExpressEnv(server=TextWorldExpressServer(address='{}')); print(env.reset(gameName='cookingworld', seed=42)[0])"
+    output = subprocess.run([sys.executable, "-c", script.format(server.address)], capture_output=True, text=True, check=True).stdout
+    assert output.strip() == obs_orig.strip()
+
+    # Cloning stays on the same server.
+    clone_env = env.clone()
+    assert clone_env.sharedServer is attached
+    assert clone_env.getRunHistory() == env.getRunHistory()
+
+    for env in envs + [env, clone_env]:
+        env.close()
+    assert server.getNumSessions() == 0
+
+    del envs, env, clone_env, attached
+    server.close()
+    time.sleep(1)
+    assert server._gateway.java_process.poll() is not None
+
+
+def test_daemon():
+    from textworld_express import daemon
+
+    # Find a free port
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    obs_orig, _ = TextWorldExpressEnv().reset(gameName="coin", seed=42)
+
+    daemon.start(port=port, idleTimeout=2)
+    try:
+        assert daemon.status(port=port)["running"]
+
+        env = TextWorldExpressEnv(connect="127.0.0.1:{}".format(port))
+        obs, _ = env.reset(gameName="coin", seed=42)
+        assert obs == obs_orig
+        assert daemon.status(port=port)["numSessions"] == 1
+
+        # Idle sessions are closed by the server.
+        idle_env = TextWorldExpressEnv(connect="127.0.0.1:{}".format(port))
+        idle_env.reset(gameName="coin", seed=42)
+        for _ in range(8):
+            time.sleep(0.5)
+            env.step("look around")
+        assert daemon.status(port=port)["numSessions"] == 1
+        obs, _, _, _ = idle_env.step("look around")
+        assert obs.startswith("ERROR: Session is closed")
+    finally:
+        assert daemon.stop(port=port)
+
+    assert not daemon.status(port=port)["running"]
+
+
+def test_vector_env():
+    env = TextWorldExpressVectorEnv(numEnvs=4)
+    obs, infos = env.reset(seeds=[42, 42, 43, None], gameName="cookingworld", gameFold="train")
+    assert len(obs) == len(infos) == 4
+    assert obs[0] == obs[1]
+    assert all(info['taskDescription'] for info in infos)
+
+    # Batched steps should match stepping a single environment.
+    single_env = TextWorldExpressEnv()
+    single_obs, _ = single_env.reset(seed=42, gameName="cookingworld", gameFold="train")
+    assert single_obs == obs[0]
+
+    obs, rewards, dones, infos = env.step(["look around", "open fridge", "inventory", "look around"])
+    single_obs, single_reward, single_done, single_infos = single_env.step("look around")
+    assert obs[0] == single_obs
+    assert rewards[0] == single_reward
+    assert dones[0] == single_done
+    assert infos[0]['validActions'] == single_infos['validActions']
+    assert infos[0]['numMoves'] == 1
+    assert infos[1]['lastActionStr'] == "open fridge"
+
+
+def test_vector_env_auto_reset():
+    env = TextWorldExpressVectorEnv(numEnvs=2, envStepLimit=3, autoReset=True)
+    env.reset(seeds=[42, 43], gameName="coin", gameFold="train")
+
+    for _ in range(3):
+        _, _, dones, _ = env.step(["look around", "look around"])
+        assert dones == [False, False]
+
+    # Exceeding the step limit finishes the episodes, which are then reset.
+    obs, _, dones, infos = env.step(["look around", "look around"])
+    assert dones == [True, True]
+    for i in range(2):
+        assert infos[i]['numMoves'] == 0
+        assert infos[i]['terminalInfos']['numMoves'] == 4
+        assert obs[i] == infos[i]['observation']
+
+
+def test_vector_env_threaded():
+    seeds = list(range(8))
+    serial_env = TextWorldExpressVectorEnv(numEnvs=8)
+    threaded_env = TextWorldExpressVectorEnv(numEnvs=8, numThreads=4)
+
+    serial_obs, serial_infos = serial_env.reset(seeds=seeds, gameName="cookingworld")
+    threaded_obs, threaded_infos = threaded_env.reset(seeds=seeds, gameName="cookingworld")
+    assert serial_obs == threaded_obs
+
+    # Parallel steps are deterministic per game, and returned in environment order.
+    for _ in range(10):
+        actions = [sorted(info['validActions'])[0] for info in serial_infos]
+        serial_obs, _, _, serial_infos = serial_env.step(actions)
+        threaded_obs, _, _, threaded_infos = threaded_env.step(actions)
+        assert serial_obs == threaded_obs
+        assert [info['validActions'] for info in serial_infos] == [info['validActions'] for info in threaded_infos]
+
+    timing = threaded_env.getBatchTiming()
+    assert timing['numEnvs'] == 8
+    assert timing['numThreads'] == 4
+    assert timing['wallMsec'] > 0
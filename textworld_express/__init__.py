@@ -1,3 +1,4 @@
 from .version import __version__
-from .textworld_express import TextWorldExpressEnv
+from .textworld_express import TextWorldExpressEnv, TextWorldExpressServer, TextWorldExpressVectorEnv, readRollouts
 from .constants import GAME_NAMES
+from .precrawled_path import PrecrawledPath, PrecrawledPathEnv, PrecrawledPathWalker, compactPrecrawledPath, convertPrecrawledPath
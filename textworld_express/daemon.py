@@ -0,0 +1,158 @@
+""" A long-running TextWorldExpress server (daemon) that Python processes can attach to, instead of launching a JVM each.
+
+    python -m textworld_express.daemon start [--port 25335] [--idle-timeout 3600]
+    python -m textworld_express.daemon status [--port 25335]
+    python -m textworld_express.daemon stop [--port 25335]
+
+Environments attach to a running daemon with `TextWorldExpressEnv(connect="127.0.0.1:25335")`. Each environment gets
+its own session on the server, and sessions that are not used for `--idle-timeout` seconds (e.g. from processes that
+exited without closing them) are closed automatically.
+"""
+import os
+import sys
+import time
+import signal
+import socket
+import argparse
+import tempfile
+import subprocess
+
+from textworld_express.constants import BASEPATH, JAR_PATH
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 25335
+DEFAULT_IDLE_TIMEOUT = 3600  # seconds
+
+
+def _pidPath(port):
+    return os.path.join(tempfile.gettempdir(), "textworld_express-daemon-{}.pid".format(port))
+
+
+def _logPath(port):
+    return os.path.join(tempfile.gettempdir(), "textworld_express-daemon-{}.log".format(port))
+
+
+def _readPid(port):
+    try:
+        with open(_pidPath(port)) as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def _isProcessAlive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # Exists, but owned by another user.
+
+    return True
+
+
+def isListening(host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """ Check whether a server is accepting connections on (host, port). """
+    try:
+        with socket.create_connection((host, port), timeout=1):
+            return True
+    except OSError:
+        return False
+
+
+def start(port=DEFAULT_PORT, idleTimeout=DEFAULT_IDLE_TIMEOUT, serverPath=None, javaPath="java", timeout=30):
+    """ Start a daemon listening on `port` (on localhost), and return its process id. """
+    if isListening(DEFAULT_HOST, port):
+        raise RuntimeError("A server is already running on port {}.".format(port))
+
+    cmd = [javaPath, "-cp", serverPath or JAR_PATH, "textworldexpress.runtime.PythonInterface", str(port)]
+    if idleTimeout > 0:
+        cmd += ["--idleTimeout", str(idleTimeout)]
+
+    # Detach the server from this process (own session, no stdin), so it keeps running after this process exits.
+    with open(_logPath(port), "a") as log:
+        proc = subprocess.Popen(cmd, cwd=BASEPATH, stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT,
+                                start_new_session=True)
+
+    with open(_pidPath(port), "w") as f:
+        f.write(str(proc.pid))
+
+    # Wait for the server to start accepting connections
+    startTime = time.time()
+    while not isListening(DEFAULT_HOST, port):
+        if proc.poll() is not None:
+            raise RuntimeError("Server exited while starting (see {}).".format(_logPath(port)))
+        if time.time() - startTime > timeout:
+            proc.kill()
+            raise RuntimeError("Server did not start within {} seconds (see {}).".format(timeout, _logPath(port)))
+        time.sleep(0.1)
+
+    return proc.pid
+
+
+def status(port=DEFAULT_PORT, host=DEFAULT_HOST):
+    """ Return the status of the daemon on `port`: whether it is running, its process id, and its number of sessions. """
+    pid = _readPid(port)
+    out = {
+        "running": isListening(host, port),
+        "pid": pid if (pid is not None and _isProcessAlive(pid)) else None,
+        "numSessions": None,
+        "address": "{}:{}".format(host, port),
+    }
+    if out["running"]:
+        from textworld_express.textworld_express import TextWorldExpressServer
+        out["numSessions"] = TextWorldExpressServer(address=out["address"]).getNumSessions()
+
+    return out
+
+
+def stop(port=DEFAULT_PORT, timeout=10):
+    """ Stop the daemon on `port` (started with `start()`). Returns True if a daemon was stopped. """
+    pid = _readPid(port)
+    if pid is None or not _isProcessAlive(pid):
+        return False
+
+    os.kill(pid, signal.SIGTERM)
+    startTime = time.time()
+    while _isProcessAlive(pid) and time.time() - startTime < timeout:
+        time.sleep(0.1)
+
+    if _isProcessAlive(pid):
+        os.kill(pid, signal.SIGKILL)
+
+    os.remove(_pidPath(port))
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m textworld_express.daemon", description="Manage a long-running TextWorldExpress server.")
+    parser.add_argument("command", choices=["start", "stop", "status"])
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port the server listens on (default: %(default)s).")
+    parser.add_argument("--idle-timeout", type=int, default=DEFAULT_IDLE_TIMEOUT,
+                        help="Close sessions that have not been used for this many seconds (0 = never, default: %(default)s).")
+    parser.add_argument("--server-path", default=None, help="Path to the TextWorldExpress jar (default: builtin jar).")
+    args = parser.parse_args(argv)
+
+    if args.command == "start":
+        pid = start(port=args.port, idleTimeout=args.idle_timeout, serverPath=args.server_path)
+        print("Server started on {}:{} (pid {}).".format(DEFAULT_HOST, args.port, pid))
+
+    elif args.command == "stop":
+        if stop(port=args.port):
+            print("Server on port {} stopped.".format(args.port))
+        else:
+            print("No server found on port {}.".format(args.port))
+            return 1
+
+    elif args.command == "status":
+        info = status(port=args.port)
+        if not info["running"]:
+            print("Not running (port {}).".format(args.port))
+            return 1
+        print("Running on {} (pid {}, {} session(s)).".format(info["address"], info["pid"], info["numSessions"]))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
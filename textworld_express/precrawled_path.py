@@ -0,0 +1,518 @@
+import struct
+
+try:
+    import orjson  # faster json parsing
+except ImportError:
+    import json as orjson
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# Binary precrawled path format (see MappedPrecrawledPath.scala): a header (magic, version, counts, and the offset of
+# each section), followed by 8-byte aligned little-endian sections: one column per node field, the (shared) valid action
+# lists and steps of the nodes as CSR arrays, and a string table of shared segments (sentences or lines).
+_MAGIC = b"TWXB"
+_VERSION = 2
+_PREAMBLE = struct.Struct("<4si")
+_COUNTS = ("numNodes", "numActLists", "numActs", "numEdges", "numStrings", "numStringSegments", "numSegments", "numSegmentBytes")
+# (name, dtype, number of elements)
+_SECTIONS = (
+    ("obs", "<i4", lambda c: c["numNodes"]),
+    ("look", "<i4", lambda c: c["numNodes"]),
+    ("inv", "<i4", lambda c: c["numNodes"]),
+    ("score", "<f8", lambda c: c["numNodes"]),
+    ("scoreNorm", "<f8", lambda c: c["numNodes"]),
+    ("flags", "u1", lambda c: c["numNodes"]),
+    ("actLists", "<i4", lambda c: c["numNodes"]),
+    ("actOffsets", "<i8", lambda c: c["numActLists"] + 1),
+    ("acts", "<i4", lambda c: c["numActs"]),
+    ("edgeOffsets", "<i8", lambda c: c["numNodes"] + 1),
+    ("edgeActions", "<i4", lambda c: c["numEdges"]),
+    ("edgeTargets", "<i4", lambda c: c["numEdges"]),
+    ("stringOffsets", "<i8", lambda c: c["numStrings"] + 1),
+    ("stringSegments", "<i4", lambda c: c["numStringSegments"]),
+    ("segmentOffsets", "<i8", lambda c: c["numSegments"] + 1),
+    ("segmentBytes", "u1", lambda c: c["numSegmentBytes"]),
+)
+# Version 1 files have one valid action list per node, and one segment per string (so they have no actLists,
+# stringOffsets, or stringSegments sections)
+_COUNTS_V1 = ("numNodes", "numActs", "numEdges", "numStrings", "numSegmentBytes")
+_SECTIONS_V1 = tuple(section for section in _SECTIONS if section[0] not in ("actLists", "stringOffsets", "stringSegments"))
+_FORMATS = {1: (_COUNTS_V1, _SECTIONS_V1), _VERSION: (_COUNTS, _SECTIONS)}
+# Characters that end string segments (see `_mkSegments()`)
+_SEGMENT_ENDS = frozenset(".!?\n")
+# Step fields (see `STEP_FIELDS`) that are stored in precrawled paths
+_FIELDS = ("look", "inventory", "validActions")
+
+FLAG_SUCCESS = 1
+FLAG_FAILURE = 2
+FLAG_VALID = 4
+
+
+def _requireNumpy():
+    if np is None:
+        raise ImportError("Binary precrawled paths require numpy (pip install numpy).")
+
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+
+def _headerStruct(version):
+    """ The header of a binary precrawled path file, after the magic and version: the counts, then the section offsets. """
+    counts, sections = _FORMATS[version]
+    return struct.Struct("<" + "q" * (len(counts) + len(sections)))
+
+
+def _mkSegments(string):
+    """ Split a string into segments (sentences and lines), after each run of sentence-ending or newline characters,
+    as `MappedPrecrawledPath.mkSegments()` in Scala does. """
+    segments = []
+    start = 0
+    for i, ch in enumerate(string):
+        if ch in _SEGMENT_ENDS and (i + 1 == len(string) or string[i + 1] not in _SEGMENT_ENDS):
+            segments.append(string[start:i + 1])
+            start = i + 1
+    if start < len(string):
+        segments.append(string[start:])
+    return segments
+
+
+class PrecrawledPath:
+    """ A precrawled path in the binary format (see `convertPrecrawledPath()`), memory-mapped with `numpy.memmap`, so
+    that loading is immediate, and only the parts of the path that are used are read from disk.
+    Node fields are numpy arrays indexed by node (`obs`, `look`, `inv`, `score`, `scoreNorm`, `flags`), the valid
+    actions of node i are `acts[actOffsets[l]:actOffsets[l+1]]`, where l = `actLists[i]` (nodes with the same valid
+    actions share a list), and its steps are `edgeActions`/`edgeTargets[edgeOffsets[i]:edgeOffsets[i+1]]` (sorted by
+    action string ID).  Strings are stored as IDs (see `getStr()`), and the string table as shared segments.  The start
+    node is node 0. """
+    def __init__(self, filename):
+        _requireNumpy()
+        self.filename = filename
+        with open(filename, "rb") as f:
+            magic, version = _PREAMBLE.unpack(f.read(_PREAMBLE.size))
+            if magic != _MAGIC:
+                raise ValueError("Not a binary precrawled path file ({}).".format(filename))
+            if version not in _FORMATS:
+                raise ValueError("Unsupported binary precrawled path version ({}, expected {}).".format(version, _VERSION))
+            headerStruct = _headerStruct(version)
+            header = headerStruct.unpack(f.read(headerStruct.size))
+
+        countNames, sections = _FORMATS[version]
+        self.version = version
+        self.counts = dict(zip(countNames, header[:len(countNames)]))
+        if version == 1:
+            self.counts.update(numActLists=self.counts["numNodes"], numStringSegments=self.counts["numStrings"], numSegments=self.counts["numStrings"])
+        sectionOffsets = header[len(countNames):]
+        for (name, dtype, count), offset in zip(sections, sectionOffsets):
+            numElements = count(self.counts)
+            if numElements == 0:
+                array = np.zeros(0, dtype=dtype)  # numpy can not map empty arrays
+            else:
+                array = np.memmap(filename, dtype=dtype, mode="r", offset=offset, shape=(numElements,))
+            setattr(self, name, array)
+        if version == 1:
+            self.actLists = np.arange(self.counts["numNodes"], dtype="<i4")
+            self.stringOffsets = np.arange(self.counts["numStrings"] + 1, dtype="<i8")
+            self.stringSegments = np.arange(self.counts["numStrings"], dtype="<i4")
+
+        self.numNodes = self.counts["numNodes"]
+        self.numStrings = self.counts["numStrings"]
+        self._stringIds = None
+        # Decoded strings and nodes, shared by all the environments that use this path (see `PrecrawledPathEnv`)
+        self._strings = [None] * self.numStrings
+        self._stepNodes = {}
+
+    def getStr(self, idx):
+        """ The string with ID `idx`. """
+        string = self._strings[idx]
+        if string is None:
+            segmentOffsets = self.segmentOffsets
+            string = b"".join(self.segmentBytes[segmentOffsets[segmentIdx]:segmentOffsets[segmentIdx + 1]].tobytes()
+                              for segmentIdx in self.stringSegments[self.stringOffsets[idx]:self.stringOffsets[idx + 1]]).decode("utf-8")
+            self._strings[idx] = string
+        return string
+
+    def getStrId(self, string):
+        """ The ID of a string (or -1, if it is not in the string table). """
+        if self._stringIds is None:
+            self._stringIds = {self.getStr(idx): idx for idx in range(self.numStrings)}
+        return self._stringIds.get(string, -1)
+
+    def getValidActions(self, nodeIdx):
+        """ The valid actions of a node (as strings). """
+        actListIdx = self.actLists[nodeIdx]
+        return [self.getStr(idx) for idx in self.acts[self.actOffsets[actListIdx]:self.actOffsets[actListIdx + 1]]]
+
+    def getSteps(self, nodeIdx):
+        """ The crawled steps of a node, as a dictionary from action strings to node indices. """
+        start, end = self.edgeOffsets[nodeIdx], self.edgeOffsets[nodeIdx + 1]
+        return {self.getStr(actionIdx): int(targetIdx) for actionIdx, targetIdx in zip(self.edgeActions[start:end], self.edgeTargets[start:end])}
+
+    def step(self, nodeIdx, actionStr):
+        """ The index of the node reached by taking `actionStr` at node `nodeIdx` (or -1, if that step was not crawled). """
+        actionIdx = self.getStrId(actionStr)
+        start, end = self.edgeOffsets[nodeIdx], self.edgeOffsets[nodeIdx + 1]
+        pos = start + int(np.searchsorted(self.edgeActions[start:end], actionIdx))
+        if pos < end and self.edgeActions[pos] == actionIdx:
+            return int(self.edgeTargets[pos])
+        return -1
+
+    def getStepNode(self, nodeIdx):
+        """ The fields of a node that are used for stepping, as a tuple (observation, look, inventory, valid actions,
+        raw score, score, task success, task failure, steps (a dictionary from action strings to node indices)).
+        Nodes are decoded once, then cached (so the returned lists and dictionaries must not be changed). """
+        stepNode = self._stepNodes.get(nodeIdx)
+        if stepNode is None:
+            flags = int(self.flags[nodeIdx])
+            stepNode = (self.getStr(self.obs[nodeIdx]), self.getStr(self.look[nodeIdx]), self.getStr(self.inv[nodeIdx]),
+                        self.getValidActions(nodeIdx), float(self.score[nodeIdx]), float(self.scoreNorm[nodeIdx]),
+                        bool(flags & FLAG_SUCCESS), bool(flags & FLAG_FAILURE), self.getSteps(nodeIdx))
+            self._stepNodes[nodeIdx] = stepNode
+        return stepNode
+
+    def clearCache(self):
+        """ Forget the decoded strings and nodes (e.g. to free memory, after walking a large part of a large path). """
+        self._strings = [None] * self.numStrings
+        self._stepNodes = {}
+
+    def getNode(self, nodeIdx):
+        """ A node with its strings (in the same form as `examples/precrawledPathReader.py`). """
+        flags = int(self.flags[nodeIdx])
+        result = {'obs': self.getStr(self.obs[nodeIdx]),
+                  'look': self.getStr(self.look[nodeIdx]),
+                  'inv': self.getStr(self.inv[nodeIdx]),
+                  'acts': self.getValidActions(nodeIdx),
+                  'score': float(self.score[nodeIdx]),
+                  'scoreNorm': float(self.scoreNorm[nodeIdx]),
+                  'succ': bool(flags & FLAG_SUCCESS),
+                  'fail': bool(flags & FLAG_FAILURE),
+                  'valid': bool(flags & FLAG_VALID)
+                  }
+        return {'result': result, 'steps': self.getSteps(nodeIdx)}
+
+
+def savePrecrawledPath(nodeLUT, stringLUT, filenameOut):
+    """ Save a precrawled path (nodes and strings in the same form as the JSON format, see
+    `PrecrawledPath.saveToJSON()` in Scala) in the binary format. """
+    _requireNumpy()
+    numNodes = len(nodeLUT)
+
+    arrays = {}
+    arrays["obs"] = np.array([node["result"]["obs"] for node in nodeLUT], dtype="<i4")
+    arrays["look"] = np.array([node["result"]["look"] for node in nodeLUT], dtype="<i4")
+    arrays["inv"] = np.array([node["result"]["inv"] for node in nodeLUT], dtype="<i4")
+    arrays["score"] = np.array([node["result"]["score"] for node in nodeLUT], dtype="<f8")
+    arrays["scoreNorm"] = np.array([node["result"]["scoreNorm"] for node in nodeLUT], dtype="<f8")
+    arrays["flags"] = np.array([(FLAG_SUCCESS if node["result"]["succ"] else 0) | (FLAG_FAILURE if node["result"]["fail"] else 0) | (FLAG_VALID if node["result"]["valid"] else 0) for node in nodeLUT], dtype="u1")
+
+    # Valid action lists (shared by the nodes with the same valid actions, in the order they are first used)
+    actListLUT = {}
+    arrays["actLists"] = np.array([actListLUT.setdefault(tuple(node["result"]["acts"]), len(actListLUT)) for node in nodeLUT], dtype="<i4")
+    arrays["actOffsets"] = np.zeros(len(actListLUT) + 1, dtype="<i8")
+    arrays["actOffsets"][1:] = np.cumsum([len(acts) for acts in actListLUT])
+    arrays["acts"] = np.array([act for acts in actListLUT for act in acts], dtype="<i4")
+
+    # Steps (CSR, sorted by action string ID)
+    steps = [sorted((int(actionIdx), targetIdx) for actionIdx, targetIdx in node["steps"].items()) for node in nodeLUT]
+    arrays["edgeOffsets"] = np.zeros(numNodes + 1, dtype="<i8")
+    arrays["edgeOffsets"][1:] = np.cumsum([len(nodeSteps) for nodeSteps in steps])
+    arrays["edgeActions"] = np.array([step[0] for nodeSteps in steps for step in nodeSteps], dtype="<i4")
+    arrays["edgeTargets"] = np.array([step[1] for nodeSteps in steps for step in nodeSteps], dtype="<i4")
+
+    # Strings, as segments (shared by all the strings, in the order they are first used)
+    segmentLUT = {}
+    stringSegments = [[segmentLUT.setdefault(segment, len(segmentLUT)) for segment in _mkSegments(string)] for string in stringLUT]
+    segmentBytes = [segment.encode("utf-8") for segment in segmentLUT]
+    arrays["stringOffsets"] = np.zeros(len(stringLUT) + 1, dtype="<i8")
+    arrays["stringOffsets"][1:] = np.cumsum([len(segments) for segments in stringSegments])
+    arrays["stringSegments"] = np.array([segmentIdx for segments in stringSegments for segmentIdx in segments], dtype="<i4")
+    arrays["segmentOffsets"] = np.zeros(len(segmentBytes) + 1, dtype="<i8")
+    arrays["segmentOffsets"][1:] = np.cumsum([len(segment) for segment in segmentBytes])
+    arrays["segmentBytes"] = np.frombuffer(b"".join(segmentBytes), dtype="u1")
+
+    counts = {"numNodes": numNodes, "numActLists": len(actListLUT), "numActs": len(arrays["acts"]), "numEdges": len(arrays["edgeActions"]),
+              "numStrings": len(stringLUT), "numStringSegments": len(arrays["stringSegments"]), "numSegments": len(segmentBytes),
+              "numSegmentBytes": len(arrays["segmentBytes"])}
+    headerStruct = _headerStruct(_VERSION)
+    sectionOffsets = []
+    offset = _align(_PREAMBLE.size + headerStruct.size)
+    for name, dtype, count in _SECTIONS:
+        sectionOffsets.append(offset)
+        offset = _align(offset + arrays[name].nbytes)
+
+    with open(filenameOut, "wb") as f:
+        f.write(_PREAMBLE.pack(_MAGIC, _VERSION))
+        f.write(headerStruct.pack(*[counts[name] for name in _COUNTS], *sectionOffsets))
+        for (name, dtype, count), sectionOffset in zip(_SECTIONS, sectionOffsets):
+            f.write(b"\0" * (sectionOffset - f.tell()))
+            f.write(arrays[name].astype(dtype, copy=False).tobytes())
+
+
+def compactPrecrawledPath(nodeLUT, stringLUT):
+    """ Compact a precrawled path (nodes and strings in the same form as the JSON format), as
+    `PrecrawledPathCompactor.compact()` in Scala does: structurally identical subtrees are merged (so that the path
+    becomes a DAG, with each distinct subtree stored once), nodes that can not be reached from the start node are
+    removed, and so are the strings that no node uses.  Nodes are numbered in depth-first order from the start node
+    (node 0), taking steps in order of action string ID.  Returns the compacted `(nodeLUT, stringLUT)`. """
+    if not nodeLUT:
+        return nodeLUT, stringLUT
+
+    # Step 1: Find the distinct subtrees, by hash-consing the nodes bottom-up
+    subtreeIdxs = [-1] * len(nodeLUT)
+    subtrees = []  # (result, steps (sorted (action string ID, subtree index) pairs))
+    subtreeLUT = {}
+
+    def findSubtree(nodeIdx):
+        subtreeIdx = subtreeIdxs[nodeIdx]
+        if subtreeIdx >= 0:
+            return subtreeIdx
+        if subtreeIdx == -2:
+            raise ValueError("Precrawled path has a cycle (at node {}), so its subtrees can not be merged.".format(nodeIdx))
+        subtreeIdxs[nodeIdx] = -2  # In progress
+
+        node = nodeLUT[nodeIdx]
+        result = node["result"]
+        steps = tuple((actionIdx, findSubtree(targetIdx)) for actionIdx, targetIdx in sorted((int(actionIdx), targetIdx) for actionIdx, targetIdx in node["steps"].items()))
+        key = (result["obs"], result["look"], result["inv"], tuple(result["acts"]), result["score"], result["scoreNorm"], result["succ"], result["fail"], result["valid"], steps)
+        subtreeIdx = subtreeLUT.setdefault(key, len(subtrees))
+        if subtreeIdx == len(subtrees):
+            subtrees.append((result, steps))
+        subtreeIdxs[nodeIdx] = subtreeIdx
+        return subtreeIdx
+
+    rootIdx = findSubtree(0)
+
+    # Step 2: Number the subtrees (depth-first, from the start node)
+    newIdxs = [-1] * len(subtrees)
+    order = []
+
+    def numberSubtree(subtreeIdx):
+        if newIdxs[subtreeIdx] >= 0:
+            return
+        newIdxs[subtreeIdx] = len(order)
+        order.append(subtreeIdx)
+        for actionIdx, targetIdx in subtrees[subtreeIdx][1]:
+            numberSubtree(targetIdx)
+
+    numberSubtree(rootIdx)
+    subtrees = [subtrees[subtreeIdx] for subtreeIdx in order]
+
+    # Step 3: Remove the strings that are not used (keeping the order of the rest)
+    used = set()
+    for result, steps in subtrees:
+        used.update((result["obs"], result["look"], result["inv"]))
+        used.update(result["acts"])
+        used.update(actionIdx for actionIdx, targetIdx in steps)
+    newStrIdxs = {strIdx: newStrIdx for newStrIdx, strIdx in enumerate(sorted(used))}
+
+    nodeLUTOut = []
+    for result, steps in subtrees:
+        resultOut = dict(result, obs=newStrIdxs[result["obs"]], look=newStrIdxs[result["look"]], inv=newStrIdxs[result["inv"]],
+                         acts=[newStrIdxs[act] for act in result["acts"]])
+        nodeLUTOut.append({"result": resultOut, "steps": {str(newStrIdxs[actionIdx]): newIdxs[targetIdx] for actionIdx, targetIdx in steps}})
+    return nodeLUTOut, [stringLUT[strIdx] for strIdx in sorted(used)]
+
+
+def convertPrecrawledPath(filenameJSON, filenameOut=None, compact=False):
+    """ Convert a JSON precrawled path (e.g. from the `PathPrecrawler` tool) to the binary format, and return the
+    filename of the converted path (by default, the JSON filename with a `.twxb` extension).  With `compact`, the path
+    is compacted first (see `compactPrecrawledPath()`), which renumbers its nodes and strings. """
+    if filenameOut is None:
+        filenameOut = (filenameJSON[:-len(".json")] if filenameJSON.endswith(".json") else filenameJSON) + ".twxb"
+
+    with open(filenameJSON, "rb") as f:
+        precrawledPath = orjson.loads(f.read())
+
+    nodeLUT, stringLUT = precrawledPath["nodeLUT"], precrawledPath["stringLUT"]
+    if compact:
+        nodeLUT, stringLUT = compactPrecrawledPath(nodeLUT, stringLUT)
+    savePrecrawledPath(nodeLUT, stringLUT, filenameOut)
+    return filenameOut
+
+
+class PrecrawledPathEnv:
+    """ An environment that walks a precrawled path (see `PrecrawledPath`) in pure Python, without a JVM, with the
+    same `reset()`/`step()` contract (and `infos`) as `TextWorldExpressEnv`.  It replays the crawled game, which has
+    a fixed seed: every episode starts at the start node of the path.
+    Paths are read-only, so any number of environments can share one (including its cache of decoded nodes), e.g.
+    `envs = [PrecrawledPathEnv(path) for _ in range(64)]`.
+    Actions that are not valid leave the game unchanged, with the same observation as `TextWorldExpressEnv`.  The
+    path ends at the maximum crawl depth: reaching a node whose actions were not crawled ends the episode (`done`),
+    and taking a valid action there raises a `ValueError`.  The `taskDescription` field is not stored in precrawled
+    paths, so it is not available. """
+    INVALID_ACTION_OBSERVATION = "Unknown action: I'm not sure what you mean."  # As in StepResult.mkInvalidStep()
+
+    def __init__(self, path, envStepLimit=100):
+        self.path = path if isinstance(path, PrecrawledPath) else PrecrawledPath(path)
+        self.envStepLimit = envStepLimit
+        self.fields = _FIELDS
+        self.nodeIdx = 0
+        self._stepNode = None  # The fields of the current node (see `PrecrawledPath.getStepNode()`)
+        self.lastStepScore = 0
+        self.runHistory = []
+
+    #
+    #   Run History
+    #
+    def clearRunHistory(self):
+        self.runHistory = []
+
+    def getRunHistory(self):
+        finalScore = self.runHistory[-1]['score'] if self.runHistory else 0
+        return {'finalScore': finalScore, 'numSteps': len(self.runHistory), 'history': self.runHistory}
+
+    def getNumSteps(self):
+        return len(self.runHistory)
+
+    #
+    #   Methods
+    #
+    def reset(self, fields=None):
+        """ Start a new episode (at the start node of the path). `fields` selects the optional `infos` fields, as in
+        `TextWorldExpressEnv.reset()` (default: the fields of the last reset, initially all). """
+        if fields is not None:
+            unknown = set(fields) - set(_FIELDS)
+            if unknown:
+                raise ValueError("Unknown (or unavailable) step field(s): {}. Valid options are {}.".format(sorted(unknown), _FIELDS))
+            self.fields = tuple(field for field in _FIELDS if field in fields)
+
+        self.nodeIdx = 0
+        self._stepNode = stepNode = self.path.getStepNode(0)
+        self.lastStepScore = 0
+        infos = self._mkInfos(stepNode, stepNode[0])
+        infos['reward'] = 0
+        infos['done'] = False
+        infos['numMoves'] = 0
+
+        self.clearRunHistory()
+        self.runHistory.append(dict(infos))
+        return infos["observation"], infos
+
+    def step(self, inputStr:str):
+        stepNode = self._stepNode
+        nextNodeIdx = stepNode[8].get(inputStr)
+        if nextNodeIdx is not None:
+            self.nodeIdx = nextNodeIdx
+            self._stepNode = nextStepNode = self.path.getStepNode(nextNodeIdx)
+            infos = self._mkInfos(nextStepNode, nextStepNode[0])
+        elif inputStr in stepNode[3]:
+            raise ValueError("Action ({}) is past the maximum depth of the precrawled path.".format(inputStr))
+        else:
+            # Invalid action: the game does not change
+            infos = self._mkInfos(stepNode, self.INVALID_ACTION_OBSERVATION)
+
+        return self._finishStep(infos, inputStr)
+
+    def step_index(self, validActionIdx:int):
+        """ Take the action at index `validActionIdx` of the last step's valid actions. Out-of-range indices are
+        invalid actions. """
+        validActions = self._stepNode[3]
+        actionStr = validActions[validActionIdx] if 0 <= validActionIdx < len(validActions) else ""
+        return self.step(actionStr)
+
+    def _mkInfos(self, stepNode, observation):
+        """ The infos of a node (with `observation`, which is not the node's own after an invalid action). """
+        infos = {'observation': observation}
+        fields = self.fields
+        if 'look' in fields:
+            infos['look'] = stepNode[1]
+        if 'inventory' in fields:
+            infos['inventory'] = stepNode[2]
+        if 'validActions' in fields:
+            infos['validActions'] = stepNode[3]
+        infos['scoreRaw'] = stepNode[4]
+        infos['score'] = stepNode[5]
+        infos['tasksuccess'] = stepNode[6]
+        infos['taskfailure'] = stepNode[7]
+        return infos
+
+    def _finishStep(self, infos, inputStr):
+        # Same as TextWorldExpressEnv._finishStep()
+        infos['lastActionStr'] = inputStr
+
+        score = infos['score']
+        reward = score - self.lastStepScore
+        self.lastStepScore = score
+        infos['reward'] = reward
+
+        numMoves = len(self.runHistory)
+        infos['numMoves'] = numMoves
+
+        # Done at the step limit, on success or failure, or at the end of the precrawled path
+        isCompleted = (numMoves > self.envStepLimit) or (score >= 1.0) or infos['tasksuccess'] or infos['taskfailure'] or not self._stepNode[8]
+        infos['done'] = isCompleted
+
+        self.runHistory.append(dict(infos))
+        return infos["observation"], reward, isCompleted, infos
+
+
+class PrecrawledPathWalker:
+    """ Walks many agents at once over a precrawled path (see `PrecrawledPath`), with numpy array operations only (no
+    Python loop over the agents), e.g. for vectorized learners.  The walker has no state: agents are arrays of node
+    indices, and their actions are edge slots, where slot k of a node is its k-th crawled step (steps are sorted by
+    action string ID, see `getActionIds()`).  Slots that are out of range are invalid actions, which leave the agent on
+    its node.  Nodes are done on task success or failure, at a score of 1.0, or if they have no crawled steps (e.g. at
+    the maximum crawl depth).  Step limits are left to the caller. """
+    def __init__(self, path):
+        _requireNumpy()
+        self.path = path if isinstance(path, PrecrawledPath) else PrecrawledPath(path)
+        # Plain array views of the mapped tables (indexing memmaps directly is slower)
+        self._edgeOffsets = np.asarray(self.path.edgeOffsets)
+        self._edgeActions = np.asarray(self.path.edgeActions)
+        self._edgeTargets = np.asarray(self.path.edgeTargets)
+        self._scores = np.asarray(self.path.scoreNorm)
+        # Per-node tables (computed once, for all the nodes)
+        self.numSteps = np.diff(self._edgeOffsets).astype(np.int32)
+        self.isDoneNode = ((np.asarray(self.path.flags) & (FLAG_SUCCESS | FLAG_FAILURE)) != 0) | (np.asarray(self.path.scoreNorm) >= 1.0) | (self.numSteps == 0)
+        self.maxSteps = int(self.numSteps.max()) if self.path.numNodes > 0 else 0
+        self._slots = np.arange(self.maxSteps, dtype=np.int32)
+
+    def getStartNodes(self, numAgents):
+        """ Node indices of `numAgents` agents at the start of the path. """
+        return np.zeros(numAgents, dtype=np.int32)
+
+    def step(self, nodeIdxs, edgeSlots):
+        """ Take the step at slot `edgeSlots[i]` of node `nodeIdxs[i]`, for every agent i.  Returns the next node
+        indices, their (normalized) scores, their done flags, and their action masks (a boolean array of shape
+        (number of agents, `maxSteps`), that is true for the valid slots of each next node). """
+        nodeIdxs = np.asarray(nodeIdxs)
+        edgeSlots = np.asarray(edgeSlots)
+        valid = (edgeSlots >= 0) & (edgeSlots < self.numSteps[nodeIdxs])
+        if valid.any():
+            # Invalid slots read edge 0 (which exists, since some slot is valid), and then keep their node
+            edgeIdxs = np.where(valid, self._edgeOffsets[nodeIdxs] + edgeSlots, 0)
+            nextNodeIdxs = np.where(valid, self._edgeTargets[edgeIdxs], nodeIdxs).astype(np.int32)
+        else:
+            nextNodeIdxs = nodeIdxs.astype(np.int32)
+        return nextNodeIdxs, self.getScores(nextNodeIdxs), self.isDone(nextNodeIdxs), self.getActionMask(nextNodeIdxs)
+
+    def getScores(self, nodeIdxs):
+        """ The (normalized) scores of the nodes. """
+        return self._scores[nodeIdxs]
+
+    def isDone(self, nodeIdxs):
+        """ The done flags of the nodes. """
+        return self.isDoneNode[nodeIdxs]
+
+    def getActionMask(self, nodeIdxs):
+        """ Boolean array of shape (number of nodes, `maxSteps`), that is true for the valid slots of each node. """
+        return self._slots[np.newaxis, :] < self.numSteps[nodeIdxs][:, np.newaxis]
+
+    def getActionIds(self, nodeIdxs):
+        """ The action string ID of each slot (see `PrecrawledPath.getStr()`), as an array of shape (number of nodes,
+        `maxSteps`), with -1 for slots that are not valid. """
+        mask = self.getActionMask(nodeIdxs)
+        if not mask.any():
+            return np.full(mask.shape, -1, dtype=np.int32)
+        edgeIdxs = np.where(mask, self._edgeOffsets[nodeIdxs][:, np.newaxis] + self._slots[np.newaxis, :], 0)
+        return np.where(mask, self._edgeActions[edgeIdxs], -1).astype(np.int32)
+
+    def sampleSlots(self, nodeIdxs, rng):
+        """ A uniformly random valid slot for each node (0 for nodes with no steps), from the numpy random `Generator`
+        `rng`. """
+        numSteps = self.numSteps[nodeIdxs]
+        return (rng.random(len(numSteps)) * numSteps).astype(np.int32)
@@ -2,8 +2,12 @@
 import os
 import sys
 import time
+import struct
+import binascii
 import logging
 import tempfile
+import threading
+from collections import OrderedDict
 
 try:
     import orjson  # faster json serialization
@@ -12,52 +16,255 @@ except ImportError:
 
 from py4j.java_gateway import launch_gateway
 from py4j.java_gateway import JavaGateway, GatewayParameters, CallbackServerParameters
+from py4j.protocol import Py4JError
 
 from textworld_express.constants import BASEPATH, DEBUG_MODE, JAR_PATH
 
 logger = logging.getLogger(__name__)
 
+# Binary step-result protocol (see BinaryStepResultEncoder.scala): a fixed header (scoreRaw, score, flags, number of
+# valid actions), followed by a UTF-8 string table (observation, look, inventory, then each valid action): the byte length
+# of each string (int32), then the bytes of the strings.
+# The server sends it as Base64 text, since py4j transfers strings much faster than byte arrays.
+_BINARY_HEADER = struct.Struct(">ddBi")
+_FLAG_TASK_SUCCESS = 1
+_FLAG_TASK_FAILURE = 2
+_FLAG_HAS_LOOK = 8
+_FLAG_HAS_INVENTORY = 16
+_FLAG_HAS_VALID_ACTIONS = 32
+
+# Suffix of the server methods for each step-result protocol (e.g. stepJSON, stepBinary, stepIds)
+_PROTOCOL_SUFFIXES = {"json": "JSON", "binary": "Binary", "ids": "Ids"}
+
+# Optional fields of the step `infos` (see `TextWorldExpressEnv.reset()`). The observation, score and done flags are always included.
+STEP_FIELDS = ("look", "inventory", "validActions", "taskDescription")
+
+# Default maximum number of snapshots kept per environment (same as the server's default, see PythonInterface.scala)
+DEFAULT_MAX_SNAPSHOTS = 1000
+
+
+def _decodeBinaryStepResult(data):
+    """ Decode a (Base64-encoded) binary step result into the same dictionary as the JSON protocol. """
+    buf = memoryview(binascii.a2b_base64(data))
+    scoreRaw, score, flags, numValidActions = _BINARY_HEADER.unpack_from(buf, 0)
+    numStrings = 1 + bool(flags & _FLAG_HAS_LOOK) + bool(flags & _FLAG_HAS_INVENTORY) + numValidActions
+    lengths = struct.unpack_from(">{}i".format(numStrings), buf, _BINARY_HEADER.size)
+
+    strs = []
+    pos = _BINARY_HEADER.size + 4 * numStrings
+    for length in lengths:
+        strs.append(str(buf[pos:pos + length], "utf-8"))
+        pos += length
+
+    # Optional strings are only present if included in the step fields (same key order as the JSON protocol).
+    out = {"observation": strs[0]}
+    idx = 1
+    if flags & _FLAG_HAS_LOOK:
+        out["look"] = strs[idx]
+        idx += 1
+    if flags & _FLAG_HAS_INVENTORY:
+        out["inventory"] = strs[idx]
+        idx += 1
+    if flags & _FLAG_HAS_VALID_ACTIONS:
+        out["validActions"] = strs[idx:]
+
+    if pos != len(buf):
+        raise ValueError("Malformed step result: expected {} bytes, found {}.".format(pos, len(buf)))
+
+    out["scoreRaw"] = scoreRaw
+    out["score"] = score
+    out["tasksuccess"] = bool(flags & _FLAG_TASK_SUCCESS)
+    out["taskfailure"] = bool(flags & _FLAG_TASK_FAILURE)
+    return out
+
+
+class _RolloutDecoder:
+    """ Decodes rollout episodes (see RolloutEngine.scala), replacing action and observation IDs with their strings.
+    Each episode adds the strings that are new since the previous episode to the vocabularies, so episodes must be
+    decoded in order. """
+    def __init__(self):
+        self.actions = []
+        self.texts = []
+
+    def decode(self, episode):
+        self.actions.extend(episode.pop("newActions"))
+        self.texts.extend(episode.pop("newTexts"))
+        episode["actions"] = [self.actions[actionId] for actionId in episode["actions"]]
+        if "observations" in episode:
+            episode["observations"] = [self.texts[textId] for textId in episode["observations"]]
+        return episode
+
+
+def readRollouts(path):
+    """ Read the episodes of a rollout file (see `TextWorldExpressEnv.rollout()`), one at a time. """
+    decoder = _RolloutDecoder()
+    with open(path, "rb") as f:
+        for line in f:
+            yield decoder.decode(orjson.loads(line))
+
+
+def _launchGateway(serverPath=None):
+    """ Launch a TextWorldExpress JVM, and return a `JavaGateway` connected to it. """
+    serverPath = serverPath or JAR_PATH  # Use the builtin jar.
+
+    # Launch Java side with dynamic port and get back the port on which the
+    # server was bound to.
+    if DEBUG_MODE:
+        port = launch_gateway(
+            classpath=serverPath, die_on_exit=True, cwd=BASEPATH,
+            javaopts=['-agentlib:jdwp=transport=dt_socket,server=y,suspend=n,address=5005,quiet=y'],
+            redirect_stdout=sys.stdout, redirect_stderr=sys.stderr)
+        print("Attach debugger within the next 10 seconds")
+        time.sleep(10)  # Give time for user to attach debugger
+    else:
+        port, proc = launch_gateway(classpath=serverPath, die_on_exit=True, cwd=BASEPATH, javaopts=['-Xverify:none'], return_proc=True)
+
+    # Connect python side to Java side with Java dynamic port and start python
+    # callback server with a dynamic port
+    gateway = JavaGateway(
+        gateway_parameters=GatewayParameters(auto_field=True, port=port),
+        callback_server_parameters=CallbackServerParameters(port=0, daemonize=True),
+        java_process=proc)
+
+    # Retrieve the port on which the python callback server was bound to.
+    python_port = gateway.get_callback_server().get_listening_port()
+
+    # Tell the Java side to connect to the python callback server with the new
+    # python port. Note that we use the java_gateway_server attribute that
+    # retrieves the GatewayServer instance.
+    gateway.java_gateway_server.resetCallbackClient(
+        gateway.java_gateway_server.getCallbackClient().getAddress(),
+        python_port)
+
+    return gateway
+
+
+def _shutdownGateway(gateway):
+    """ Shutdown a `JavaGateway` (and the JVM it launched). """
+    gateway.shutdown()
+
+    # According to https://github.com/py4j/py4j/issues/320#issuecomment-553599210
+    # we need to send a newline to the process to make it exit.
+    if gateway.java_process.poll() is None:
+        gateway.java_process.stdin.write("\n".encode("utf-8"))
+        gateway.java_process.stdin.flush()
+
+
+# Connections to shared servers, keyed by (host, port). A `JavaGateway` keeps its own pool of socket connections
+# (one per concurrently calling thread), so all the environments of a process attached to the same server share it.
+_sharedGateways = {}
+_sharedGatewaysLock = threading.Lock()
+
+
+def _connectGateway(host, port):
+    """ Return a `JavaGateway` connected to an already running TextWorldExpress JVM (reusing an existing connection). """
+    key = (host, int(port))
+    with _sharedGatewaysLock:
+        if key not in _sharedGateways:
+            _sharedGateways[key] = JavaGateway(gateway_parameters=GatewayParameters(address=host, port=int(port), auto_field=True))
+
+        return _sharedGateways[key]
+
+
+def _parseAddress(address):
+    """ Parse a server address ("host:port", or just a port number) into (host, port). """
+    address = str(address)
+    if ":" not in address:
+        return "127.0.0.1", int(address)
+
+    host, port = address.rsplit(":", 1)
+    return host or "127.0.0.1", int(port)
+
+
+class TextWorldExpressServer:
+    """ A single JVM hosting many environments, each in its own session.
+
+    Environments created with `TextWorldExpressEnv(server=server)` share this JVM (heap, JIT warm-up, and loaded game data)
+    instead of launching one JVM each. Other Python processes can attach to the same JVM with
+    `TextWorldExpressServer(address=server.address)`. Only the server that launched the JVM shuts it down on `close()`.
+    """
+
+    def __init__(self, serverPath=None, address=None):
+        # Set before launching/connecting, so that close() works even if that fails
+        self._gateway = None
+        self.ownsServer = False
+        self._closed = False
+
+        if address is None:
+            # Launch a new JVM
+            self._gateway = _launchGateway(serverPath)
+            self.host = "127.0.0.1"
+            self.port = self._gateway.gateway_parameters.port
+            self.ownsServer = True
+
+            # Servers attaching from this process reuse this connection
+            with _sharedGatewaysLock:
+                _sharedGateways[(self.host, self.port)] = self._gateway
+        else:
+            # Attach to an existing JVM
+            self.host, self.port = _parseAddress(address)
+            self._gateway = _connectGateway(self.host, self.port)
+            self.ownsServer = False
 
-class TextWorldExpressEnv:
+        self.registry = self._gateway.jvm.textworldexpress.runtime.SessionRegistry
 
-    #
-    # Constructor
-    #
-    def __init__(self, serverPath=None, envStepLimit=100):
-        serverPath = serverPath or JAR_PATH  # Use the builtin jar.
+    @property
+    def address(self):
+        return "{}:{}".format(self.host, self.port)
 
-        # Launch the server and connect to the JVM.
+    def newSession(self):
+        """ Create a new session, and return (sessionId, interface to the session). """
+        sessionId = self.registry.newSession()
+        return sessionId, self.registry.getSession(sessionId)
 
-        # Launch Java side with dynamic port and get back the port on which the
-        # server was bound to.
-        if DEBUG_MODE:
-            port = launch_gateway(
-                classpath=serverPath, die_on_exit=True, cwd=BASEPATH,
-                javaopts=['-agentlib:jdwp=transport=dt_socket,server=y,suspend=n,address=5005,quiet=y'],
-                redirect_stdout=sys.stdout, redirect_stderr=sys.stderr)
-            print("Attach debugger within the next 10 seconds")
-            time.sleep(10)  # Give time for user to attach debugger
-        else:
-            port, proc = launch_gateway(classpath=serverPath, die_on_exit=True, cwd=BASEPATH, javaopts=['-Xverify:none'], return_proc=True)
+    def closeSession(self, sessionId):
+        return self.registry.closeSession(sessionId)
 
-        # Connect python side to Java side with Java dynamic port and start python
-        # callback server with a dynamic port
-        self._gateway = JavaGateway(
-            gateway_parameters=GatewayParameters(auto_field=True, port=port),
-            callback_server_parameters=CallbackServerParameters(port=0, daemonize=True),
-            java_process=proc)
+    def getNumSessions(self):
+        return self.registry.getNumSessions()
 
-        # Retrieve the port on which the python callback server was bound to.
-        python_port = self._gateway.get_callback_server().get_listening_port()
+    def close(self) -> None:
+        if self.ownsServer and not self._closed:
+            with _sharedGatewaysLock:
+                _sharedGateways.pop((self.host, self.port), None)
+            _shutdownGateway(self._gateway)
+        self._closed = True
 
-        # Tell the Java side to connect to the python callback server with the new
-        # python port. Note that we use the java_gateway_server attribute that
-        # retrieves the GatewayServer instance.
-        self._gateway.java_gateway_server.resetCallbackClient(
-            self._gateway.java_gateway_server.getCallbackClient().getAddress(),
-            python_port)
+    def __del__(self):
+        self.close()
+
+
+class TextWorldExpressEnv:
 
-        self.server = self._gateway.jvm.textworldexpress.runtime.PythonInterface()
+    #
+    # Constructor
+    #
+    def __init__(self, serverPath=None, envStepLimit=100, server=None, connect=None, protocol="json"):
+        # Set before launching/connecting, so that close() works even if that fails
+        self._gateway = None
+        self.sharedServer = None
+        self.sessionId = None
+        self._closed = False
+
+        # Encoding of step results sent by the server: "json", "binary" (more compact, and faster to decode), or "ids"
+        # (strings are sent once, then referred to by integer IDs, see `getTextVocabulary()`/`getActionVocabulary()`).
+        if protocol not in _PROTOCOL_SUFFIXES:
+            raise ValueError("Unknown protocol ({}). Valid options are (json, binary, ids).".format(protocol))
+        self.protocol = protocol
+
+        # Attach to an already running server (e.g. `python -m textworld_express.daemon start`), given as "host:port".
+        if connect is not None:
+            server = TextWorldExpressServer(address=connect)
+
+        if server is None:
+            # Launch the server and connect to the JVM.
+            self._gateway = _launchGateway(serverPath)
+            self.server = self._gateway.jvm.textworldexpress.runtime.PythonInterface()
+        else:
+            # Use a session on a shared server (see `TextWorldExpressServer`).
+            self._gateway = server._gateway
+            self.sharedServer = server
+            self.sessionId, self.server = server.newSession()
 
         # Keep track of the last step score, to calculate reward from score
         self.lastStepScore = 0
@@ -78,6 +285,19 @@ class TextWorldExpressEnv:
         self.gameParams = ""
         self.gameFold = "train"
         self.generateGoldPath = False
+        self.fields = STEP_FIELDS
+        self.taskDescription = None  # Cached once per episode
+        self._goldPath = None  # Cached once per episode (when first requested)
+        self._gameNames = None
+        self._seedRanges = None
+
+        # Strings for each ID (for the "ids" protocol), mirroring the vocabularies in the server
+        self._textVocabulary = []
+        self._actionVocabulary = []
+
+        # Python-side state for each snapshot (mirrors the least-recently-used eviction of the snapshots in the server)
+        self.maxSnapshots = DEFAULT_MAX_SNAPSHOTS
+        self._snapshots = OrderedDict()
 
         self._obj_tree_tempfile = tempfile.NamedTemporaryFile()
 
@@ -111,7 +331,13 @@ class TextWorldExpressEnv:
     #
     #   Methods
     #
-    def reset(self, seed=None, gameFold=None, gameName=None, gameParams=None, generateGoldPath=False):
+    def reset(self, seed=None, gameFold=None, gameName=None, gameParams=None, generateGoldPath=False, fields=None):
+        """ Start a new episode. `fields` selects the optional `infos` fields (from `STEP_FIELDS`) returned by
+        this and following steps (default: the fields of the last reset, initially all). Fields that are not
+        requested are not generated by the server at all, which makes steps faster. """
+        if fields is not None:
+            self._setFields(fields)
+
         self.gameName = gameName or self.gameName
         self.gameParams = gameParams if gameParams is not None else self.gameParams
         if gameName is not None or gameParams is not None:
@@ -122,11 +348,16 @@ class TextWorldExpressEnv:
 
         self.goldPathGenerated = generateGoldPath
         if self.seed is None:
-            response = self.server.resetWithRandomSeedJSON(self.gameFold, generateGoldPath)
+            response = self._request("resetWithRandomSeed", self.gameFold, generateGoldPath)
         else:
-            response = self.server.generateNewGameJSON(self.seed, self.gameFold, generateGoldPath)
+            response = self._request("generateNewGame", self.seed, self.gameFold, generateGoldPath)
+
+        self._goldPath = None  # Fetched when first requested
+
+        # The task description does not change during an episode, so it is only fetched once.
+        self.taskDescription = self.getTaskDescription() if "taskDescription" in self.fields else None
 
-        infos = self.parseJSONResponse(response)
+        infos = self._parseResponse(response)
 
         # Reset last step score (used to calculate reward from current-previous score)
         self.lastStepScore = 0
@@ -137,6 +368,17 @@ class TextWorldExpressEnv:
 
         return infos["observation"], infos
 
+    def _setFields(self, fields):
+        unknown = set(fields) - set(STEP_FIELDS)
+        if unknown:
+            raise ValueError("Unknown step field(s): {}. Valid options are {}.".format(sorted(unknown), STEP_FIELDS))
+
+        msg = self.server.setStepFields(",".join(field for field in fields if field != "taskDescription"))
+        if msg:
+            raise ValueError(msg)
+
+        self.fields = tuple(field for field in STEP_FIELDS if field in fields)
+
     # Ask the simulator to load an environment from a script
     def load(self, gameName, gameParams):
         self.gameName = gameName
@@ -146,13 +388,16 @@ class TextWorldExpressEnv:
             raise ValueError(msg)
 
     def close(self) -> None:
-        self._gateway.shutdown()
-
-        # According to https://github.com/py4j/py4j/issues/320#issuecomment-553599210
-        # we need to send a newline to the process to make it exit.
-        if self._gateway.java_process.poll() is None:
-            self._gateway.java_process.stdin.write("\n".encode("utf-8"))
-            self._gateway.java_process.stdin.flush()
+        if self.sharedServer is None:
+            if (self._gateway is not None) and not self._closed:
+                _shutdownGateway(self._gateway)
+            self._closed = True
+        elif self.sessionId is not None:
+            try:
+                self.sharedServer.closeSession(self.sessionId)
+            except Py4JError:
+                pass  # The shared server has already been shut down.
+            self.sessionId = None
 
     def __del__(self):
         self.close()
@@ -160,7 +405,9 @@ class TextWorldExpressEnv:
 
     # Get a list of valid tasks/environments
     def getGameNames(self):
-        return list(self.server.getGameNames())
+        if self._gameNames is None:
+            self._gameNames = orjson.loads(self.server.getGameNamesJSON())
+        return list(self._gameNames)
 
     # Get the current game's generation properties
     def getGenerationProperties(self):
@@ -180,17 +427,33 @@ class TextWorldExpressEnv:
         payload = self._obj_tree_tempfile.file.read()
         return orjson.loads(payload)
 
+    def getStateFingerprint(self):
+        """ 128-bit fingerprint of the current game state (32 hexadecimal digits). States with the same world (objects,
+        doors, agent location and inventory) and score have the same fingerprint, however they were reached, so it
+        can be used to deduplicate states or detect loops. It is cheap enough to compute on every step. """
+        fingerprint = self.server.getStateFingerprint()
+        if not fingerprint:
+            raise RuntimeError("Game is not initialized -- call reset() before getting the state fingerprint.")
+
+        return fingerprint
+
     #
     # Train/development/test sets
     #
+    # The seeds of each fold are constant, so they are only fetched (as ranges) once.
+    def _getSeedRange(self, gameFold):
+        if self._seedRanges is None:
+            self._seedRanges = orjson.loads(self.server.getSeedRangesJSON())
+        return range(*self._seedRanges[gameFold])
+
     def getValidSeedsTrain(self):
-        return list(self.server.getSeedsTrain())
+        return list(self._getSeedRange("train"))
 
     def getValidSeedsDev(self):
-        return list(self.server.getSeedsDev())
+        return list(self._getSeedRange("dev"))
 
     def getValidSeedsTest(self):
-        return list(self.server.getSeedsTest())
+        return list(self._getSeedRange("test"))
 
     def getRandomSeedTrain(self):
         return self.server.getRandomSeedTrain()
@@ -205,10 +468,19 @@ class TextWorldExpressEnv:
     # Gold action sequence
     #
     def getGoldActionSequence(self):
-        if (self.goldPathGenerated == True):
-            return list(self.server.getGoldActionSequence())
-        else:
-            return ["ERROR: Gold path was not generated.  Set `generateGoldPath` flag to true when calling load()."]
+        """ Gold path of the current game. It is generated when first requested (unless `generateGoldPath` was set
+        at reset), and memoized by the server, so later episodes of the same game do not generate it again. """
+        # Fetched once per episode
+        if self._goldPath is None:
+            self._goldPath = orjson.loads(self.server.getGoldActionSequenceJSON())
+        return list(self._goldPath)
+
+    def setGoldPathCacheDir(self, path):
+        """ Store gold paths in `path` (and look them up there), so that they are reused across runs. `None`
+        disables it. The directory is shared by all environments on the same server. """
+        msg = self.server.setGoldPathCacheDir(path or "")
+        if msg:
+            raise ValueError(msg)
 
     # Parse JSON (Helper)
     def parseJSONResponse(self, json_data):
@@ -216,6 +488,45 @@ class TextWorldExpressEnv:
         #parsedResponse = json.loads(json_data)
         # External JSON parser (faster)
         parsedResponse = orjson.loads(json_data)
+        return self._addInferredProperties(parsedResponse)
+
+    # Parse binary step result (Helper)
+    def parseBinaryResponse(self, data):
+        return self._addInferredProperties(_decodeBinaryStepResult(data))
+
+    # Parse step result with integer IDs (Helper)
+    def parseIdResponse(self, json_data):
+        response = orjson.loads(json_data)
+        self._textVocabulary.extend(response["newTexts"])
+        self._actionVocabulary.extend(response["newActions"])
+
+        # Resolve the IDs with the local vocabularies, keeping the IDs alongside the strings.
+        parsedResponse = {}
+        for key in ("observation", "look", "inventory"):
+            if key in response:
+                parsedResponse[key] = self._textVocabulary[response[key]]
+                parsedResponse[key + "Id"] = response[key]
+        if "validActions" in response:
+            parsedResponse["validActions"] = [self._actionVocabulary[actionId] for actionId in response["validActions"]]
+            parsedResponse["validActionIds"] = response["validActions"]
+        for key in ("scoreRaw", "score", "tasksuccess", "taskfailure"):
+            parsedResponse[key] = response[key]
+
+        return self._addInferredProperties(parsedResponse)
+
+    # Call the server method `name` with the suffix of the protocol in use (e.g. stepJSON or stepBinary)
+    def _request(self, name, *args):
+        return getattr(self.server, name + _PROTOCOL_SUFFIXES[self.protocol])(*args)
+
+    def _parseResponse(self, response):
+        if self.protocol == "binary":
+            return self.parseBinaryResponse(response)
+        elif self.protocol == "ids":
+            return self.parseIdResponse(response)
+
+        return self.parseJSONResponse(response)
+
+    def _addInferredProperties(self, parsedResponse):
         # Add placeholders for inferred properties
         # TODO: those should be handled server-side.
         parsedResponse['reward'] = 0
@@ -223,7 +534,8 @@ class TextWorldExpressEnv:
         parsedResponse['numMoves'] = 0
 
         # Also add the task description to the observation (feature request)
-        parsedResponse['taskDescription'] = self.getTaskDescription()
+        if "taskDescription" in self.fields:
+            parsedResponse['taskDescription'] = self.taskDescription
 
         return parsedResponse
 
@@ -238,7 +550,25 @@ class TextWorldExpressEnv:
             return observation, 0, False, infos
 
         # Step 1: Take a step in the environment
-        infos = self.parseJSONResponse(self.server.stepJSON(inputStr))
+        infos = self._parseResponse(self._request("step", inputStr))
+
+        return self._finishStep(infos, inputStr)
+
+    def step_index(self, validActionIdx:int):
+        """ Take the action at index `validActionIdx` of the last step's `infos['validActions']`. This avoids sending
+        the action string to the server (and looking it up there). Out-of-range indices are invalid actions. """
+        # The server returns the action string that was taken (or an empty string for out-of-range indices) before the
+        # step result, as "<length of the action string>:<action string><step result>".
+        response = self._request("stepIndex", validActionIdx)
+        sep = response.index(":")
+        end = sep + 1 + int(response[:sep])
+        actionStr = response[sep + 1:end]
+
+        infos = self._parseResponse(response[end:])
+
+        return self._finishStep(infos, actionStr)
+
+    def _finishStep(self, infos, inputStr):
         observation = infos["observation"]
         infos['lastActionStr'] = inputStr
 
@@ -273,6 +603,174 @@ class TextWorldExpressEnv:
 
         return observation, reward, isCompleted, infos
 
+    #
+    # Lookahead
+    #
+    def lookahead(self):
+        """ Get the outcome of each valid action from the current state, without changing the game (each action is
+        taken on its own copy of the game in the simulator). Returns one dict per valid action (in the order of
+        `infos['validActions']`), with its `action`, the next `observation`, `score`, `reward` (score delta), `done`
+        (as it would be returned by `step()`), `tasksuccess`, `taskfailure`, and the `fingerprint` of the next state
+        (see `getStateFingerprint()`). """
+        response = orjson.loads(self.server.lookaheadJSON())
+        if "errorStr" in response:
+            raise ValueError(response["errorStr"])
+
+        outcomes = response["outcomes"]
+        # The step limit is checked here, as in step()
+        if self.getNumSteps() > self.envStepLimit:
+            for outcome in outcomes:
+                outcome["done"] = True
+
+        return outcomes
+
+    #
+    # Rollouts with built-in policies
+    #
+    def rollout(self, seeds, policy="random", epsilon=0.1, maxSteps=None, policySeed=0, gameFold=None,
+                includeObservations=False, numThreads=1, outputPath=None):
+        """ Run one episode for each seed on the server, with a built-in policy: "random" (uniformly random valid
+        actions), "gold" (the gold path), or "epsilon-gold" (a random valid action with probability `epsilon`,
+        otherwise the next gold action). Episodes run for at most `maxSteps` steps (default: the environment step
+        limit), and are reproducible for a given `policySeed`, whatever the number of threads.
+
+        Returns the summary statistics (`numEpisodes`, `numSteps`, `numSuccesses`) and the `episodes`, each with its
+        `seed`, `actions`, the `scores` after each action, `tasksuccess`/`taskfailure`, and (if `includeObservations`)
+        the `observations` before the first action and after each action. With `outputPath`, the episodes are written
+        to that file instead (read them with `readRollouts()`), and only the summary statistics are returned. """
+        if maxSteps is None:
+            maxSteps = self.envStepLimit
+
+        response = orjson.loads(self.server.rolloutJSON(",".join(str(seed) for seed in seeds), gameFold or self.gameFold,
+                                                        policy, float(epsilon), maxSteps, policySeed,
+                                                        includeObservations, numThreads, outputPath or ""))
+        if "errorStr" in response:
+            raise ValueError(response["errorStr"])
+
+        if "episodes" in response:
+            decoder = _RolloutDecoder()
+            response["episodes"] = [decoder.decode(episode) for episode in response["episodes"]]
+
+        return response
+
+    #
+    # Cache of pristine games
+    #
+    def getGameCacheStats(self):
+        """ Hits, misses and evictions of the server's cache of generated games, its size, and its maximum size.
+        Resetting to a cached (game, parameters, seed, fold) copies the cached game instead of generating it again. """
+        return orjson.loads(self.server.getGameCacheStatsJSON())
+
+    def setGameCacheSize(self, maxGames):
+        """ Set the maximum number of cached games (0 disables the cache). The cache is shared by all environments
+        on the same server. This limits the number of games, not the memory they use, so lower it for large games
+        (e.g. with many locations or objects). """
+        self.server.setGameCacheSize(maxGames)
+
+    def clearGameCache(self):
+        self.server.clearGameCache()
+
+    #
+    # Background prefetching of games (for resets without a seed)
+    #
+    def enablePrefetch(self, numGames=4, seed=0, gameFold=None, generateGoldPath=False):
+        """ Generate up to `numGames` games ahead of time on a background thread of the server, for random seeds of
+        `gameFold` (default: the current fold) drawn from a generator seeded with `seed`. A `reset()` without a seed
+        (with the same fold and `generateGoldPath`) then takes the next ready game, so the sequence of games is
+        reproducible. Other resets generate their game as usual. Prefetching restarts when a new game is loaded. """
+        msg = self.server.enablePrefetch(numGames, seed, gameFold or self.gameFold, generateGoldPath)
+        if msg:
+            raise ValueError(msg)
+
+    def disablePrefetch(self):
+        self.server.disablePrefetch()
+
+    def getNumPrefetchedGames(self):
+        """ Number of prefetched games that are ready (or -1 if prefetching is disabled). """
+        return self.server.getNumPrefetchedGames()
+
+    #
+    # Integer ID vocabularies (for the "ids" protocol)
+    #
+    def getTextVocabulary(self):
+        """ Strings of the observation, look and inventory IDs (`infos['observationId']`, etc.), indexed by ID. """
+        return list(self._textVocabulary)
+
+    def getActionVocabulary(self):
+        """ Strings of the valid action IDs (`infos['validActionIds']`), indexed by ID. """
+        return list(self._actionVocabulary)
+
+    def resetVocabularies(self):
+        """ Forget all strings seen so far: IDs are reassigned (from 0) starting with the next step. """
+        self.server.resetVocabularies()
+        self._textVocabulary = []
+        self._actionVocabulary = []
+
+    #
+    # Snapshots
+    #
+    def snapshot(self):
+        """ Store a copy of the current game state in the simulator, and return a handle to it.
+
+        Restoring the handle with `restore()` returns the environment to this point (including the run history and
+        reward calculation), without regenerating the game or replaying actions. At most `maxSnapshots` snapshots are
+        kept; beyond that, the least recently used snapshots are released. Use `releaseSnapshot()` to free them sooner.
+        """
+        handle = self.server.snapshot()
+        if handle < 0:
+            raise RuntimeError("Game is not initialized -- call reset() before taking a snapshot.")
+
+        self._snapshots[handle] = {
+            "runHistory": list(self.runHistory),
+            "lastStepScore": self.lastStepScore,
+            "seed": self.seed,
+            "gameFold": self.gameFold,
+            "goldPathGenerated": self.goldPathGenerated,
+            "fields": self.fields,
+            "taskDescription": self.taskDescription,
+        }
+        while len(self._snapshots) > self.maxSnapshots:
+            self._snapshots.popitem(last=False)
+
+        return handle
+
+    def restore(self, handle):
+        """ Restore the game state stored by `snapshot()`. Returns the (observation, infos) of the restored step.
+        A snapshot can be restored any number of times, until it is released. """
+        msg = self.server.restore(handle)
+        if msg:
+            self._snapshots.pop(handle, None)
+            raise KeyError(msg)
+
+        state = self._snapshots[handle]
+        self._snapshots.move_to_end(handle)
+
+        self.runHistory = list(state["runHistory"])
+        self.lastStepScore = state["lastStepScore"]
+        self.seed = state["seed"]
+        self.gameFold = state["gameFold"]
+        self.goldPathGenerated = state["goldPathGenerated"]
+        self.fields = state["fields"]
+        self.taskDescription = state["taskDescription"]
+        self._goldPath = None
+
+        infos = dict(self.runHistory[-1])
+        return infos["observation"], infos
+
+    def releaseSnapshot(self, handle):
+        self._snapshots.pop(handle, None)
+        return self.server.releaseSnapshot(handle)
+
+    def releaseAllSnapshots(self):
+        self._snapshots.clear()
+        self.server.releaseAllSnapshots()
+
+    def setMaxSnapshots(self, maxSnapshots):
+        self.server.setMaxSnapshots(maxSnapshots)
+        self.maxSnapshots = max(1, maxSnapshots)  # Clamped the same way as the server
+        while len(self._snapshots) > self.maxSnapshots:
+            self._snapshots.popitem(last=False)
+
     def serialize(self):
         state = {
             "gameName": self.gameName,
@@ -281,19 +779,21 @@ class TextWorldExpressEnv:
             "gameFold": self.gameFold,
             "envStepLimit": self.envStepLimit,
             "generateGoldPath": self.generateGoldPath,
+            "fields": list(self.fields),
             "actions": [info["lastActionStr"] for info in self.runHistory[1:]],
         }
         return state
 
     @classmethod
-    def deserialize(cls, state):
-        env = cls(envStepLimit=state["envStepLimit"])
+    def deserialize(cls, state, server=None, protocol="json"):
+        env = cls(envStepLimit=state["envStepLimit"], server=server, protocol=protocol)
         env.reset(
             seed=state["seed"],
             gameFold=state["gameFold"],
             gameName=state["gameName"],
             gameParams=state["gameParams"],
-            generateGoldPath=state["generateGoldPath"]
+            generateGoldPath=state["generateGoldPath"],
+            fields=state.get("fields"),
         )
         for action in state["actions"]:
             env.step(action)
@@ -301,4 +801,150 @@ class TextWorldExpressEnv:
         return env
 
     def clone(self):
-        return self.deserialize(self.serialize())
+        return self.deserialize(self.serialize(), server=self.sharedServer, protocol=self.protocol)
+
+
+class TextWorldExpressVectorEnv:
+    """ Runs `numEnvs` games in a single JVM, resetting and stepping all of them with a single call to the server.
+
+    Observations, rewards, done flags and infos are returned as lists (one entry per environment), where each
+    `infos` entry has the same keys as the `infos` returned by `TextWorldExpressEnv`.  If `autoReset` is enabled,
+    environments whose episode is completed are reset automatically (with a random seed from the current fold):
+    the returned observation/infos are then the first step of the new episode, while the last step of the finished
+    episode is available in `infos[i]['terminalObservation']` and `infos[i]['terminalInfos']`.
+
+    With `numThreads > 1`, the games in a batch are stepped/reset in parallel on a fixed-size thread pool in the JVM
+    (results are still returned in environment order). Use `getBatchTiming()` to size the pool against the number of cores.
+    """
+
+    #
+    # Constructor
+    #
+    def __init__(self, numEnvs, serverPath=None, envStepLimit=100, autoReset=False, numThreads=1):
+        # Set before launching, so that close() works even if that fails
+        self._gateway = None
+        self._closed = False
+
+        # Launch the server and connect to the JVM.
+        self._gateway = _launchGateway(serverPath)
+
+        self.numEnvs = numEnvs
+        self.server = self._gateway.jvm.textworldexpress.runtime.PythonInterfaceVector(numEnvs)
+
+        # Set the environment step limit, and whether finished environments should be automatically reset
+        self.envStepLimit = envStepLimit
+        self.server.setEnvStepLimit(envStepLimit)
+        self.autoReset = autoReset
+        self.server.setAutoReset(autoReset)
+
+        # Set the number of JVM threads used to run each batch
+        self.numThreads = numThreads
+        self.server.setNumThreads(numThreads)
+
+        # Cache options for environment reset.
+        self.seeds = None
+        self.gameName = None
+        self.gameParams = ""
+        self.gameFold = "train"
+
+        # Task descriptions are constant for an episode, so they are only sent by the server on reset.
+        self.taskDescriptions = [""] * numEnvs
+
+    #
+    #   Methods
+    #
+    def reset(self, seeds=None, gameFold=None, gameName=None, gameParams=None, generateGoldPath=False):
+        self.gameName = gameName or self.gameName
+        self.gameParams = gameParams if gameParams is not None else self.gameParams
+        if gameName is not None or gameParams is not None:
+            self.load(self.gameName, self.gameParams)
+
+        self.gameFold = gameFold or self.gameFold
+        self.seeds = seeds if seeds is not None else self.seeds
+
+        # Seeds are sent as a comma-delimited string, where a negative seed means a random seed from the fold.
+        seedsStr = ""
+        if self.seeds is not None:
+            if len(self.seeds) != self.numEnvs:
+                raise ValueError(f"Expected {self.numEnvs} seeds (found {len(self.seeds)}).")
+            seedsStr = ",".join(str(-1 if seed is None else seed) for seed in self.seeds)
+
+        responses = orjson.loads(self.server.resetJSON(seedsStr, self.gameFold, generateGoldPath))
+
+        observations = []
+        infos = []
+        for envIdx, response in enumerate(responses):
+            self.taskDescriptions[envIdx] = response.get('taskDescription', "")
+            observations.append(response['observation'])
+            infos.append(response)
+
+        return observations, infos
+
+    # Ask the simulator to load an environment from a script
+    def load(self, gameName, gameParams):
+        self.gameName = gameName
+        self.gameParams = gameParams
+        msg = self.server.load(self.gameName, self.gameParams)
+        if msg:
+            raise ValueError(msg)
+
+    def close(self) -> None:
+        if (self._gateway is not None) and not self._closed:
+            _shutdownGateway(self._gateway)
+        self._closed = True
+
+    def __del__(self):
+        self.close()
+
+    # Get a list of valid tasks/environments
+    def getGameNames(self):
+        return orjson.loads(self.server.getGameNamesJSON())
+
+    # Get the task description for each environment
+    def getTaskDescriptions(self):
+        return list(self.taskDescriptions)
+
+    # Get the generation properties of the game running in environment `envIdx`
+    def getGenerationProperties(self, envIdx):
+        return orjson.loads(self.server.getGenerationPropertiesJSON(envIdx))
+
+    # Get the gold action sequence of the game running in environment `envIdx`
+    def getGoldActionSequence(self, envIdx):
+        return orjson.loads(self.server.getGoldActionSequenceJSON(envIdx))
+
+    # Get the timing of the last batch (wall time, time spent in the games, and the effective parallelism)
+    def getBatchTiming(self):
+        return orjson.loads(self.server.getBatchTimingJSON())
+
+    #
+    # Step
+    #
+    def step(self, actions):
+        if len(actions) != self.numEnvs:
+            raise ValueError(f"Expected {self.numEnvs} actions (found {len(actions)}).")
+
+        # Actions are sent as a single newline-delimited string.
+        responses = orjson.loads(self.server.stepJSON("\n".join(actions)))
+
+        observations = []
+        rewards = []
+        dones = []
+        infos = []
+        for envIdx, response in enumerate(responses):
+            response['lastActionStr'] = actions[envIdx]
+            response['taskDescription'] = self.taskDescriptions[envIdx]
+            rewards.append(response['reward'])
+            dones.append(response['done'])
+
+            # If the environment was automatically reset, return the first step of the new episode.
+            resetResponse = response.pop('reset', None)
+            if resetResponse is not None:
+                self.taskDescriptions[envIdx] = resetResponse.get('taskDescription', "")
+                resetResponse['terminalObservation'] = response['observation']
+                resetResponse['terminalInfos'] = response
+                response = resetResponse
+
+            observations.append(response['observation'])
+            infos.append(response)
+
+        return observations, rewards, dones, infos
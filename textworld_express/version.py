@@ -0,0 +1 @@
+__version__ = '1.1.0rc5'